@@ -0,0 +1,202 @@
+"""
+Mergeable, bounded-memory aggregates for combining per-segment results.
+
+Every award is summarized by an AwardStats: its weighted count, first and last
+mention time, and Misra-Gries heavy-hitter summaries of its winners, nominees and
+presenters, so the memory per award is fixed by the capacity however many names the
+tweets mention.
+
+A summary is exact while it holds at most capacity distinct names. Past that, each
+reduction subtracts the same amount from every count and drops the names that reach
+zero, so counts are only ever underestimated, by at most error <= total /
+(capacity + 1), and every name weighing more than that is kept. Merging adds the
+counts and reduces again (Agarwal et al., "Mergeable Summaries"), which keeps the same
+bound whatever order the segments of a run are reduced in; the result is identical to
+one serial pass as long as no summary overflows.
+"""
+
+# number of distinct names a summary keeps
+DEFAULT_CAPACITY = 100
+
+
+def _rank(item_count):
+    item, count = item_count
+    # heaviest first, ties broken by the item so the order never depends on insertion
+    return -count, str(item)
+
+
+class MisraGries:
+    """
+    Misra-Gries summary of weighted item counts, holding at most capacity items.
+
+    Attributes:
+        counts (dict): Estimated count of every kept item, never above the true count.
+        total (int): Total weight added, including that of dropped items.
+        error (int): Largest amount any count may be underestimated by.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.total = 0
+        self.error = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def _reduce(self):
+        # subtract the (capacity + 1)-th largest count from all of them; ties at the
+        # cut all drop together, so the kept items never depend on insertion order
+        if len(self.counts) <= self.capacity:
+            return
+        cut = sorted(self.counts.values(), reverse=True)[self.capacity]
+        self.counts = {item: count - cut for item, count in self.counts.items() if count > cut}
+        self.error += cut
+
+    def add(self, item, weight=1):
+        self.counts[item] = self.counts.get(item, 0) + weight
+        self.total += weight
+        self._reduce()
+
+    def update(self, item_counts):
+        """
+        Add every (item, count) of a dict.
+        """
+        for item, count in item_counts.items():
+            self.counts[item] = self.counts.get(item, 0) + count
+            self.total += count
+        self._reduce()
+
+    def merge(self, other):
+        """
+        Add the counts of another summary into this one, then reduce back to capacity.
+
+        Returns:
+            MisraGries: self.
+        """
+        for item, count in other.counts.items():
+            self.counts[item] = self.counts.get(item, 0) + count
+        self.total += other.total
+        self.error += other.error
+        self._reduce()
+        return self
+
+    def items(self):
+        """
+        (item, count) pairs, heaviest first.
+        """
+        return sorted(self.counts.items(), key=_rank)
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class AwardStats:
+    """
+    Mergeable summary of one award.
+
+    Parameters:
+        capacity (int): Capacity of the winner, nominee and presenter summaries.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.count = 0
+        self.start_timestamp = None
+        self.end_timestamp = None
+        self.winners = MisraGries(capacity)
+        self.nominees = MisraGries(capacity)
+        self.presenters = MisraGries(capacity)
+
+    def add_mention(self, timestamp, weight=1):
+        self.count += weight
+        if self.start_timestamp is None or timestamp < self.start_timestamp:
+            self.start_timestamp = timestamp
+        if self.end_timestamp is None or timestamp > self.end_timestamp:
+            self.end_timestamp = timestamp
+
+    def merge(self, other):
+        """
+        Combine another summary of the same award into this one.
+
+        Returns:
+            AwardStats: self.
+        """
+        self.count += other.count
+        for timestamp in (other.start_timestamp, other.end_timestamp):
+            if timestamp is not None:
+                self.add_mention(timestamp, 0)
+        self.winners.merge(other.winners)
+        self.nominees.merge(other.nominees)
+        self.presenters.merge(other.presenters)
+        return self
+
+    @classmethod
+    def from_award(cls, award_data, nominees=(), presenters=(), capacity=DEFAULT_CAPACITY):
+        """
+        Summary of one award as found by frame.find_awards / find_nominees / find_presenters.
+        """
+        stats = cls(capacity)
+        stats.count = award_data["count"]
+        stats.start_timestamp = award_data["start_timestamp"]
+        stats.end_timestamp = award_data["end_timestamp"]
+        stats.winners.update(award_data["winners"])
+        for nominee in nominees or ():
+            stats.nominees.add(nominee)
+        for presenter in presenters or ():
+            stats.presenters.add(presenter)
+        return stats
+
+    def to_award(self):
+        """
+        The award in the find_awards format, with the estimated counts of the kept winners.
+        """
+        return {
+            "count": self.count,
+            "winners": self.winners.to_dict(),
+            "start_timestamp": self.start_timestamp,
+            "end_timestamp": self.end_timestamp
+        }
+
+
+def award_stats_from_results(awards, nominees, presenters, capacity=DEFAULT_CAPACITY):
+    """
+    {award: AwardStats} from the results of one segment.
+    """
+    return {
+        award: AwardStats.from_award(award_data, nominees.get(award), presenters.get(award), capacity)
+        for award, award_data in awards.items()
+    }
+
+
+def merge_award_stats(into, stats):
+    """
+    Merge {award: AwardStats} stats into the dict into, in place.
+
+    Returns:
+        dict: into.
+    """
+    for award, award_stats in stats.items():
+        if award in into:
+            into[award].merge(award_stats)
+        else:
+            into[award] = award_stats
+    return into
+
+
+def finalize_award_stats(stats, min_count=2):
+    """
+    Awards, nominees and presenters in the frame.save_json input format, keeping the
+    awards mentioned at least min_count times, most mentioned first.
+
+    Returns:
+        tuple: (awards, nominees, presenters) dictionaries.
+    """
+    kept = sorted(((award, award_stats) for award, award_stats in stats.items() if award_stats.count >= min_count),
+                  key=lambda item: (-item[1].count, item[0]))
+    awards = {award: award_stats.to_award() for award, award_stats in kept}
+    nominees = {award: [name for name, _ in award_stats.nominees.items()] for award, award_stats in kept}
+    presenters = {award: [name for name, _ in award_stats.presenters.items()] for award, award_stats in kept}
+    return awards, nominees, presenters
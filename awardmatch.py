@@ -0,0 +1,87 @@
+"""
+Multi-pattern award-name matcher (Aho-Corasick automaton).
+"""
+from collections import deque
+
+
+class AwardMatcher:
+    """
+    Aho-Corasick automaton built once from the detected award names.
+
+    Finds every (case-insensitive) award mention in a text in one pass over the text,
+    so the cost of a lookup does not depend on how many awards there are.
+    """
+
+    def __init__(self, awards):
+        self.awards = list(awards)
+        self.lengths = []
+        # goto[node] maps a character to the next node, out[node] lists the award
+        # indices ending at node, fail[node] is the longest proper suffix state
+        self.goto = [{}]
+        self.out = [[]]
+        self.fail = [0]
+
+        for award_index, award in enumerate(self.awards):
+            pattern = award.lower()
+            self.lengths.append(len(pattern))
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                next_node = self.goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][ch] = next_node
+                    self.goto.append({})
+                    self.out.append([])
+                    self.fail.append(0)
+                node = next_node
+            self.out[node].append(award_index)
+
+        # breadth-first pass to set the failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def iter_matches(self, text):
+        """
+        Yield (start, end, award index) for every award found in the lowercased text.
+        """
+        goto, fail, out, lengths = self.goto, self.fail, self.out, self.lengths
+        node = 0
+        for position, ch in enumerate(text.lower()):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for award_index in out[node]:
+                yield position + 1 - lengths[award_index], position + 1, award_index
+
+    def find_all(self, text):
+        """
+        Every award mention in a text.
+
+        Parameters:
+            text (str): The tweet text.
+
+        Returns:
+            list: (start, end, award) tuples, positions refer to text.lower().
+        """
+        return [(start, end, self.awards[award_index]) for start, end, award_index in self.iter_matches(text)]
+
+    def first_award(self, text):
+        """
+        The award mentioned in the text that comes first in the award list, or None.
+        This is the award a loop over the awards testing "award in text" would find.
+        """
+        best = None
+        for _, _, award_index in self.iter_matches(text):
+            if best is None or award_index < best:
+                best = award_index
+        return None if best is None else self.awards[best]
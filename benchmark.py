@@ -0,0 +1,274 @@
+"""
+Per-stage benchmark on synthetic tweets, with a baseline to catch regressions.
+
+    python benchmark.py --sizes 10k,100k                     # print the numbers
+    python benchmark.py --sizes 10k,100k --save-baseline     # record a baseline
+    python benchmark.py --sizes 10k,100k --threshold 0.15    # compare against it
+
+Every stage is timed on its own and reported as items per second, and run a second
+time under tracemalloc for its peak memory: the most the stage had allocated at once,
+on top of what was allocated before it, so every stage is measured on its own. The
+timed run is not traced, tracing slows allocations down. Both runs start with empty
+language and normalization memos, so neither is warmed up by the run before it. Sizes
+above MAX_TRACED_SIZE are only timed: tracing every allocation of millions of tweets
+takes longer than the stages themselves. A stage regresses when its throughput drops,
+or its peak memory grows, by more than the threshold relative to the baseline; the
+script then exits with status 1.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from functools import partial
+from time import perf_counter
+
+from synthetic import generate_tweets, PEOPLE
+from preprocess import preprocess_tweet
+from language import identifier
+from normalization import normalizer
+from tweet import TweetStore
+from clustering import cluster_by_timestamp, cluster_tweets_kmeans, segment_bursts
+from doccache import DocCache
+from models import get_nlp
+from names import NameResolver
+from nameextract import FastNameExtractor
+import frame
+from instrument import peak_rss_mb
+
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.2
+SIZES = {"10k": 10000, "100k": 100000, "1M": 1000000, "10M": 10000000}
+STAGES = ("preprocess_tweet", "cluster_by_timestamp", "segment_bursts", "cluster_tweets_kmeans",
+          "find_host_candidate", "find_host_candidate_fast", "find_awards", "find_nominees", "find_presenters",
+          "merge_name_counts", "name_resolver")
+# stages that need the spaCy model
+NLP_STAGES = {"find_host_candidate", "find_awards", "find_nominees", "find_presenters"}
+# merge_name_counts is quadratic, its input is capped
+MAX_NAMES = 2000
+# larger sizes skip the traced run that measures peak memory
+MAX_TRACED_SIZE = 1000000
+
+
+def traced_peak_mb(function):
+    """
+    Peak memory in MB allocated by one run of function, as traced by tracemalloc.
+    Only allocations made during the run are traced, memory held before does not count.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def clear_memos():
+    """
+    Empty the per-process memos of preprocessing, so a run does not reuse the texts a
+    previous run has seen.
+    """
+    identifier.clear()
+    normalizer.clear()
+
+
+def measure_stage(function, items, memory=True):
+    """
+    Run function and return (the result of the timed run, metrics). With memory the
+    function runs once more, traced, for its peak memory. Every run starts cold, see
+    clear_memos.
+    """
+    clear_memos()
+    gc.collect()
+    start = perf_counter()
+    result = function()
+    seconds = perf_counter() - start
+    metrics = {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput": round(items / max(seconds, 1e-9), 1),
+    }
+    if memory:
+        clear_memos()
+        metrics["peak_mb"] = round(traced_peak_mb(function), 1)
+    return result, metrics
+
+
+def name_counts(size, seed=0):
+    """
+    Person-name counts with typos and partial names, like the extractors produce.
+    """
+    import random
+    rng = random.Random(seed)
+    counts = {}
+    for _ in range(size):
+        name = rng.choice(PEOPLE)
+        variant = rng.random()
+        if variant < 0.2:
+            # one dropped letter
+            position = rng.randrange(1, len(name))
+            name = name[:position - 1] + name[position:]
+        elif variant < 0.3:
+            name = name.split()[0]
+        elif variant < 0.5:
+            name = name.lower()
+        counts[name] = counts.get(name, 0) + rng.randint(1, 20)
+    return counts
+
+
+def run_benchmark(size, stages=STAGES, seed=0, memory=True):
+    """
+    Benchmark the selected stages on size synthetic tweets.
+
+    Parameters:
+        memory (bool): Also measure the peak memory of every stage, which runs it twice;
+            ignored above MAX_TRACED_SIZE tweets.
+
+    Returns:
+        dict: Stage name -> metrics, or {"skipped": reason}.
+    """
+    results = {}
+    measure = partial(measure_stage, memory=memory and size <= MAX_TRACED_SIZE)
+
+    # preprocessing always runs, the other stages need its output. The tweets stream
+    # into the store, no list of millions of Tweet objects is held
+    def preprocess_all():
+        preprocessed = map(preprocess_tweet, generate_tweets(size, seed))
+        return TweetStore.from_tweets(tweet for tweet in preprocessed if tweet is not None)
+    store, metrics = measure(preprocess_all, size)
+    if "preprocess_tweet" in stages:
+        results["preprocess_tweet"] = metrics
+    store = store.sort_by_timestamp()
+    count = len(store)
+
+    if "cluster_by_timestamp" in stages:
+        _, results["cluster_by_timestamp"] = measure(lambda: cluster_by_timestamp(store), count)
+    if "segment_bursts" in stages:
+        _, results["segment_bursts"] = measure(lambda: segment_bursts(store), count)
+    if "cluster_tweets_kmeans" in stages:
+        _, results["cluster_tweets_kmeans"] = measure(lambda: cluster_tweets_kmeans(store, k=32), count)
+
+    if "find_host_candidate_fast" in stages:
+        # spaCy only decides the candidates the lexicons cannot, none without the model
+        try:
+            fallback = get_nlp("names")
+        except OSError:
+            fallback = None
+        _, results["find_host_candidate_fast"] = measure(
+            lambda: frame.find_host_candidate(store, resolver=NameResolver(), name_extractor=FastNameExtractor(fallback)),
+            count)
+
+    wanted_nlp_stages = [stage for stage in stages if stage in NLP_STAGES]
+    if wanted_nlp_stages:
+        try:
+            nlp = get_nlp("extract")
+        except OSError as error:
+            for stage in wanted_nlp_stages:
+                results[stage] = {"skipped": str(error)}
+        else:
+            # every stage parses its own tweets, so parsing is part of its cost
+            if "find_host_candidate" in stages:
+                _, results["find_host_candidate"] = measure(
+                    lambda: frame.find_host_candidate(store, doc_cache=DocCache(nlp), resolver=NameResolver()), count)
+            awards, metrics = measure(lambda: frame.find_awards(store, DocCache(nlp)), count)
+            if "find_awards" in stages:
+                results["find_awards"] = metrics
+            if "find_nominees" in stages:
+                _, results["find_nominees"] = measure(lambda: frame.find_nominees(store, awards, DocCache(nlp)), count)
+            if "find_presenters" in stages:
+                _, results["find_presenters"] = measure(
+                    lambda: frame.find_presenters(store, awards, doc_cache=DocCache(nlp)), count)
+
+    counts = name_counts(min(size // 10, MAX_NAMES), seed)
+    if "merge_name_counts" in stages:
+        _, results["merge_name_counts"] = measure(lambda: frame.merge_name_counts(counts), len(counts))
+    if "name_resolver" in stages:
+        _, results["name_resolver"] = measure(lambda: NameResolver().merge(counts), len(counts))
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Regressions of results against a baseline.
+
+    Returns:
+        list: One message per stage and size that got slower or bigger than allowed.
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, metrics in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if not reference or "skipped" in reference or "skipped" in metrics:
+                continue
+            if metrics["throughput"] < reference["throughput"] * (1 - threshold):
+                regressions.append(f"{size} {stage}: {metrics['throughput']:.0f}/s, baseline {reference['throughput']:.0f}/s")
+            # baselines from before per-stage memory have no peak_mb
+            if "peak_mb" in metrics and "peak_mb" in reference and \
+                    metrics["peak_mb"] > reference["peak_mb"] * (1 + threshold):
+                regressions.append(f"{size} {stage}: peak memory {metrics['peak_mb']:.0f} MB, baseline {reference['peak_mb']:.0f} MB")
+    return regressions
+
+
+def print_results(results):
+    for size, stages in results.items():
+        print(f"{size} tweets")
+        for stage, metrics in stages.items():
+            if "skipped" in metrics:
+                print(f"  {stage:<22} skipped: {metrics['skipped']}")
+            else:
+                memory = f"{metrics['peak_mb']:9.1f} MB" if "peak_mb" in metrics else ""
+                print(f"  {stage:<22} {metrics['seconds']:9.3f}s {metrics['throughput']:14.0f}/s {memory}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic tweets.")
+    parser.add_argument("--sizes", default="10k,100k", help=f"comma separated, from {', '.join(SIZES)} or plain numbers")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated stage names")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative throughput drop / peak memory growth")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the traced second run of every stage that measures its peak memory")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    arguments = parser.parse_args()
+
+    stages = [stage for stage in arguments.stages.split(",") if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    results = {}
+    for size in arguments.sizes.split(","):
+        results[size] = run_benchmark(SIZES[size] if size in SIZES else int(size), stages, arguments.seed,
+                                      memory=not arguments.no_memory)
+    print_results(results)
+
+    # None where the resource module does not exist
+    process_peak = peak_rss_mb()
+    report = {"python": platform.python_version(), "platform": platform.platform(), "seed": arguments.seed,
+              "process_peak_rss_mb": round(process_peak, 1) if process_peak is not None else None,
+              "results": results}
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=4)
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w") as file:
+            json.dump(report, file, indent=4)
+        print(f"Baseline saved to {arguments.baseline}")
+    else:
+        try:
+            with open(arguments.baseline) as file:
+                baseline = json.load(file)["results"]
+        except FileNotFoundError:
+            baseline = None
+        if baseline is not None:
+            regressions = compare(results, baseline, arguments.threshold)
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+            if regressions:
+                sys.exit(1)
+            print(f"No regressions against {arguments.baseline} (threshold {arguments.threshold:.0%})")
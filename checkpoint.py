@@ -0,0 +1,307 @@
+"""
+Content-addressed checkpoints of pipeline stages.
+
+A stage's output is stored under a hash of everything it depends on: the keys of the
+stages it reads from (or the content of an input file), its parameters and the source
+code of the functions and modules it runs. A re-run loads every stage whose key did not
+change and recomputes only the ones downstream of a change. Editing the presenter
+patterns, for example, changes the key of the extraction stage but not the keys of
+preprocessing, clustering or parsing.
+
+Outputs are loaded lazily: a stage whose result is only needed to compute keys is
+never read from disk.
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import sys
+import types
+
+CHECKPOINT_DIR = ".checkpoints"
+# checkpoints kept per stage, so switching between a few settings stays cached
+KEEP_PER_STAGE = 3
+FILE_HASHES = "files.json"
+# directory of this project's modules, whose code dependencies follows
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# constants hashed by value; other objects (pipelines, matchers) have no stable repr
+CONSTANT_TYPES = (str, bytes, int, float, bool, type(None), tuple, list, dict, set, frozenset, re.Pattern)
+
+
+def _hash(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _canonical(value):
+    """
+    repr of a value that does not depend on hash order: sets are sorted and dicts
+    are sorted by key, also inside lists, tuples and other dicts. Regex patterns are
+    given in full.
+    """
+    if isinstance(value, (set, frozenset)):
+        return "{" + ", ".join(sorted(_canonical(item) for item in value)) + "}"
+    if isinstance(value, dict):
+        items = sorted((_canonical(key), _canonical(item)) for key, item in value.items())
+        return "{" + ", ".join(f"{key}: {item}" for key, item in items) + "}"
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__ + "(" + ", ".join(_canonical(item) for item in value) + ")"
+    if isinstance(value, re.Pattern):
+        # the repr of a pattern is cut after 200 characters
+        return f"re.compile({value.pattern!r}, {value.flags})"
+    return repr(value)
+
+
+def code_hash(code):
+    """
+    Hash of the source of functions, classes and modules (whole files), or of the repr
+    of anything else, such as pattern lists and other constants. Sets and dicts are
+    hashed in sorted order, so the hash is the same in every interpreter.
+    """
+    parts = []
+    for item in code:
+        if isinstance(item, types.ModuleType):
+            with open(item.__file__, "rb") as file:
+                parts.append(file.read())
+        elif inspect.isfunction(item) or inspect.isclass(item) or inspect.ismethod(item):
+            parts.append(inspect.getsource(inspect.unwrap(item)))
+        else:
+            parts.append(_canonical(item))
+    return _hash(*parts)
+
+
+def _project_module(value):
+    """
+    The module of this project that value is or was defined in, None for anything else.
+    """
+    if not isinstance(value, types.ModuleType):
+        value = sys.modules.get(getattr(value, "__module__", None) or "")
+    path = getattr(value, "__file__", None)
+    if path and os.path.dirname(os.path.abspath(path)) == PROJECT_DIR:
+        return value
+    return None
+
+
+def _code_names(code):
+    """
+    Global names read by a code object and by the functions nested in it.
+    """
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.extend(_code_names(const))
+    return names
+
+
+def _closure_values(function):
+    values = []
+    for cell in function.__closure__ or ():
+        try:
+            values.append(cell.cell_contents)
+        except ValueError:
+            # a variable of the enclosing function that is not assigned yet
+            pass
+    return values
+
+
+def dependencies(*functions):
+    """
+    Code items of the given functions for code_hash, derived from what they use.
+
+    The functions and classes of a function's own module that it uses, directly or
+    through its closure, are followed and added one by one, together with the
+    constants they read. Anything else of this project is added as its whole module,
+    along with the project modules that module uses. Third-party code is left out;
+    pass its versions as stage parameters instead.
+    """
+    items = []
+    seen = set()
+
+    def add(item):
+        if id(item) in seen:
+            return False
+        seen.add(id(item))
+        items.append(item)
+        return True
+
+    def add_module(module):
+        if add(module):
+            for value in list(vars(module).values()):
+                other = _project_module(value)
+                if other is not None:
+                    add_module(other)
+
+    def follow(function):
+        function = inspect.unwrap(function)
+        if not add(function):
+            return
+        module = sys.modules.get(function.__module__)
+        values = [function.__globals__[name] for name in _code_names(function.__code__)
+                  if name in function.__globals__]
+        for value in values + _closure_values(function):
+            if inspect.isfunction(value) or inspect.isclass(value) or isinstance(value, types.ModuleType):
+                other = _project_module(value)
+                if other is None:
+                    continue
+                if other is not module or isinstance(value, types.ModuleType):
+                    add_module(other)
+                elif inspect.isclass(value):
+                    if add(value):
+                        for member in vars(value).values():
+                            if inspect.isfunction(member):
+                                follow(member)
+                else:
+                    follow(value)
+            elif isinstance(value, CONSTANT_TYPES):
+                add(value)
+            elif _project_module(value) is not None:
+                # an instance of a project class, such as a shared normalizer
+                add_module(_project_module(value))
+
+    for function in functions:
+        follow(function)
+    return items
+
+
+def file_hash(path, directory=CHECKPOINT_DIR):
+    """
+    Hash of a file's content. The hash is remembered by path, size and modification
+    time in the directory, so an unchanged input is not read again on the next run;
+    nothing is remembered if the directory is None.
+    """
+    stat = os.stat(path)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    memo = {}
+    if directory is not None:
+        memo_path = os.path.join(directory, FILE_HASHES)
+        try:
+            with open(memo_path) as file:
+                memo = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            memo = {}
+    entry = memo.get(os.path.abspath(path))
+    if entry and entry["signature"] == signature:
+        return entry["hash"]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    if directory is not None:
+        memo[os.path.abspath(path)] = {"signature": signature, "hash": digest.hexdigest()}
+        os.makedirs(directory, exist_ok=True)
+        with open(memo_path, "w") as file:
+            json.dump(memo, file)
+    return digest.hexdigest()
+
+
+def _pickle_save(value, file):
+    pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class Checkpoint:
+    """
+    One stage of a CheckpointStore: its key and its (lazily loaded) value.
+    """
+
+    def __init__(self, store, name, key, compute, save, load, persist=True):
+        self.store = store
+        self.name = name
+        self.key = key
+        self.compute = compute
+        self.save = save
+        self.load = load
+        self.persist = persist
+        self.cached = None
+        self._value = None
+        self._has_value = False
+
+    @property
+    def path(self):
+        return os.path.join(self.store.directory, f"{self.name}-{self.key}.bin")
+
+    @property
+    def value(self):
+        if not self._has_value:
+            if self.persist and self.store.enabled and os.path.exists(self.path):
+                with open(self.path, "rb") as file:
+                    self._value = self.load(file)
+                self.cached = True
+            else:
+                self._value = self.compute()
+                self.cached = False
+                if self.persist and self.store.enabled:
+                    self.store.write(self)
+            self._has_value = True
+        return self._value
+
+
+class CheckpointStore:
+    """
+    Directory of stage outputs keyed by content.
+
+    Parameters:
+        directory (str): Where the checkpoints are kept.
+        enabled (bool): False computes every stage and stores nothing.
+    """
+
+    def __init__(self, directory=CHECKPOINT_DIR, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+
+    def stage(self, name, compute, inputs=(), params=None, code=(), save=_pickle_save, load=pickle.load,
+              persist=True):
+        """
+        Declare a stage.
+
+        Parameters:
+            name (str): Stage name, part of the file name.
+            compute: Function without arguments computing the output; it reads the
+                values of its input stages.
+            inputs (iterable): Input Checkpoints, or strings such as file hashes.
+            params: Parameters of the stage, hashed by repr with sets and dicts sorted.
+            code (iterable): Functions, classes, modules and constants the stage runs,
+                usually dependencies(compute).
+            save, load: Serializer of the output, pickle by default.
+            persist (bool): False for stages cheaper to recompute than to load; they
+                still get a key, so the stages after them can be checkpointed.
+
+        Returns:
+            Checkpoint: Use .value to get the output.
+        """
+        input_keys = [item.key if isinstance(item, Checkpoint) else str(item) for item in inputs]
+        key = _hash(name, *input_keys, _canonical(params), code_hash(code))
+        return Checkpoint(self, name, key, compute, save, load, persist)
+
+    def file_hash(self, path):
+        """
+        file_hash of an input file, remembered in the store's directory unless the
+        store is disabled.
+        """
+        return file_hash(path, self.directory if self.enabled else None)
+
+    def write(self, checkpoint):
+        os.makedirs(self.directory, exist_ok=True)
+        # written under a temporary name first, so an interrupted run leaves no broken checkpoint
+        temporary = checkpoint.path + ".tmp"
+        with open(temporary, "wb") as file:
+            checkpoint.save(checkpoint._value, file)
+        os.replace(temporary, checkpoint.path)
+        self.prune(checkpoint.name)
+
+    def prune(self, name, keep=KEEP_PER_STAGE):
+        """
+        Delete all but the keep most recently written checkpoints of a stage.
+        """
+        prefix = f"{name}-"
+        paths = [os.path.join(self.directory, entry) for entry in os.listdir(self.directory)
+                 if entry.startswith(prefix) and entry.endswith(".bin")
+                 and len(entry) == len(prefix) + 32 + len(".bin")]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[keep:]:
+            os.remove(path)
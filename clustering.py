@@ -1,79 +1,217 @@
-from collections import defaultdict
 from datetime import datetime
-from tweet import Tweet
-import pickle
-import os
+from zoneinfo import ZoneInfo
+from preprocess import preprocess
+import sys
 import matplotlib.pyplot as plt
 from sklearn.cluster import KMeans
 import numpy as np
+import instrument
 
+@instrument.timed()
 def cluster_tweets_kmeans(tweets, k):
     """
     Clusters tweets using K-means based on their timestamps.
 
     Parameters:
-        tweets (list): A list of Tweet objects, sorted by timestamp.
+        tweets (TweetStore): Tweets sorted by timestamp.
         k (int): The number of clusters.
 
     Returns:
-        dict: A dictionary with cluster labels as keys and lists of tweets as values.
+        dict: A dictionary with cluster labels as keys and TweetStores as values.
     """
-    # Convert tweet timestamps to a numerical format (seconds since epoch)
-    timestamps = np.array([tweet.timestamp for tweet in tweets]).reshape(-1, 1)
+    # Timestamps are already a numerical column (ms since epoch)
+    timestamps = tweets.timestamps.reshape(-1, 1)
 
-    # Apply K-means clustering
+    # Apply K-means clustering, collapsed duplicates weigh as much as their copies
     kmeans = KMeans(n_clusters=k, random_state=0)
-    kmeans.fit(timestamps)
-
-    # Create a dictionary to store clusters
-    clusters = {i: [] for i in range(k)}
+    kmeans.fit(timestamps, sample_weight=tweets.weights)
 
     # Assign tweets to their corresponding cluster
-    for i, label in enumerate(kmeans.labels_):
-        clusters[label].append(tweets[i])
+    clusters = {}
+    for label in range(k):
+        clusters[label] = tweets.take(np.flatnonzero(kmeans.labels_ == label))
 
     return clusters
 
-def cluster_by_timestamp(tweets, time_interval='hour'):
+def bin_counts(timestamps, bin_ms, weights=None, max_gap_bins=60):
     """
-    Cluster tweets by their timestamps.
-    
-    Parameters:
-        tweets (list): A list of Tweet objects.
-        time_interval (str): The interval for clustering ('hour', 'day').
-    
+    Histogram of sorted timestamps in bins of bin_ms, starting at the first timestamp.
+
+    Runs of more than max_gap_bins empty bins are shortened to max_gap_bins, so a
+    stray timestamp days away from the rest adds one bin and a short gap instead of
+    a bin for every minute in between. The series never has more than
+    (max_gap_bins + 1) bins per occupied bin.
+
+    Returns:
+        tuple: (counts per bin, weighted volume per bin), of the same length.
+    """
+    offsets = (timestamps - timestamps[0]) // bin_ms
+    occupied, inverse = np.unique(offsets, return_inverse=True)
+    steps = np.minimum(np.diff(occupied), max_gap_bins + 1)
+    bins = np.concatenate(([0], np.cumsum(steps)))[inverse]
+    counts = np.bincount(bins)
+    volume = counts if weights is None else np.bincount(bins, weights=weights, minlength=len(counts))
+    return counts, volume
+
+def burst_states(volume, s=2.0, gamma=1.0):
+    """
+    Two-state Kleinberg burst detection on a binned volume series.
+
+    The quiet state emits the mean volume per bin, the burst state s times as much.
+    Every bin pays the Poisson cost of its volume under the state's rate, and moving
+    up into the burst state costs gamma * ln(number of bins). The cheapest state
+    sequence is found with the Viterbi recursion, one step per bin.
+
     Returns:
-        dict: A dictionary where keys are time intervals and values are lists of tweets.
-    """
-    clustered_tweets = defaultdict(list)
-
-    for tweet in tweets:
-        # Convert string timestamp to datetime object if necessary
-        # tweet.timestamp is in ms
-        tweet_time = datetime.fromtimestamp(tweet.timestamp / 1000.0)
-        
-        # Determine the time cluster key
-        """if time_interval == 'hour':
-            # Use the hour as the key
-            key = tweet_time.replace(minute=0, second=0, microsecond=0)
-        elif time_interval == 'day':
-            # Use the date as the key
-            key = tweet_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        ndarray: 1 for the bins in a burst, 0 for the quiet ones.
+    """
+    size = len(volume)
+    base_rate = max(volume.sum() / size, 1e-9)
+    rates = np.array([base_rate, s * base_rate])
+    # -log Poisson likelihood without the terms that are the same in both states
+    costs = rates[None, :] - volume[:, None] * np.log(rates)[None, :]
+    up_cost = gamma * np.log(max(size, 2))
+
+    quiet_costs = costs[:, 0].tolist()
+    burst_costs = costs[:, 1].tolist()
+    # cheapest total cost ending in each state, and the state each bin came from
+    quiet_total, burst_total = quiet_costs[0], burst_costs[0] + up_cost
+    previous = np.zeros((size, 2), dtype=np.int8)
+    for i in range(1, size):
+        if burst_total < quiet_total:
+            previous[i, 0] = 1
+            new_quiet = burst_total
         else:
-            raise ValueError("Invalid time_interval. Use 'hour' or 'day'.")"""
-        if tweet_time.minute < 30:
-            key = tweet_time.replace(minute=0, second=0, microsecond=0)
+            new_quiet = quiet_total
+        if burst_total <= quiet_total + up_cost:
+            previous[i, 1] = 1
+            new_burst = burst_total
         else:
-            key = tweet_time.replace(minute=30, second=0, microsecond=0)
+            new_burst = quiet_total + up_cost
+        quiet_total, burst_total = new_quiet + quiet_costs[i], new_burst + burst_costs[i]
+
+    states = np.zeros(size, dtype=np.int8)
+    state = int(burst_total < quiet_total)
+    for i in range(size - 1, -1, -1):
+        states[i] = state
+        state = previous[i, state]
+    return states
+
+@instrument.timed()
+def segment_bursts(tweets, bin_ms=60000, s=2.0, gamma=1.0):
+    """
+    Split tweets into contiguous segments, one per burst of tweet volume.
+
+    Timestamps are binned in one vectorized pass, the bursts are found on the binned
+    series with burst_states, and consecutive bursts are separated at the quietest bin
+    of the gap between them. Tweets before the first and after the last burst join the
+    first and last segment, so the segments cover every tweet. The number of segments
+    is the number of bursts found.
+
+    Parameters:
+        tweets (TweetStore): Tweets sorted by timestamp.
+        bin_ms (int): Width of a histogram bin in ms.
+        s (float): How much busier than average a burst has to be.
+        gamma (float): Cost of entering a burst, higher values give fewer segments.
+
+    Returns:
+        list: (start index, end index) ranges over the tweets, in order.
+    """
+    size = len(tweets)
+    if size == 0:
+        return []
+    counts, volume = bin_counts(tweets.timestamps, bin_ms, tweets.weights)
+    states = burst_states(volume.astype(np.float64), s, gamma)
+
+    # bins where a burst starts and ends (exclusive)
+    edges = np.diff(np.concatenate(([0], states, [0])))
+    burst_starts = np.flatnonzero(edges == 1)
+    burst_ends = np.flatnonzero(edges == -1)
+
+    # cut every gap between two bursts at its quietest bin
+    cut_bins = [gap_start + int(np.argmin(volume[gap_start:gap_end]))
+                for gap_start, gap_end in zip(burst_ends[:-1], burst_starts[1:])]
+    # the first tweet of every bin is the number of tweets in the bins before it
+    first_row = np.concatenate(([0], np.cumsum(counts)))
+    boundaries = [0] + [int(first_row[cut]) for cut in cut_bins] + [size]
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+def cluster_tweets_bursts(tweets, bin_ms=60000, s=2.0, gamma=1.0):
+    """
+    Burst segmentation as a drop-in for cluster_tweets_kmeans.
+
+    Returns:
+        dict: The first timestamp of every segment as keys and TweetStore slices
+        (views, nothing is copied) as values.
+    """
+    return {int(tweets.timestamps[start]): tweets[start:end]
+            for start, end in segment_bursts(tweets, bin_ms, s, gamma)}
+
+# bucket widths in ms
+TIME_INTERVALS = {"minute": 60000, "30min": 1800000, "hour": 3600000, "day": 86400000}
+
+def utc_offset_ms(timestamp, tz=None):
+    """
+    UTC offset in ms of a timezone at the given timestamp, the local timezone if tz is None.
+    tz is a tzinfo or an IANA name such as "America/Los_Angeles".
+    """
+    if isinstance(tz, str):
+        tz = ZoneInfo(tz)
+    moment = datetime.fromtimestamp(timestamp / 1000.0, tz)
+    if tz is None:
+        moment = moment.astimezone()
+    return int(moment.utcoffset().total_seconds() * 1000)
+
+@instrument.timed()
+def cluster_by_timestamp(tweets, time_interval='30min', tz=None):
+    """
+    Bucket tweets by wall-clock time interval.
+
+    Every timestamp is shifted to the timezone and floor-divided by the interval in one
+    vectorized pass; bucket boundaries are where that key changes in the sorted column.
+    The offset is taken at the first tweet, a ceremony does not span a DST change.
 
-        # Append the tweet to the corresponding cluster
-        clustered_tweets[key].append(tweet)
+    Parameters:
+        tweets (TweetStore): Tweets sorted by timestamp.
+        time_interval (str or int): 'minute', '30min', 'hour', 'day' or a width in ms.
+        tz (tzinfo or str): Timezone the buckets are aligned to, local time if None.
+
+    Returns:
+        list: (bucket start in ms, start index, end index) of every non-empty bucket.
+    """
+    if time_interval in TIME_INTERVALS:
+        interval = TIME_INTERVALS[time_interval]
+    elif isinstance(time_interval, int) and time_interval > 0:
+        interval = time_interval
+    else:
+        raise ValueError(f"Invalid time_interval. Use one of {list(TIME_INTERVALS)} or a number of ms.")
+    timestamps = tweets.timestamps
+    if len(timestamps) == 0:
+        return []
+
+    offset = utc_offset_ms(int(timestamps[0]), tz)
+    keys = (timestamps + offset) // interval
+    boundaries = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1, [len(keys)]))
+    bucket_starts = keys[boundaries[:-1]] * interval - offset
+    return list(zip(bucket_starts.tolist(), boundaries[:-1].tolist(), boundaries[1:].tolist()))
+
+def bucket_counts(buckets, tz=None):
+    """
+    Number of tweets per bucket of cluster_by_timestamp, keyed by the bucket start as a datetime.
+    """
+    if isinstance(tz, str):
+        tz = ZoneInfo(tz)
+    return {datetime.fromtimestamp(start / 1000.0, tz): end - begin for start, begin, end in buckets}
 
-    return clustered_tweets 
+def visualize(counts):
+    """
+    Plot tweet counts over time.
 
-def visualize(clustered_tweets):
-    timestamp = sorted(clustered_tweets.keys())
-    tweet_count = [len(clustered_tweets[key]) for key in timestamp]
+    Parameters:
+        counts (dict): Time (or cluster key) -> number of tweets.
+    """
+    timestamp = sorted(counts.keys())
+    tweet_count = [counts[key] for key in timestamp]
 
     # Create the line plot
     plt.figure(figsize=(12, 6))
@@ -87,18 +225,16 @@ def visualize(clustered_tweets):
     plt.show()
 
 if __name__ == "__main__":
-        if os.path.exists("cache.pkl"):
-                with open("cache.pkl", "rb") as file:
-                        tweets = pickle.load(file)
-                        clustered_tweets = cluster_by_timestamp(tweets, time_interval='hour')
-                        print(f'number of clusters: {len(clustered_tweets)}')
-                        visualize(clustered_tweets)
-
-                        clustered_tweets_kmeans = cluster_tweets_kmeans(tweets, k=32)
-                        print(f'number of clusters: {len(clustered_tweets_kmeans)}')
-                        visualize(clustered_tweets_kmeans)
-                        
-
-        
-
-
+        # a dump is preprocessed and cached as a tweet file, a tweet file is mapped as it is
+        tweets = preprocess(sys.argv[1] if len(sys.argv) > 1 else "gg2013.json")
+        buckets = cluster_by_timestamp(tweets, time_interval='30min')
+        print(f'number of clusters: {len(buckets)}')
+        visualize(bucket_counts(buckets))
+
+        clustered_tweets_kmeans = cluster_tweets_kmeans(tweets, k=32)
+        print(f'number of clusters: {len(clustered_tweets_kmeans)}')
+        visualize({key: len(cluster) for key, cluster in clustered_tweets_kmeans.items()})
+
+        clustered_tweets_bursts = cluster_tweets_bursts(tweets)
+        print(f'number of segments: {len(clustered_tweets_bursts)}')
+        visualize({key: len(cluster) for key, cluster in clustered_tweets_bursts.items()})
@@ -1,13 +1,131 @@
 import json
-from tweet import Tweet
+from itertools import islice
+from tweet import Tweet, TweetStore, is_tweet_file
+
+READ_BUFFER_SIZE = 1 << 20
+# a record that is still undecodable past this many characters is malformed
+MAX_RECORD_SIZE = 16 << 20
+_decoder = json.JSONDecoder()
+
+
+def iter_records(filename, buffer_size=READ_BUFFER_SIZE):
+    """
+    Stream raw tweet dictionaries from a dump without loading the whole file.
+
+    Handles both a single JSON array ([{...}, {...}]) and newline-delimited
+    JSON ({...}\\n{...}). Only one read buffer plus the record being decoded
+    is held in memory at a time.
+
+    Parameters:
+        filename (str): Path of the JSON / NDJSON dump.
+        buffer_size (int): Number of characters read from disk at a time.
+
+    Yields:
+        dict: One decoded tweet record at a time.
+
+    Raises:
+        json.JSONDecodeError: A record is malformed, or the file ends inside one.
+    """
+    with open(filename, 'r', encoding='utf-8') as file:
+        buffer = file.read(buffer_size)
+        pos = 0
+        eof = not buffer
+
+        # skip leading whitespace to find out which layout the file uses
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            buffer = file.read(buffer_size)
+            pos = 0
+            eof = not buffer
+        is_array = pos < len(buffer) and buffer[pos] == '['
+        if is_array:
+            pos += 1
+
+        while True:
+            # skip separators between records
+            while pos < len(buffer) and (buffer[pos].isspace() or (is_array and buffer[pos] == ',')):
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    return
+                buffer = file.read(buffer_size)
+                pos = 0
+                eof = not buffer
+                continue
+            if is_array and buffer[pos] == ']':
+                return
+
+            try:
+                record, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as error:
+                # no JSON token spans a line, so an error followed by a line break is a
+                # malformed record rather than one cut off by the end of the buffer
+                if eof or buffer.find("\n", error.pos) != -1 or len(buffer) - pos > MAX_RECORD_SIZE:
+                    raise
+                # the record runs past the end of the buffer, read more and retry
+                chunk = file.read(buffer_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+
+def iter_chunks(filename, chunk_size=10000):
+    """
+    Group the streamed records of a dump into lists of at most chunk_size.
+
+    Parameters:
+        filename (str): Path of the JSON / NDJSON dump.
+        chunk_size (int): Maximum number of records per chunk.
+
+    Yields:
+        list: Lists of raw tweet dictionaries.
+    """
+    records = iter_records(filename)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def load_data(filename, load_length = None):
-    
-    with open(filename, 'r') as file:
-        data = json.load(file)
+    """
+    Load raw tweets from a JSON / NDJSON dump into Tweet objects.
+
+    A tweet file (see save_data) is mapped instead of parsed and comes back as a
+    TweetStore, which iterates and indexes like the list of Tweet objects.
+
+    Parameters:
+        filename (str): Path of the dump or tweet file.
+        load_length (int): Only load the first load_length tweets if given.
+
+    Returns:
+        list: A list of Tweet objects, or a TweetStore for a tweet file.
+    """
+    if is_tweet_file(filename):
+        return TweetStore.open(filename)[:load_length]
     tweets = []
-    for tweet in data:
+    for tweet in islice(iter_records(filename), load_length):
         new_tweet  = Tweet( id = tweet['id'], text = tweet['text'], user = tweet['user'],
         timestamp = tweet['timestamp_ms'])
         tweets.append(new_tweet)
     return tweets
 
+
+def save_data(filename, tweets):
+    """
+    Write tweets to a tweet file that load_data maps back without parsing.
+
+    Parameters:
+        filename (str): Path of the tweet file.
+        tweets: A TweetStore, or Tweet objects as returned by load_data.
+    """
+    if not isinstance(tweets, TweetStore):
+        tweets = TweetStore.from_tweets(tweets)
+    tweets.save(filename)
@@ -0,0 +1,183 @@
+"""
+Collapse exact and near-duplicate tweets before the NLP stages.
+
+Exact duplicates are grouped by a hash of their text. Near-duplicates are found with
+MinHash signatures over word shingles and locality-sensitive hashing on signature bands.
+Each group keeps its earliest tweet as the representative, with the group size as its
+weight, so the extractors count a copy-pasted tweet once per copy while parsing it once.
+A tweet only joins a group within a time window after the group's first tweet, so the
+representatives keep the timing of the stream; the window slides with the groups, so
+copies a few seconds apart are merged even if they straddle a minute boundary.
+"""
+import re
+import zlib
+import numpy as np
+
+word_pattern = re.compile(r"\w+")
+
+# Mersenne prime used for the MinHash permutations
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK = np.uint64((1 << 32) - 1)
+
+
+class DuplicateGroups:
+    """
+    Result of collapse_duplicates.
+
+    Attributes:
+        representatives (ndarray): Row of each group's representative in the input store.
+        weights (ndarray): Number of tweets in each group.
+        member_rows (ndarray): Input rows of all members, grouped, each group in row order.
+        member_offsets (ndarray): Group i owns member_rows[member_offsets[i]:member_offsets[i + 1]].
+    """
+
+    def __init__(self, representatives, weights, member_rows, member_offsets):
+        self.representatives = representatives
+        self.weights = weights
+        self.member_rows = member_rows
+        self.member_offsets = member_offsets
+
+    def __len__(self):
+        return len(self.representatives)
+
+    def members(self, group):
+        return self.member_rows[self.member_offsets[group]:self.member_offsets[group + 1]]
+
+    def timestamps(self, store, group):
+        """
+        Timestamps of every tweet in a group, taken from the store that was collapsed.
+        """
+        return store.timestamps[self.members(group)]
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            # the smaller row becomes the root, so a group's root is its earliest tweet
+            if b < a:
+                a, b = b, a
+            self.parent[b] = a
+
+
+def _shingles(text, size):
+    words = word_pattern.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures from word shingles, with a fixed seed so runs are reproducible.
+    """
+
+    def __init__(self, num_perm=64, shingle_size=2, seed=0):
+        rng = np.random.default_rng(seed)
+        # a < 2^29 and hashes < 2^32 keep a * h + b below 2^64
+        self.a = rng.integers(1, 1 << 29, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in _shingles(text, self.shingle_size)),
+            dtype=np.uint64,
+        )
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _PRIME
+        return (permuted & _MASK).min(axis=1)
+
+
+def collapse_duplicates(tweets, near=True, window_ms=60000, threshold=0.8, num_perm=64, bands=16):
+    """
+    Collapse duplicate tweets in a store into weighted representatives.
+
+    Parameters:
+        tweets (TweetStore): Tweets sorted by timestamp.
+        near (bool): Also merge near-duplicates with MinHash/LSH, not only exact copies.
+        window_ms (int): A tweet is only merged into a group whose first tweet is at most
+            this many ms older, so the representatives keep the timing of the stream.
+            None merges across the whole store.
+        threshold (float): Minimum estimated Jaccard similarity of near-duplicates.
+        num_perm (int): Number of MinHash permutations.
+        bands (int): Number of LSH bands, num_perm must be divisible by it.
+
+    Returns:
+        tuple: (TweetStore of representatives with a weights column, DuplicateGroups).
+    """
+    size = len(tweets)
+    if size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        duplicate_groups = DuplicateGroups(empty, empty.astype(np.int32), empty, np.zeros(1, dtype=np.int64))
+        return tweets.with_weights(duplicate_groups.weights), duplicate_groups
+    base_weights = np.ones(size, dtype=np.int64) if tweets.weights is None else tweets.weights.astype(np.int64)
+    timestamps = tweets.timestamps.tolist()
+    groups = _UnionFind(size)
+
+    def in_window(first, row):
+        # the root of a group is its earliest tweet
+        return not window_ms or timestamps[row] - timestamps[groups.find(first)] <= window_ms
+
+    # exact duplicates: same text within the window of the group's first tweet; a copy
+    # after the window starts a new group
+    first_row = {}
+    unique_rows = []
+    for row, text in enumerate(tweets.texts()):
+        key = hash(text)
+        first = first_row.get(key)
+        if first is not None and tweets.text(first) == text and in_window(first, row):
+            groups.union(first, row)
+        else:
+            if first is None or tweets.text(first) == text:
+                first_row[key] = row
+            unique_rows.append(row)
+
+    # near duplicates among the exact-unique tweets
+    if near and len(unique_rows) > 1:
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands.")
+        rows_per_band = num_perm // bands
+        hasher = MinHasher(num_perm)
+        buckets = {}
+        signatures = {}
+        for row in unique_rows:
+            signature = hasher.signature(tweets.text(row))
+            signatures[row] = signature
+            for band in range(bands):
+                key = (band, signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes())
+                head = buckets.setdefault(key, row)
+                if head == row:
+                    continue
+                if not in_window(head, row):
+                    # the bucket's group is too old, later tweets are compared with this one
+                    buckets[key] = row
+                elif groups.find(head) != groups.find(row):
+                    # verify the candidate pair with the full signature
+                    if np.mean(signatures[head] == signature) >= threshold:
+                        groups.union(head, row)
+
+    roots = np.fromiter((groups.find(row) for row in range(size)), dtype=np.int64, count=size)
+    # stable sort keeps the members of each group in row order
+    member_rows = np.argsort(roots, kind="stable")
+    sorted_roots = roots[member_rows]
+    boundaries = np.flatnonzero(np.diff(sorted_roots)) + 1
+    member_offsets = np.concatenate(([0], boundaries, [size])).astype(np.int64)
+    representatives = sorted_roots[member_offsets[:-1]]
+    weights = np.add.reduceat(base_weights[member_rows], member_offsets[:-1])
+
+    duplicate_groups = DuplicateGroups(representatives, weights.astype(np.int32), member_rows, member_offsets)
+    collapsed = tweets.take(representatives).with_weights(duplicate_groups.weights)
+    return collapsed, duplicate_groups
@@ -0,0 +1,129 @@
+"""
+Parse-once cache of spaCy documents shared by the extraction stages.
+"""
+import os
+import numpy as np
+from spacy.tokens import DocBin
+import instrument
+
+DOC_CACHE_FILE = "docs.spacy"
+
+
+def doc_key(tweet):
+    """
+    Cache key of a tweet: its id, or its text for a tweet without an id, such as a
+    Tweet built by hand.
+    """
+    if tweet.id is None:
+        return "text:" + tweet.text
+    return int(tweet.id)
+
+
+class DocCache:
+    """
+    Cache of parsed spaCy docs keyed by tweet id (see doc_key).
+
+    Tweets are parsed in batches with nlp.pipe the first time they are requested and
+    every later lookup reuses the stored doc. The per-token tensors are dropped after
+    parsing, since the Matcher and the entity checks only need the token attributes
+    and entities. The cache serializes through DocBin, so it can be written to disk
+    or sent to a worker process and read back with the same vocabulary.
+    """
+
+    def __init__(self, nlp, batch_size=1000, n_process=1):
+        self.nlp = nlp
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.docs = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, tweet_id):
+        return int(tweet_id) in self.docs
+
+    def parse(self, tweets):
+        """
+        Parse every tweet that is not cached yet, in nlp.pipe batches.
+
+        Parameters:
+            tweets (TweetStore or list): Tweets to make available in the cache.
+
+        Returns:
+            int: Number of tweets that had to be parsed.
+        """
+        missing_ids = []
+        missing_texts = []
+        for tweet in tweets:
+            tweet_id = doc_key(tweet)
+            if tweet_id not in self.docs:
+                missing_ids.append(tweet_id)
+                missing_texts.append(tweet.text)
+
+        instrument.count("doccache.parsed", len(missing_ids))
+        instrument.count("doccache.hits", len(tweets) - len(missing_ids))
+        docs = self.nlp.pipe(missing_texts, batch_size=self.batch_size, n_process=self.n_process)
+        for tweet_id, doc in zip(missing_ids, docs):
+            doc.tensor = np.zeros((0,), dtype="float32")
+            doc.user_data["tweet_id"] = tweet_id
+            self.docs[tweet_id] = doc
+        return len(missing_ids)
+
+    def get(self, tweet):
+        """
+        Parsed doc of a tweet, parsing it on a cache miss.
+        """
+        tweet_id = doc_key(tweet)
+        doc = self.docs.get(tweet_id)
+        if doc is None:
+            self.parse([tweet])
+            doc = self.docs[tweet_id]
+        return doc
+
+    def iter_docs(self, tweets):
+        """
+        Yield (tweet, doc) pairs, batch-parsing the tweets that are missing first.
+        """
+        tweets = list(tweets)
+        self.parse(tweets)
+        for tweet in tweets:
+            yield tweet, self.docs[doc_key(tweet)]
+
+    def subset(self, tweet_ids):
+        """
+        New cache holding only the docs of the given tweet ids that are cached here.
+        """
+        cache = DocCache(self.nlp, self.batch_size, self.n_process)
+        for tweet_id in tweet_ids:
+            doc = self.docs.get(int(tweet_id))
+            if doc is not None:
+                cache.docs[int(tweet_id)] = doc
+        return cache
+
+    def to_bytes(self):
+        doc_bin = DocBin(store_user_data=True)
+        for doc in self.docs.values():
+            doc_bin.add(doc)
+        return doc_bin.to_bytes()
+
+    @classmethod
+    def from_bytes(cls, nlp, data, batch_size=1000, n_process=1):
+        cache = cls(nlp, batch_size, n_process)
+        for doc in DocBin().from_bytes(data).get_docs(nlp.vocab):
+            tweet_id = doc.user_data["tweet_id"]
+            cache.docs[tweet_id if isinstance(tweet_id, str) else int(tweet_id)] = doc
+        return cache
+
+    def to_disk(self, path=DOC_CACHE_FILE):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def from_disk(cls, nlp, path=DOC_CACHE_FILE, batch_size=1000, n_process=1):
+        """
+        Load a cache written by to_disk, or return an empty cache if the file is missing.
+        """
+        if not os.path.exists(path):
+            return cls(nlp, batch_size, n_process)
+        with open(path, "rb") as file:
+            return cls.from_bytes(nlp, file.read(), batch_size, n_process)
@@ -0,0 +1,249 @@
+"""
+Score results against the answer file and compare speed profiles.
+
+    python evaluate.py result.json                     # score one result
+    python evaluate.py --profiles full,sample_10       # run profiles on gg2013.json
+    python evaluate.py --synthetic 100000 --profiles all
+    python evaluate.py --names 20000                   # fast vs spacy name backends
+
+Hosts, award names, winners, nominees and presenters are matched with fuzzywuzzy's
+token_sort_ratio, so "amy poehler" matches "Amy Poehler" and "Amy Poehlers". Every
+answer award is paired with the most similar found award; winner, nominee and presenter
+scores of an answer award without a match count as 0. Running profiles prints a table
+of each profile's runtime next to its scores, so the accuracy cost of a speed option
+can be read off next to its speedup. The name backends are compared the same way on a
+labeled sample: the precision and recall of the names each one extracts, next to its
+runtime.
+"""
+import argparse
+import json
+import os
+import sys
+from time import perf_counter
+
+from fuzzywuzzy import fuzz
+
+ANSWERS_FILE = "gg2013answers.json"
+# minimum similarity (0-100) of two names / two award names to count as the same
+NAME_THRESHOLD = 80
+AWARD_THRESHOLD = 70
+
+# keyword arguments of frame.run_pipeline for each named profile
+PROFILES = {
+    "full": {},
+    "no_dedup": {"dedup": False},
+    "kmeans": {"cluster": "kmeans"},
+    "timestamp": {"cluster": "timestamp"},
+    "sample_50": {"sample_rate": 0.5},
+    "sample_10": {"sample_rate": 0.1},
+    "no_ner": {"ner": False},
+    "fast_names": {"names": "fast"},
+}
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split()) if text else ""
+
+
+def similarity(a, b):
+    return fuzz.token_sort_ratio(normalize(a), normalize(b))
+
+
+def match_pairs(predicted, expected, threshold):
+    """
+    One-to-one fuzzy matching, most similar pairs first.
+
+    Returns:
+        list: (predicted index, expected index, similarity) of the matched pairs.
+    """
+    candidates = sorted(
+        ((similarity(p, e), i, j) for i, p in enumerate(predicted) for j, e in enumerate(expected)),
+        reverse=True,
+    )
+    used_predicted, used_expected = set(), set()
+    pairs = []
+    for score, i, j in candidates:
+        if score < threshold:
+            break
+        if i not in used_predicted and j not in used_expected:
+            used_predicted.add(i)
+            used_expected.add(j)
+            pairs.append((i, j, score))
+    return pairs
+
+
+def list_scores(predicted, expected, threshold=NAME_THRESHOLD):
+    """
+    Precision, recall and F1 of a predicted list of names against the expected one.
+    """
+    predicted = [name for name in predicted or () if name]
+    expected = list(expected or ())
+    if not predicted and not expected:
+        return 1.0, 1.0, 1.0
+    matched = len(match_pairs(predicted, expected, threshold))
+    precision = matched / len(predicted) if predicted else 0.0
+    recall = matched / len(expected) if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def score(result, answers, name_threshold=NAME_THRESHOLD, award_threshold=AWARD_THRESHOLD):
+    """
+    Score a save_json result against answers in the gg2013answers.json format.
+
+    Returns:
+        dict: hosts_f1, awards_precision, awards_recall, winner, nominees_f1,
+        presenters_f1 (all 0-1), and their mean as overall.
+    """
+    hosts_f1 = list_scores(result.get("Hosts", []), answers["hosts"], name_threshold)[2]
+
+    found = result.get("Award data", [])
+    expected_awards = list(answers["award_data"])
+    pairs = match_pairs([entry["Award"] for entry in found], expected_awards, award_threshold)
+    awards_precision = len(pairs) / len(found) if found else 0.0
+    awards_recall = len(pairs) / len(expected_awards) if expected_awards else 0.0
+
+    winner = nominees = presenters = 0.0
+    for i, j, _ in pairs:
+        entry, expected = found[i], answers["award_data"][expected_awards[j]]
+        if entry.get("Winner") and similarity(entry["Winner"], expected["winner"]) >= name_threshold:
+            winner += 1
+        nominees += list_scores(entry.get("Nominees"), expected["nominees"], name_threshold)[2]
+        presenters += list_scores(entry.get("Presenters"), expected["presenters"], name_threshold)[2]
+    total = max(len(expected_awards), 1)
+
+    scores = {
+        "hosts_f1": hosts_f1,
+        "awards_precision": awards_precision,
+        "awards_recall": awards_recall,
+        "winner": winner / total,
+        "nominees_f1": nominees / total,
+        "presenters_f1": presenters / total,
+    }
+    scores["overall"] = sum(scores.values()) / len(scores)
+    return {key: round(value, 4) for key, value in scores.items()}
+
+
+def run_profiles(filename, answers, profiles, checkpoints=None):
+    """
+    Run frame.run_pipeline under each profile and score the results. Checkpoints are
+    off unless a store is given, so the runtimes are those of a cold run.
+
+    Returns:
+        dict: Profile name -> {"seconds": total runtime, "timings": per step, "scores": ...}.
+    """
+    import frame
+    from checkpoint import CheckpointStore
+    if checkpoints is None:
+        checkpoints = CheckpointStore(enabled=False)
+    rows = {}
+    for name in profiles:
+        result, timings = frame.run_pipeline(filename, output=None, checkpoints=checkpoints, **PROFILES[name])
+        rows[name] = {"seconds": round(timings["total"], 2), "timings": timings, "scores": score(result, answers)}
+    return rows
+
+
+def name_backend_scores(texts, labels, nlp, backends=("spacy", "fast"), name_threshold=NAME_THRESHOLD):
+    """
+    Run each name extractor backend on labeled texts and score the names it finds.
+
+    Parameters:
+        texts (list): Tweet texts.
+        labels (list): The names each text mentions, e.g. from synthetic.labeled_names.
+        nlp (Language): NER pipeline the backends use.
+        backends (tuple): Backend names, see nameextract.get_name_extractor.
+
+    Returns:
+        dict: Backend -> {"seconds", "precision", "recall", "f1"}, counted over all
+        (text, name) pairs, and the recall of every backend relative to the first one.
+    """
+    from nameextract import get_name_extractor
+    rows = {}
+    for backend in backends:
+        extractor = get_name_extractor(backend, nlp)
+        start = perf_counter()
+        found = extractor.extract(texts)
+        seconds = perf_counter() - start
+        matched = sum(len(match_pairs(names, expected, name_threshold)) for names, expected in zip(found, labels))
+        predicted = sum(len(names) for names in found)
+        expected = sum(len(names) for names in labels)
+        precision = matched / predicted if predicted else 0.0
+        recall = matched / expected if expected else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        rows[backend] = {"seconds": round(seconds, 3), "precision": round(precision, 4),
+                         "recall": round(recall, 4), "f1": round(f1, 4)}
+    reference = rows[backends[0]]["recall"]
+    for row in rows.values():
+        row["relative_recall"] = round(row["recall"] / reference, 4) if reference else 0.0
+    return rows
+
+
+def print_name_table(rows):
+    columns = ["precision", "recall", "f1", "relative_recall"]
+    print(f"{'backend':<12} {'seconds':>9} " + " ".join(f"{column:>15}" for column in columns))
+    for name, row in rows.items():
+        print(f"{name:<12} {row['seconds']:>9.2f} " + " ".join(f"{row[column]:>15.3f}" for column in columns))
+
+
+def print_table(rows):
+    columns = ["hosts_f1", "awards_recall", "winner", "nominees_f1", "presenters_f1", "overall"]
+    print(f"{'profile':<12} {'seconds':>9} " + " ".join(f"{column:>14}" for column in columns))
+    for name, row in rows.items():
+        print(f"{name:<12} {row['seconds']:>9.2f} " + " ".join(f"{row['scores'][column]:>14.3f}" for column in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score results against the answers and compare speed profiles.")
+    parser.add_argument("result", nargs="?", help="result.json to score")
+    parser.add_argument("--answers", default=ANSWERS_FILE)
+    parser.add_argument("--data", default="gg2013.json", help="tweet dump the profiles run on")
+    parser.add_argument("--profiles", help=f"comma separated, from {', '.join(PROFILES)}, or all")
+    parser.add_argument("--synthetic", type=int, metavar="COUNT",
+                        help="run the profiles on COUNT synthetic tweets and their answers instead")
+    parser.add_argument("--checkpoints", action="store_true",
+                        help="reuse stage checkpoints; the runtimes then leave out the loaded stages")
+    parser.add_argument("--names", type=int, metavar="COUNT",
+                        help="compare the name backends on COUNT labeled synthetic tweets")
+    parser.add_argument("--output", help="write the scores to this JSON file")
+    arguments = parser.parse_args()
+
+    if arguments.result:
+        with open(arguments.result) as file:
+            result = json.load(file)
+        with open(arguments.answers) as file:
+            answers = json.load(file)
+        report = score(result, answers)
+        for key, value in report.items():
+            print(f"{key:<18} {value:.3f}")
+    elif arguments.profiles:
+        names = list(PROFILES) if arguments.profiles == "all" else arguments.profiles.split(",")
+        unknown = set(names) - set(PROFILES)
+        if unknown:
+            parser.error(f"unknown profiles: {', '.join(sorted(unknown))}")
+        from checkpoint import CheckpointStore
+        checkpoints = CheckpointStore(enabled=arguments.checkpoints)
+        if arguments.synthetic:
+            import synthetic
+            filename = f"synthetic_{arguments.synthetic}.json"
+            if not os.path.exists(filename):
+                synthetic.write_tweets(filename, arguments.synthetic)
+            answers = synthetic.answers()
+            report = run_profiles(filename, answers, names, checkpoints)
+        else:
+            with open(arguments.answers) as file:
+                answers = json.load(file)
+            report = run_profiles(arguments.data, answers, names, checkpoints)
+        print_table(report)
+    elif arguments.names:
+        import synthetic
+        from models import get_nlp
+        texts, labels = synthetic.labeled_names(arguments.names)
+        report = name_backend_scores(texts, labels, get_nlp("names"))
+        print_name_table(report)
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=4)
@@ -1,6 +1,4 @@
-from data import load_data
-from tweet import Tweet
-import spacy
+from tweet import Tweet, TweetStore
 import re
 from fuzzywuzzy import process
 import time
@@ -9,11 +7,75 @@ import json
 from collections import defaultdict
 from spacy.matcher import Matcher
 from imdb import Cinemagoer
-from concurrent.futures import ProcessPoolExecutor
-from clustering import cluster_by_timestamp, cluster_tweets_kmeans
-from datetime import datetime
+from clustering import cluster_by_timestamp, cluster_tweets_kmeans, segment_bursts
 from bisect import bisect_left, bisect_right
+from doccache import DocCache
+from models import get_nlp, MODEL_NAME
+from dedup import collapse_duplicates
+from tweetindex import InvertedIndex, clause_terms
+from awardmatch import AwardMatcher
+from sweep import IntervalSweep, sweep_tweets
+from scheduler import SegmentRunner
+from aggregates import award_stats_from_results, merge_award_stats, finalize_award_stats
+from names import NameResolver
+from gazetteer import get_gazetteer, GAZETTEER_FILE
+from nameextract import NameExtractor, person_names, get_name_extractor
+from checkpoint import CheckpointStore, dependencies
+import spacy
 import os
+import numpy as np
+from functools import partial
+import instrument
+
+# collapse exact and near-duplicate tweets before any NLP work
+DEDUP_TWEETS = True
+
+# awards mentioned fewer times are not reported, and get no nominees or presenters
+AWARD_MIN_COUNT = 2
+
+# segments with more tweets are split into several worker tasks. A constant, so the
+# parts, and the order their stats merge in, do not depend on the machine
+MAX_TASK_ROWS = 5000
+
+# keyword clauses each extractor needs, a clause being terms that must all occur.
+# They are derived from the regex / Matcher patterns of the extractors below.
+HOST_CLAUSES = [("host",), ("hosts",), ("hosted",), ("hosting",)]
+AWARD_CLAUSES = [("best",)]
+NOMINEE_CLAUSES = [("nominated", "for"), ("nominee",), ("up", "for")]
+PRESENTER_CLAUSES = [("presents",), ("announces",), ("to", "present")]
+INDEX_TERMS = clause_terms(HOST_CLAUSES, AWARD_CLAUSES, NOMINEE_CLAUSES, PRESENTER_CLAUSES)
+
+# pattern that contains the word host.
+HOST_PATTERN = re.compile(r"\bhost(s|ed|ing)?\b", re.IGNORECASE)
+
+# Matcher patterns of the extractors
+AWARD_PATTERNS = [
+    [
+        {"IS_TITLE": True, "LOWER": "best"},
+        {"IS_TITLE": True, "POS": "PROPN"},
+        {"TEXT": "-", "OP": "?"},
+        {"IS_TITLE": True, "POS": {"IN": ["PROPN", "NOUN", "ADJ"]}, "OP": "?"}
+    ],
+    [
+        {"IS_TITLE": True, "LOWER": "best"},
+        {"IS_TITLE": True, "LOWER": "performance"},
+        {"LOWER": "by"},
+        {"IS_TITLE": True, "LOWER": {"IN": ["actor", "actress"]}},
+        {"LOWER": "in"},
+        {"POS": {"IN": ["PROPN", "VERB", "NOUN"]}, "OP": "+"}
+    ]
+]
+# Patterns to capture nominee phrases
+NOMINEE_PATTERNS = [
+    [{"IS_TITLE": True}, {"LOWER": "nominated"}, {"LOWER": "for"}, {"IS_TITLE": True, "OP": "+"}],   # "X nominated for Y"
+    [{"IS_TITLE": True}, {"LOWER": "nominee"}, {"IS_PUNCT": True, "OP": "?"}, {"IS_TITLE": True, "OP": "+"}],  # "X nominee: Y"
+    [{"IS_TITLE": True, "OP": "+"}, {"LOWER": "up"}, {"LOWER": "for"}, {"IS_TITLE": True, "OP": "+"}],  # "X up for Y"
+]
+PRESENTER_PATTERNS = [
+    [{"IS_TITLE": True}, {"LOWER": "presents"}, {"IS_TITLE": True, "OP": "+"}],
+    [{"IS_TITLE": True}, {"LOWER": "announces"}, {"IS_TITLE": True, "OP": "+"}],
+    [{"IS_TITLE": True}, {"LOWER": "to"}, {"LOWER": "present"}, {"IS_TITLE": True, "OP": "+"}],
+]
 
 # Load the spaCy model outside of the function if possible
 def extract_names(text, nlp_model): 
@@ -22,22 +84,31 @@ def extract_names(text, nlp_model):
 
     Parameters:
     text (str): The input sentence or text to analyze.
+    nlp_model: A spaCy pipeline, or a NameExtractor backend (see nameextract.py).
 
     Returns:
     List of extracted names.
     """
+    if isinstance(nlp_model, NameExtractor):
+        return nlp_model.extract_one(text)
     # Process the text using spaCy NLP pipeline
     doc = nlp_model(text)
-    names = []
-    # Extract and print entities labeled as PERSON
-    names = [
-    ent.text for ent in doc.ents 
-    if ent.label_ == "PERSON" 
-    and len(ent.text.split()) < 3 
-    and not ent.text.endswith("'s")
-]
-    return names
+    return extract_names_from_doc(doc)
+
+def extract_names_from_doc(doc):
+    """
+    Extracts the names (PERSON entities) from an already parsed document.
+
+    Parameters:
+    doc (Doc): A parsed spaCy document, e.g. from the DocCache.
 
+    Returns:
+    List of extracted names.
+    """
+    # PERSON entities of at most two words, without possessives
+    return person_names(doc)
+
+@instrument.timed()
 def merge_name_counts(name_dict, threshold=90):
     """
     Merges counts from first names and full names.
@@ -50,11 +121,13 @@ def merge_name_counts(name_dict, threshold=90):
     dict: A new dictionary with merged names and their counts.
     """
     merged_dict = {}
+    comparisons = 0
 
     # Process each name in the original dictionary.
     for name, count in name_dict.items():
         # If there are already names in merged_dict, try to find the closest match.
         if merged_dict:
+            comparisons += len(merged_dict)
             closest_match, score = process.extractOne(name, merged_dict.keys())
             if score >= threshold:
                 if len(closest_match) >= len(name):
@@ -69,50 +142,118 @@ def merge_name_counts(name_dict, threshold=90):
             # If merged_dict is empty, add one element into it.
             merged_dict[name] = count
 
+    instrument.count("names.fuzzy_comparisons", comparisons)
     return merged_dict
-def find_host_candidate(tweets: list[Tweet], top_num_show = None) -> dict:
+def ensure_index(tweets, index):
+    """
+    Inverted index over the extractor keywords, built once if the caller has none.
+    Plain lists of tweets are scanned instead.
+    """
+    if index is None and isinstance(tweets, TweetStore):
+        index = InvertedIndex.build(tweets, INDEX_TERMS)
+    return index
+
+def candidate_tweets(tweets, index, clauses, start_timestamp=None, end_timestamp=None):
+    """
+    Tweets that contain one of the keyword clauses, optionally within a time range,
+    read from the inverted index instead of scanning the whole corpus.
+
+    Parameters:
+        tweets (TweetStore or list): Tweets sorted by timestamp.
+        index (InvertedIndex): Index built over tweets, or None for a plain list.
+        clauses (list): Keyword clauses, see InvertedIndex.lookup.
+
+    Returns:
+        TweetStore or list: The candidate tweets in timestamp order.
+    """
+    if index is None:
+        if start_timestamp is None and end_timestamp is None:
+            return tweets
+        return filter_tweets_by_timestamp(tweets, start_timestamp, end_timestamp)
+    return tweets.take(index.lookup(clauses, start_timestamp, end_timestamp))
+
+def could_match_award(text):
+    """
+    Lexical gate in front of the award Matcher. Both AWARD_PATTERNS start with a
+    title-cased "best" token, which can only be the text "Best", followed by another
+    title-cased token, which holds an upper- or titlecase letter. A tweet without
+    "Best" followed somewhere by such a letter cannot match and is not parsed.
+    """
+    position = text.find("Best")
+    if position < 0:
+        return False
+    rest = text[position + 4:]
+    # lower() catches the usual capitals, the scan the few without a lowercase form
+    return rest != rest.lower() or (not rest.isascii() and any(ch.istitle() for ch in rest))
+
+def gate_award_tweets(tweets):
+    """
+    The tweets that pass could_match_award, as a store or a list like the input.
+    """
+    if isinstance(tweets, TweetStore):
+        return tweets.take([row for row, text in enumerate(tweets.texts()) if could_match_award(text)])
+    return [tweet for tweet in tweets if could_match_award(tweet.text)]
+
+@instrument.timed()
+def find_host_candidate(tweets: TweetStore, top_num_show = None, doc_cache = None, index = None, resolver = None,
+                        name_extractor = None) -> dict:
     """
     find possible host candidate who can potentially be a ceremony host
     
     Parameters:
-    tweets: A list contains Tweet data structure.
+    tweets: A TweetStore (or list) of tweets.
     top_num_show: show top n numbers of candidates instead of the whole list.
+    doc_cache: DocCache with the parsed tweets; a local one is used if not given.
+    index: InvertedIndex over tweets; built here if not given.
+    resolver: NameResolver used to merge the name counts; merge_name_counts if not given.
+    name_extractor: NameExtractor backend that finds the names instead of the parsed
+    docs, e.g. get_name_extractor("fast", nlp); doc_cache is not used then.
 
     returns:
     A dictionary that ranks the possible host possible candidates from high to low based
     on appearance time.
     """
 
-    # pattern that contains the word host.
-    pattern = r"\bhost(s|ed|ing)?\b"
     irrelevent_words = ["host", "hosted", "hosting", "hosts", "golden globes"]
 
-    # Load the small English language model
-    nlp = spacy.load("en_core_web_sm")
+    if doc_cache is None and name_extractor is None:
+        # Small English model with only the NER component, loaded once per process
+        doc_cache = DocCache(get_nlp("hosts"))
+    # only tweets with the host keyword are parsed, all of them in one batch.
+    # The index narrows the candidates down, the pattern still decides.
+    candidates = candidate_tweets(tweets, ensure_index(tweets, index), HOST_CLAUSES)
+    host_tweets = [tweet for tweet in candidates if HOST_PATTERN.search(tweet.text)]
+    instrument.count("hosts.candidates", len(candidates))
+    instrument.count("hosts.pattern_matches", len(host_tweets))
     # dictionary of possible host candidate
     host_candidate = {}
-    for tweet in tweets:
-        text = tweet.text
-        # if there is host keyword and there is a person name in the sentence,
-        # add it to the candidate dictionary.
-        if bool(re.search(pattern, text, re.IGNORECASE)):
-            name_list = extract_names(text, nlp)
-            for name in name_list:
-                if name not in host_candidate:
-                    host_candidate[name] = 1
-                else:
-                    host_candidate[name] += 1
-                    
-    merged_host_candidate = merge_name_counts(host_candidate)
+    # if there is host keyword and there is a person name in the sentence,
+    # add it to the candidate dictionary.
+    if name_extractor is not None:
+        tweet_names = zip(host_tweets, name_extractor.extract([tweet.text for tweet in host_tweets]))
+    else:
+        tweet_names = ((tweet, extract_names_from_doc(doc)) for tweet, doc in doc_cache.iter_docs(host_tweets))
+    for tweet, name_list in tweet_names:
+        # a collapsed duplicate counts once for every tweet it stands for
+        for name in name_list:
+            if name not in host_candidate:
+                host_candidate[name] = tweet.weight
+            else:
+                host_candidate[name] += tweet.weight
+
+    if resolver is not None:
+        merged_host_candidate = resolver.merge(host_candidate)
+    else:
+        merged_host_candidate = merge_name_counts(host_candidate)
     #add a top numbers option, which is, show only specific numbers of top possible candidate
     if top_num_show:
            sorted_host_candidate = clean_dict_keys(dict(
         sorted(merged_host_candidate.items(), key=lambda item: item[1], reverse=True)[:top_num_show]
-        ))
+        ), resolver)
     else:
         sorted_host_candidate = clean_dict_keys(dict(
             sorted(merged_host_candidate.items(), key=lambda item: item[1], reverse=True)
-            ))
+            ), resolver)
     sorted_host_candidate = {k: v for k, v in sorted_host_candidate.items() if k.lower() not in irrelevent_words}
     return sorted_host_candidate
 
@@ -123,9 +264,10 @@ def clean_key(key):
     cleaned_key = re.sub(r"\Ws|\W+", ' ', key).strip()
     return cleaned_key
 
-def clean_dict_keys(input_dict):
+def clean_dict_keys(input_dict, resolver=None):
     """
-    Cleans the keys of the given dictionary
+    Cleans the keys of the given dictionary. With a NameResolver the cleaned
+    keys that refer to the same name are merged as well.
     """
     cleaned_dict = {}
 
@@ -139,45 +281,37 @@ def clean_dict_keys(input_dict):
         else:
             cleaned_dict[cleaned_key] = value
 
+    if resolver is not None:
+        cleaned_dict = resolver.merge(cleaned_dict)
     return cleaned_dict
 
 
 # print(find_host_candidate(All_Tweets, 5))
 
-def find_awards(all_tweets: list) -> dict:
+@instrument.timed()
+def find_awards(all_tweets: TweetStore, doc_cache = None, index = None, min_count = AWARD_MIN_COUNT) -> dict:
     """
     Find possible awards among all tweets.
 
     Parameters:
-        all_tweets (list): The dataset of all the tweets.
+        all_tweets (TweetStore): The dataset of all the tweets.
+        doc_cache (DocCache): Parsed tweets; a local cache is used if not given.
+        index (InvertedIndex): Index over all_tweets; built here if not given.
+        min_count (int): Awards mentioned fewer times are discarded. Segments of a
+            larger run keep every award (1) and leave the cut to the merged counts.
     
     Returns:
         dict: A dictionary of detected awards and their counts.
     """
-    nlp = spacy.load("en_core_web_sm")
+    if doc_cache is None:
+        doc_cache = DocCache(get_nlp("awards"))
+    nlp = doc_cache.nlp
+    # offline title gazetteer for the movie fallback, None if it has not been built
+    gazetteer = get_gazetteer()
 
-    # Initialize the Matcher
+    # Initialize the Matcher with the award patterns
     matcher = Matcher(nlp.vocab)
-    # Define award patterns
-    award_patterns = [
-    [
-        {"IS_TITLE": True, "LOWER": "best"},
-        {"IS_TITLE": True, "POS": "PROPN"},
-        {"TEXT": "-", "OP": "?"},
-        {"IS_TITLE": True, "POS": {"IN": ["PROPN", "NOUN", "ADJ"]}, "OP": "?"}
-    ],
-    [
-        {"IS_TITLE": True, "LOWER": "best"},
-        {"IS_TITLE": True, "LOWER": "performance"},
-        {"LOWER": "by"},
-        {"IS_TITLE": True, "LOWER": {"IN": ["actor", "actress"]}},
-        {"LOWER": "in"},
-        {"POS": {"IN": ["PROPN", "VERB", "NOUN"]}, "OP": "+"}
-    ]
-]
-
-    # Add the patterns to the matcher
-    matcher.add("AWARD", award_patterns)
+    matcher.add("AWARD", AWARD_PATTERNS)
 
     # Use defaultdict to store awards and winners for better performance
     detected_awards = defaultdict(lambda: {
@@ -187,48 +321,42 @@ def find_awards(all_tweets: list) -> dict:
         "end_timestamp": None
     })
 
-    # Use nlp.pipe() for faster batch processing
-    for tweet in all_tweets:
-        doc = nlp(tweet.text)
-        matches = matcher(doc)
-        
+    # Both patterns start with the token "best", only tweets containing it can match,
+    # and of those only the ones passing the lexical gate are parsed.
+    # The cache parses the tweets once, in nlp.pipe() batches
+    candidates = candidate_tweets(all_tweets, ensure_index(all_tweets, index), AWARD_CLAUSES)
+    gated = gate_award_tweets(candidates)
+    matcher_hits = 0
+    for tweet, doc in doc_cache.iter_docs(gated):
+        award_names = match_award_names(doc, matcher)
+        if not award_names:
+            continue
+        matcher_hits += len(award_names)
         # Extract possible winners only once per tweet
-        possible_winners = extract_names(doc.text, nlp)
-        
-        # Convert matches to spans
-        spans = [doc[start:end] for match_id, start, end in matches]
-        filtered_spans = filter_longest_spans(spans)
-
-        for span in filtered_spans:
-            award = span.text.strip()
-            if len(award.split(" ")) > 3:
-                award_data = detected_awards[award]
-                
-                # Update count
-                award_data["count"] += 1
+        possible_winners = extract_names_from_doc(doc)
+        for award in award_names:
+            award_data = detected_awards[award]
+            
+            # Update count, weighted by the number of duplicates the tweet stands for
+            award_data["count"] += tweet.weight
 
-                # Update timestamps
-                if not award_data["start_timestamp"] or tweet.timestamp < award_data["start_timestamp"]:
-                    award_data["start_timestamp"] = tweet.timestamp
-                if not award_data["end_timestamp"] or tweet.timestamp > award_data["end_timestamp"]:
-                    award_data["end_timestamp"] = tweet.timestamp
+            # Update timestamps
+            if not award_data["start_timestamp"] or tweet.timestamp < award_data["start_timestamp"]:
+                award_data["start_timestamp"] = tweet.timestamp
+            if not award_data["end_timestamp"] or tweet.timestamp > award_data["end_timestamp"]:
+                award_data["end_timestamp"] = tweet.timestamp
 
-                # Filter winners to avoid single-word names
-                possible_winners_filter = [winner for winner in possible_winners if len(winner.split(" ")) > 1]
-                
-                if possible_winners_filter:
-                    for winner in possible_winners_filter:
-                        award_data["winners"][winner] += 1
-                else:
-                    # If no valid person names found, try to identify movies
-                    possible_movie = find_movie_from_text(award)
-                    if possible_movie:
-                        award_data["winners"][possible_movie] += 1
+            for winner in award_winners(award, possible_winners, gazetteer):
+                award_data["winners"][winner] += tweet.weight
+
+    instrument.count("awards.candidates", len(candidates))
+    instrument.count("awards.gate_passed", len(gated))
+    instrument.count("awards.matcher_hits", matcher_hits)
 
     # Sort detected awards by count
     sorted_detected_awards = sorted(detected_awards.items(), key=lambda item: item[1]["count"], reverse=True)
-    # discard awards with count less than 2
-    sorted_detected_awards = [award for award in sorted_detected_awards if award[1]["count"] > 1]
+    # discard awards with count less than min_count
+    sorted_detected_awards = [award for award in sorted_detected_awards if award[1]["count"] >= min_count]
     # Convert to regular dict and format timestamps as readable dates
     sorted_detected_awards = {
         award: {
@@ -242,10 +370,41 @@ def find_awards(all_tweets: list) -> dict:
 
     return sorted_detected_awards
 
-def find_movie_from_text(text):
+def match_award_names(doc, matcher):
+    """
+    Award names mentioned in a parsed tweet: the longest non-overlapping award
+    Matcher spans with more than three words.
+    """
+    # Convert matches to spans
+    spans = [doc[start:end] for match_id, start, end in matcher(doc)]
+    awards = []
+    for span in filter_longest_spans(spans):
+        award = span.text.strip()
+        if len(award.split(" ")) > 3:
+            awards.append(award)
+    return awards
+
+def award_winners(award, possible_winners, gazetteer=None):
+    """
+    Winners a tweet mentioning the award votes for: its full person names, or the
+    movie named in the award text if there are none.
+    """
+    # Filter winners to avoid single-word names
+    possible_winners_filter = [winner for winner in possible_winners if len(winner.split(" ")) > 1]
+    if possible_winners_filter:
+        return possible_winners_filter
+    # If no valid person names found, try to identify movies
+    possible_movie = find_movie_from_text(award, gazetteer)
+    return [possible_movie] if possible_movie else []
+
+def find_movie_from_text(text, gazetteer=None):
     """
     Tries to find movie title from the given text using regex-based splitters.
+    When the offline gazetteer is available the candidate is validated against it
+    and trimmed to the longest known title it starts with.
     """
+    if gazetteer is None:
+        gazetteer = get_gazetteer()
     # Define regex-based patterns to extract movie titles
     splitters_after = [r":", r"-", r"goes to", r"winner is"]
     splitters_before = [r"wins", r"win"]
@@ -254,15 +413,24 @@ def find_movie_from_text(text):
         if re.search(splitter, text):
             parts = re.split(splitter, text, maxsplit=1)
             if len(parts) > 1:
-                return parts[1].strip()
+                return validate_movie(parts[1].strip(), gazetteer)
     
     for splitter in splitters_before:
         if re.search(splitter, text):
             parts = re.split(splitter, text, maxsplit=1)
             if len(parts) > 1:
-                return parts[0].strip()
+                return validate_movie(parts[0].strip(), gazetteer)
     
     return None
+
+def validate_movie(candidate, gazetteer):
+    """
+    Checks a movie candidate against the gazetteer. Without a gazetteer the
+    candidate is returned unchanged.
+    """
+    if gazetteer is None:
+        return candidate
+    return gazetteer.longest_title_prefix(candidate)
 def filter_longest_spans(spans):
     """Filter overlapping spans to keep only the longest ones."""
     # Sort spans by start index, and if equal, by end index descending
@@ -277,10 +445,11 @@ def filter_longest_spans(spans):
 
     return longest_spans
 def test_dependency(text):
-    ia = Cinemagoer()
+    # only needed when the offline gazetteer has not been built
+    ia = None if get_gazetteer() is not None else Cinemagoer()
     random_tweet = Tweet()
     random_tweet.text = text
-    nlp = spacy.load("en_core_web_sm")
+    nlp = get_nlp("full")
     doc = nlp(text)
     for token in doc:
         print(f"Word: {token.text}, POS: {token.pos_}, Tag: {token.tag_}")
@@ -291,17 +460,26 @@ def test_dependency(text):
     rewards.append(random_tweet)
     print(find_awards(rewards))
 
-def is_movie(title, imdb):
+def is_movie(title, imdb=None, gazetteer=None):
     """
-    Checks if the given title is a movie in IMDb.
+    Checks if the given title is a movie. Uses the offline gazetteer when it has
+    been built (see gazetteer.py), otherwise searches IMDb over the network.
 
     Parameters:
     title (str): The title to check.
+    imdb (Cinemagoer): IMDb client for the online fallback.
+    gazetteer (Gazetteer): Offline title gazetteer; the default one if not given.
 
     Returns:
     bool: True if the title is a movie, False otherwise.
     """
-    
+    if gazetteer is None:
+        gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        return gazetteer.is_movie(title)
+
+    if imdb is None:
+        imdb = Cinemagoer()
     search_results = imdb.search_movie(title)
     
     # Check if the search results contain a movie that matches the title
@@ -311,28 +489,26 @@ def is_movie(title, imdb):
     
     return False
 
-def find_nominees(tweets, detected_awards):
+@instrument.timed()
+def find_nominees(tweets, detected_awards, doc_cache=None, index=None):
     """
     Map nominees to their respective awards.
 
     Parameters:
-        tweets (list): List of tweet objects.
+        tweets (TweetStore): Tweets sorted by timestamp.
         detected_awards (dict): dictionary of detected awards and their counts and winners.
+        doc_cache (DocCache): Parsed tweets; a local cache is used if not given.
+        index (InvertedIndex): Index over tweets; built here if not given.
         
     Returns:
         dict: A dictionary with awards as keys and lists of nominees as values.
     """
-    nlp = spacy.load("en_core_web_sm")
+    if doc_cache is None:
+        doc_cache = DocCache(get_nlp("nominees"))
+    nlp = doc_cache.nlp
+    index = ensure_index(tweets, index)
     matcher = Matcher(nlp.vocab)
-    
-    # Patterns to capture nominee phrases
-    nominee_patterns = [
-        [{"IS_TITLE": True}, {"LOWER": "nominated"}, {"LOWER": "for"}, {"IS_TITLE": True, "OP": "+"}],   # "X nominated for Y"
-        [{"IS_TITLE": True}, {"LOWER": "nominee"}, {"IS_PUNCT": True, "OP": "?"}, {"IS_TITLE": True, "OP": "+"}],  # "X nominee: Y"
-        [{"IS_TITLE": True, "OP": "+"}, {"LOWER": "up"}, {"LOWER": "for"}, {"IS_TITLE": True, "OP": "+"}],  # "X up for Y"
-    ]
-
-    matcher.add("NOMINEE_AWARD", nominee_patterns)
+    matcher.add("NOMINEE_AWARD", NOMINEE_PATTERNS)
 
     # Initialize a dictionary to store award-nominee mappings
     award_nominee_map = {award: [] for award in detected_awards.keys()}
@@ -342,35 +518,40 @@ def find_nominees(tweets, detected_awards):
             for winner in winners.keys():
                 award_nominee_map[award].append(winner)
 
-    # Process each tweet to find nominee-award relationships
-    for award in detected_awards.keys():
-        # filter tweets by timestamp, assuming tweets were already sorted by timestamp
-        filtered_tweets = filter_tweets_by_timestamp(tweets, detected_awards[award]["start_timestamp"], detected_awards[award]["end_timestamp"])
-        for tweet in filtered_tweets:
-            doc = nlp(tweet.text)
+    # compiled once: finds every award mentioned in a tweet in one pass over its text
+    award_matcher = AwardMatcher(detected_awards.keys())
+
+    # Process each tweet with a nominee keyword inside any award's time range once,
+    # walking the tweets and the award intervals together in timestamp order
+    intervals = [(award_data["start_timestamp"], award_data["end_timestamp"], award) for award, award_data in detected_awards.items()]
+    sweep_span = IntervalSweep(intervals).span()
+    if sweep_span is not None:
+        candidates = candidate_tweets(tweets, index, NOMINEE_CLAUSES, *sweep_span)
+        in_window = sweep_tweets(candidates, intervals)
+        instrument.count("nominees.candidates", len(in_window))
+        for tweet, doc in doc_cache.iter_docs(in_window):
             matches = matcher(doc)
+            if not matches:
+                continue
+            instrument.count("nominees.matcher_hits", len(matches))
+
+            # Match award names using detected award list, the first listed award
+            # mentioned in the tweet wins
+            award_text = award_matcher.first_award(tweet.text)
             
             for match_id, start, end in matches:
                 span = doc[start:end]
                 nominee_text = None
-                award_text = None
                 
                 # Extract entities within a reasonable distance from the pattern span
                 for token in span:
                     # Search for a nominee entity (typically a person or film title)
                     if token.ent_type_ in {"PERSON", "ORG", "WORK_OF_ART"}:
                         nominee_text = token.text
-                        
-                    # Match award names using detected award list
-                    for award in detected_awards.keys():
-                        if award.lower() in tweet.text.lower():
-                            award_text = award
-                            break
                     
                 # If both nominee and award are found, add nominee to award_nominee_map
                 if nominee_text and award_text:
                     award_nominee_map[award_text].append(nominee_text)
-                
 
 
     # Remove duplicates and return the map
@@ -379,51 +560,56 @@ def find_nominees(tweets, detected_awards):
 
     return award_nominee_map
 
-def find_presenters(tweets, detected_awards, time_window=300000):  # time_window in seconds (5 minutes default)
+@instrument.timed()
+def find_presenters(tweets, detected_awards, time_window=300000, doc_cache=None, index=None):  # time_window in seconds (5 minutes default)
     """
     Map presenters to their respective awards using time windows.
 
     Parameters:
-        tweets (list): List of tweet objects.
+        tweets (TweetStore): Tweets sorted by timestamp.
         detected_awards (dict): {"award1":{'count':1, 'winners':{'Joe':1, 'Rob':3}, 'start_timestamp':12345, 'end_timestamp':6789},...}.
         time_window (int): The time window in seconds around the award to capture nearby presenter mentions.
+        doc_cache (DocCache): Parsed tweets; a local cache is used if not given.
+        index (InvertedIndex): Index over tweets; built here if not given.
         
     Returns:
         dict: A dictionary with presenters as keys and lists of awards as values.
     """
-    nlp = spacy.load("en_core_web_sm")
+    if doc_cache is None:
+        doc_cache = DocCache(get_nlp("presenters"))
+    nlp = doc_cache.nlp
+    index = ensure_index(tweets, index)
     matcher = Matcher(nlp.vocab)
-    presenter_patterns = [
-        [{"IS_TITLE": True}, {"LOWER": "presents"}, {"IS_TITLE": True, "OP": "+"}],
-        [{"IS_TITLE": True}, {"LOWER": "announces"}, {"IS_TITLE": True, "OP": "+"}],
-        [{"IS_TITLE": True}, {"LOWER": "to"}, {"LOWER": "present"}, {"IS_TITLE": True, "OP": "+"}],
-    ]
-    matcher.add("PRESENTER", presenter_patterns)
+    matcher.add("PRESENTER", PRESENTER_PATTERNS)
 
     # Initialize dictionary to store presenter-award mappings
     award_presenter_map = {award: [] for award in detected_awards.keys()}
 
-    # For each award, find potential presenters in the defined time window
-    for award, award_info in detected_awards.items():
-        start_time = award_info["start_timestamp"] - time_window
-        end_time = award_info["end_timestamp"] + time_window
-        
-        # Filter tweets by timestamp within the time window
-        filtered_tweets = filter_tweets_by_timestamp(tweets, start_time, end_time)
-        
-        for tweet in filtered_tweets:
-            doc = nlp(tweet.text)
-            matches = matcher(doc)
-
-            for match_id, start, end in matches:
-                span = doc[start:end]
-                
-                # Extract possible presenter names (typically entities labeled as "PERSON")
-                presenter_names = [ent.text for ent in doc.ents if ent.label_ == "PERSON"]
-
-                # Map presenters to the current award
-                for presenter in presenter_names:
-                    award_presenter_map[award].append(presenter)
+    # Time window of every award, padded by time_window on both sides
+    intervals = [(award_info["start_timestamp"] - time_window, award_info["end_timestamp"] + time_window, award)
+                 for award, award_info in detected_awards.items()]
+    sweep_span = IntervalSweep(intervals).span()
+    if sweep_span is None:
+        return award_presenter_map
+
+    # Tweets with a presenter keyword are swept once in timestamp order; the awards
+    # whose window is open are only looked at for the tweets the matcher accepts
+    candidates = candidate_tweets(tweets, index, PRESENTER_CLAUSES, *sweep_span)
+    in_window = sweep_tweets(candidates, intervals)
+    instrument.count("presenters.candidates", len(in_window))
+    sweep = IntervalSweep(intervals)
+    for tweet, doc in doc_cache.iter_docs(in_window):
+        active_awards = sweep.active(tweet.timestamp)
+        if not matcher(doc):
+            continue
+        instrument.count("presenters.matcher_hits")
+
+        # Extract possible presenter names (typically entities labeled as "PERSON")
+        presenter_names = [ent.text for ent in doc.ents if ent.label_ == "PERSON"]
+
+        # Map presenters to every award open at the time of the tweet
+        for award in active_awards:
+            award_presenter_map[award].extend(presenter_names)
 
     # Remove duplicates in award lists for each presenter
     for award in award_presenter_map:
@@ -436,13 +622,17 @@ def filter_tweets_by_timestamp(tweets, start_timestamp, end_timestamp):
     Filter tweets based on a timestamp range using binary search for efficiency.
 
     Parameters:
-        tweets (list): A list of Tweet objects sorted by timestamp.
+        tweets (TweetStore or list): Tweets sorted by timestamp.
         start_timestamp (int): The start timestamp of the range.
         end_timestamp (int): The end timestamp of the range.
 
     Returns:
-        list: A list of tweets within the specified timestamp range.
+        TweetStore or list: The tweets within the specified timestamp range. For a
+        TweetStore this is a zero-copy slice found in O(log n).
     """
+    if isinstance(tweets, TweetStore):
+        return tweets.time_range(start_timestamp, end_timestamp)
+
     # Extract the list of timestamps
     timestamps = [tweet.timestamp for tweet in tweets]
 
@@ -453,11 +643,115 @@ def filter_tweets_by_timestamp(tweets, start_timestamp, end_timestamp):
     # Slice the tweets list to get only those within the range
     return tweets[start_index:end_index]
 
-def process_cluster(timestamp, cluster):
-    awards = find_awards(cluster)
-    nominees = find_nominees(cluster, awards)
-    presenters = find_presenters(cluster, awards)
-    return timestamp, awards, nominees, presenters
+def cluster_context(cluster, doc_bytes=None, stage="extract"):
+    """
+    DocCache and keyword index of one cluster of tweets, shared by the extraction
+    stages; doc_bytes holds docs already parsed by the parent process with the
+    pipeline of the given models stage.
+    """
+    nlp = get_nlp(stage)
+    if doc_bytes is not None:
+        doc_cache = DocCache.from_bytes(nlp, doc_bytes)
+    else:
+        doc_cache = DocCache(nlp)
+    return doc_cache, InvertedIndex.build(cluster, INDEX_TERMS)
+
+def frequent_awards(award_stats):
+    """
+    The awards of {award: AwardStats} mentioned at least AWARD_MIN_COUNT times, in the
+    find_awards format; only those get nominees and presenters.
+    """
+    return {award: stats.to_award() for award, stats in award_stats.items() if stats.count >= AWARD_MIN_COUNT}
+
+def process_cluster(timestamp, cluster, doc_bytes=None, stage="extract"):
+    """
+    Run award, nominee and presenter extraction on one cluster of tweets.
+    The three stages share one DocCache, so each tweet is parsed at most once.
+
+    Returns:
+        tuple: (timestamp, {award: AwardStats}). The mention counts of every award
+        found are kept, however rarely it is mentioned, so the counts of all clusters
+        add up exactly; nominees and presenters are only looked for around awards
+        mentioned at least AWARD_MIN_COUNT times in the cluster, as before.
+    """
+    doc_cache, index = cluster_context(cluster, doc_bytes, stage)
+    awards = find_awards(cluster, doc_cache, index, min_count=1)
+    frequent = {award: award_data for award, award_data in awards.items() if award_data["count"] >= AWARD_MIN_COUNT}
+    nominees = find_nominees(cluster, frequent, doc_cache, index)
+    presenters = find_presenters(cluster, frequent, doc_cache=doc_cache, index=index)
+    return timestamp, award_stats_from_results(awards, nominees, presenters)
+
+def detect_cluster_awards(key, part, doc_bytes=None, stage="extract"):
+    """
+    First pass of process_cluster over one part of a split segment: the award mentions.
+
+    Returns:
+        dict: {award: AwardStats} without nominees or presenters; the stats of the parts
+        of a segment merge into the stats of the whole segment.
+    """
+    doc_cache, index = cluster_context(part, doc_bytes, stage)
+    return award_stats_from_results(find_awards(part, doc_cache, index, min_count=1), {}, {})
+
+def attribute_cluster_awards(key, part, doc_bytes, awards, stage="extract"):
+    """
+    Second pass of process_cluster over one part of a split segment: the nominees and
+    presenters of the frequent awards of the whole segment. A tweet is attributed by
+    its own text and timestamp against the time ranges of the whole segment, so the
+    union over the parts is what one pass over the segment finds.
+
+    Returns:
+        tuple: (nominees, presenters) dictionaries of find_nominees and find_presenters.
+    """
+    doc_cache, index = cluster_context(part, doc_bytes, stage)
+    nominees = find_nominees(part, awards, doc_cache, index)
+    presenters = find_presenters(part, awards, doc_cache=doc_cache, index=index)
+    return nominees, presenters
+
+def extract_segment_awards(tweets, segments, doc_cache=None, stage="extract", max_task_size=MAX_TASK_ROWS,
+                           max_workers=None):
+    """
+    process_cluster over every segment of a store in a process pool, with the segments
+    larger than max_task_size split into parts. The parts first find their award
+    mentions, which merge per segment; then each part attributes nominees and
+    presenters against the frequent awards of its whole segment. The result is the one
+    of process_cluster over the whole segments, whatever the parts.
+
+    Parameters:
+        tweets (TweetStore): Tweets sorted by timestamp.
+        segments (list): (key, start, end) row ranges of tweets.
+        doc_cache (DocCache): Docs already parsed; each task gets the docs of its rows.
+        stage (str): models stage of the pipeline the workers use.
+        max_task_size (int): Largest number of rows of one task, None to keep segments whole.
+        max_workers (int): Pool size, the number of CPUs if None.
+
+    Returns:
+        dict: {award: AwardStats} of all segments.
+    """
+    # the tweets and docs go to shared memory once, the workers get row ranges,
+    # oversized segments are split and the largest tasks start first
+    with SegmentRunner(tweets, segments, doc_cache, stages=(stage,), max_workers=max_workers,
+                       max_task_size=max_task_size) as runner:
+        # award mentions of every part, merged per segment in part order
+        part_stats = dict(runner.run(partial(detect_cluster_awards, stage=stage)))
+        segment_stats = {}
+        for key, part in sorted(part_stats):
+            merge_award_stats(segment_stats.setdefault(key, {}), part_stats[key, part])
+        # every part attributes against the frequent awards of its whole segment
+        segment_awards = {key: frequent_awards(stats) for key, stats in segment_stats.items()}
+        attributions = {key: ({award: set() for award in awards}, {award: set() for award in awards})
+                        for key, awards in segment_awards.items()}
+        for (key, part), part_attributions in runner.run(partial(attribute_cluster_awards, stage=stage), segment_awards):
+            for found, names in zip(attributions[key], part_attributions):
+                for award, award_names in names.items():
+                    found[award].update(award_names)
+
+    award_stats = {}
+    for key in sorted(segment_stats):
+        awards = {award: stats.to_award() for award, stats in segment_stats[key].items()}
+        nominees, presenters = ({award: sorted(names) for award, names in found.items()} for found in attributions[key])
+        print(f"Segment {key}: {len(awards)} awards")
+        merge_award_stats(award_stats, award_stats_from_results(awards, nominees, presenters))
+    return award_stats
 
 def get_winner(award):
     winners = award["winners"]
@@ -476,55 +770,224 @@ def print_result(host_candidates, awards, nominees, presenters):
         print("Winner: ", get_winner(award))
         print("\n")
     
+def build_result(host_candidates, awards, nominees, presenters):
+    """
+    The result dictionary written by save_json.
+    """
+    return {
+        "Hosts": list(host_candidates.keys())[:3],
+        "Award data":[
+            {
+                "Award": awardname,
+                "Presenters": presenters[awardname] if awardname in presenters else None,
+                "Nominees": nominees[awardname] if awardname in nominees else None,
+                "Winner": get_winner(award)
+            } for awardname, award in awards.items()
+        ]
+    }
+
 def save_json(host_candidates, awards, nominees, presenters, filename):
     # remove file if it already exists
     if os.path.exists(filename):
         os.remove(filename)
 
     with open(filename, "w") as file:
-        json.dump({
-            "Hosts": list(host_candidates.keys())[:3],
-            "Award data":[
-                {
-                    "Award": awardname,
-                    "Presenters": presenters[awardname] if awardname in presenters else None,
-                    "Nominees": nominees[awardname] if awardname in nominees else None,
-                    "Winner": get_winner(award)
-                } for awardname, award in awards.items()
-            ]
-        }, file, indent=4)
+        json.dump(build_result(host_candidates, awards, nominees, presenters), file, indent=4)
     print(f"Results saved to {filename}")
 
-if __name__ == "__main__":
-    time1 = time.time()
-    All_Tweets = preprocess.preprocess("gg2013.json")
-    #clustered_tweets = cluster_by_timestamp(All_Tweets)
-    print("Clustering tweets...")
-    clustered_tweets = cluster_tweets_kmeans(All_Tweets, k=32)
-
-    print("Finding host candidates...")
-    host_candidates = find_host_candidate(All_Tweets)
-    print("Host candidates: ", host_candidates)
-    awards_result = {}
-    nominees_result = {}
-    presenters_result = {}
-
-    print("Processing clusters...")
-    with ProcessPoolExecutor() as executor:
-        future_results = [executor.submit(process_cluster, timestamp, cluster) for timestamp, cluster in clustered_tweets.items()]
-        for future in future_results:
-            timestamp, awards, nominees, presenters = future.result()
-            print(awards)
-            print(nominees)
-            print(presenters)
-            #merge dictionaries into results
-            awards_result.update(awards)
-            nominees_result.update(nominees)
-            presenters_result.update(presenters)
-    
+def cluster_segments(tweets, strategy="bursts"):
+    """
+    Contiguous (timestamp, start, end) row ranges of the tweets to process in parallel.
+
+    Parameters:
+        tweets (TweetStore): Tweets sorted by timestamp.
+        strategy (str): "bursts" (segment_bursts), "kmeans" (cluster_tweets_kmeans with
+            k=32) or "timestamp" (30 minute buckets of cluster_by_timestamp).
+    """
+    if strategy == "bursts":
+        return [(int(tweets.timestamps[start]), start, end) for start, end in segment_bursts(tweets)]
+    if strategy == "timestamp":
+        return cluster_by_timestamp(tweets)
+    if strategy == "kmeans":
+        # k-means clusters of one-dimensional points are intervals of the sorted column
+        segments = []
+        for cluster in cluster_tweets_kmeans(tweets, k=32).values():
+            if len(cluster):
+                start, end = tweets.range_indices(cluster.timestamps[0], cluster.timestamps[-1])
+                segments.append((int(cluster.timestamps[0]), start, end))
+        return sorted(segments)
+    raise ValueError(f"Unknown cluster strategy '{strategy}'. Use 'bursts', 'kmeans' or 'timestamp'.")
+
+def run_pipeline(filename="gg2013.json", sample_rate=1.0, dedup=DEDUP_TWEETS, cluster="bursts", ner=True,
+                 names="spacy", output="result.json", checkpoints=None):
+    """
+    Run the whole pipeline on a dump as a DAG of checkpointed stages.
+
+    Every stage is stored under a hash of its inputs, parameters and code (see
+    checkpoint.py), so a re-run only recomputes the stages downstream of what changed:
+    editing the presenter patterns re-runs extraction but does not re-parse or
+    re-cluster anything.
+
+    Parameters:
+        filename (str): The tweet dump.
+        sample_rate (float): Fraction of the preprocessed tweets kept, drawn with a fixed seed.
+        dedup (bool): Collapse duplicate tweets before the NLP stages.
+        cluster (str): Segmentation strategy, see cluster_segments.
+        ner (bool): Run spaCy NER; without it no person names are found, which is only
+            useful to measure what NER costs and contributes.
+        names (str): Name backend of the host stage, "spacy" or "fast" (see nameextract.py).
+            The fast backend does not need the host tweets parsed.
+        output (str): Where the result is saved, None to not save it.
+        checkpoints (CheckpointStore): Where stage outputs are kept; the default store
+            if None, CheckpointStore(enabled=False) to compute everything.
+
+    Returns:
+        tuple: (result in the save_json format, seconds spent in each computed step).
+    """
+    if checkpoints is None:
+        checkpoints = CheckpointStore()
+    timings = {}
+    run_start = time.time()
+    nlp_stage = "extract" if ner else "extract_no_ner"
+    nested = [0.0]
+
+    def step(name, compute):
+        # time the stage only when it is actually computed, not loaded; a stage computes
+        # its inputs on demand, so their time is taken out of its own
+        def run():
+            print(f"Running {name}...")
+            outer, nested[0] = nested[0], 0.0
+            start = time.time()
+            with instrument.span(name, "pipeline"):
+                value = compute()
+            elapsed = time.time() - start
+            timings[name] = elapsed - nested[0]
+            nested[0] = outer + elapsed
+            return value
+        return run
+
+    def load_tweets():
+        # the checkpoint replaces the preprocessing cache
+        return preprocess.preprocess(filename, cache_file=None)
+
+    def sample_tweets():
+        All_Tweets = tweets.value
+        keep = np.random.default_rng(0).random(len(All_Tweets)) < sample_rate
+        All_Tweets = All_Tweets.take(np.flatnonzero(keep))
+        print(f"Sampled {len(All_Tweets)} tweets")
+        return All_Tweets
+
+    def dedup_tweets():
+        # duplicates are only merged within a minute of a group's first tweet, so the timing is kept
+        All_Tweets, duplicate_groups = collapse_duplicates(sampled.value)
+        group_sizes = np.diff(duplicate_groups.member_offsets)
+        print(f"Unique tweets: {len(All_Tweets)} of {All_Tweets.total_weight()}, "
+              f"{np.count_nonzero(group_sizes > 1)} duplicate groups, largest {group_sizes.max(initial=0)}")
+        instrument.count("dedup.tweets_in", All_Tweets.total_weight())
+        instrument.count("dedup.tweets_out", len(All_Tweets))
+        instrument.count("dedup.duplicate_groups", int(np.count_nonzero(group_sizes > 1)))
+        return All_Tweets
+
+    def cluster_tweets():
+        # contiguous row ranges of the sorted store, one per burst of tweets by default
+        segments = cluster_segments(unique.value, cluster)
+        print(f"Segments: {len(segments)}")
+        instrument.count("cluster.segments", len(segments))
+        return segments
+
+    index_cache = []
+
+    def get_index():
+        if not index_cache:
+            index_cache.append(InvertedIndex.build(unique.value, INDEX_TERMS))
+        return index_cache[0]
+
+    def parse_tweets():
+        # every candidate tweet is parsed once here and the docs are reused by all stages
+        doc_cache = DocCache(get_nlp(nlp_stage))
+        index = get_index()
+        doc_clauses = NOMINEE_CLAUSES + PRESENTER_CLAUSES
+        # the fast name backend reads the host tweets without docs
+        if names == "spacy":
+            doc_clauses = HOST_CLAUSES + doc_clauses
+        other_rows = index.lookup(doc_clauses)
+        # "best" tweets are only parsed for the award Matcher if they pass the gate
+        award_rows = index.lookup(AWARD_CLAUSES)
+        texts = unique.value.take(award_rows).texts()
+        gated_rows = award_rows[np.array([could_match_award(text) for text in texts], dtype=bool)]
+        print(f"Award gate: {len(gated_rows)} of {len(award_rows)} tweets with 'best' passed")
+        instrument.count("parse.award_candidates", len(award_rows))
+        instrument.count("parse.award_gate_passed", len(gated_rows))
+        parsed = doc_cache.parse(unique.value.take(np.union1d(other_rows, gated_rows)))
+        print(f"Parsed {parsed} tweets")
+        return doc_cache
+
+    def find_hosts():
+        if names == "spacy":
+            host_candidates = find_host_candidate(unique.value, doc_cache=docs.value, index=get_index(), resolver=NameResolver())
+        else:
+            # spaCy, if there is NER, only decides the candidates the lexicons cannot
+            name_extractor = get_name_extractor(names, get_nlp("names") if ner else None)
+            host_candidates = find_host_candidate(unique.value, index=get_index(), resolver=NameResolver(),
+                                                  name_extractor=name_extractor)
+            print(f"Name extraction: {name_extractor.counts}")
+        print("Host candidates: ", host_candidates)
+        return host_candidates
+
+    def extract_awards():
+        return extract_segment_awards(unique.value, segments.value, docs.value, stage=nlp_stage, max_task_size=MAX_TASK_ROWS)
+
+    # tweet stages are kept as tweet files: loading one maps it, and the workers map the same file
+    save_store = lambda store, file: store.save(file)
+    open_store = lambda file: TweetStore.open(file.name)
+    # the code of each stage is what its compute function reaches, see checkpoint.dependencies
+    tweets = checkpoints.stage("tweets", step("preprocess", load_tweets),
+                               inputs=[preprocess.cache_key(filename, checkpoints.file_hash)],
+                               save=save_store, load=open_store)
+    if sample_rate < 1.0:
+        sampled = checkpoints.stage("sample", step("sample", sample_tweets), inputs=[tweets], params=sample_rate,
+                                    code=dependencies(sample_tweets), persist=False)
+    else:
+        sampled = tweets
+    if dedup:
+        unique = checkpoints.stage("dedup", step("dedup", dedup_tweets), inputs=[sampled],
+                                   code=dependencies(dedup_tweets), save=save_store, load=open_store)
+    else:
+        unique = sampled
+    segments = checkpoints.stage("segments", step("cluster", cluster_tweets), inputs=[unique], params=cluster,
+                                 code=dependencies(cluster_tweets))
+    spacy_versions = (MODEL_NAME, spacy.about.__version__, spacy.util.get_package_version(MODEL_NAME))
+    docs = checkpoints.stage(
+        "docs", step("parse", parse_tweets), inputs=[unique], params=(nlp_stage, names, spacy_versions),
+        code=dependencies(parse_tweets),
+        save=lambda doc_cache, file: file.write(doc_cache.to_bytes()),
+        load=lambda file: DocCache.from_bytes(get_nlp(nlp_stage), file.read()))
+    gazetteer_file = checkpoints.file_hash(GAZETTEER_FILE) if os.path.exists(GAZETTEER_FILE) else None
+    hosts = checkpoints.stage(
+        "hosts", step("hosts", find_hosts), inputs=[unique, docs] if names == "spacy" else [unique, gazetteer_file],
+        params=(names, ner, spacy_versions), code=dependencies(find_hosts))
+    # the parts and segments merge in a fixed order, so the number of workers is not a parameter
+    award_stats = checkpoints.stage(
+        "awards", step("extract", extract_awards), inputs=[unique, segments, docs, gazetteer_file],
+        params=(nlp_stage, spacy_versions), code=dependencies(extract_awards))
+
+    host_candidates = hosts.value
+    awards_result, nominees_result, presenters_result = finalize_award_stats(award_stats.value, min_count=AWARD_MIN_COUNT)
+    for stage in (tweets, unique, segments, docs, hosts, award_stats):
+        if stage.cached:
+            print(f"Loaded {stage.name} from checkpoint")
+
     print("Printing results...")
     print_result(host_candidates, awards_result, nominees_result, presenters_result)
-    save_json(host_candidates, awards_result, nominees_result, presenters_result, "result.json")
+    if output is not None:
+        save_json(host_candidates, awards_result, nominees_result, presenters_result, output)
+    timings["total"] = time.time() - run_start
+    return build_result(host_candidates, awards_result, nominees_result, presenters_result), timings
+
+if __name__ == "__main__":
+    time1 = time.time()
+    run_pipeline("gg2013.json")
     time2 = time.time()
     print(time2 - time1, "s")
-    
\ No newline at end of file
+    if instrument.is_enabled():
+        instrument.write(os.environ[instrument.TRACE_ENV])
@@ -0,0 +1,172 @@
+"""
+Offline title / person gazetteer backed by a memory-mapped marisa-trie.
+
+Build it once from a flat file:
+
+    python gazetteer.py titles.tsv [gazetteer.marisa]
+
+Each line of the source is either "name" (taken as a movie/show title) or
+"kind<TAB>name" with kind "movie" or "person". IMDb's title.basics.tsv and
+name.basics.tsv dumps are read directly as well.
+
+The trie is opened with mmap, so loading costs next to nothing and every worker
+process shares the same pages through the OS instead of holding its own copy.
+"""
+import os
+import re
+import sys
+import marisa_trie
+from itertools import chain
+
+GAZETTEER_FILE = "gazetteer.marisa"
+MOVIE = "m"
+PERSON = "p"
+KINDS = {"movie": MOVIE, "title": MOVIE, "person": PERSON, "name": PERSON}
+# IMDb title types that count as a title an award can go to
+IMDB_TITLE_TYPES = {"movie", "tvMovie", "tvSeries", "tvMiniSeries", "short", "tvSpecial"}
+
+non_alphanumeric_pattern = re.compile(r"[\W_]+")
+
+
+def normalize_title(text):
+    """
+    Lookup key of a title or name: lowercase words separated by single spaces.
+    """
+    return non_alphanumeric_pattern.sub(" ", text.lower()).strip()
+
+
+def read_source(source):
+    """
+    Yield (kind, name) pairs from a flat file or an IMDb basics dump.
+    """
+    with open(source, 'r', encoding='utf-8') as file:
+        first_line = file.readline()
+        header = first_line.rstrip("\n").split("\t")
+        if header[0] == "tconst":
+            # IMDb title.basics.tsv: tconst, titleType, primaryTitle, originalTitle, ...
+            for line in file:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) > 3 and columns[1] in IMDB_TITLE_TYPES:
+                    yield MOVIE, columns[2]
+                    if columns[3] != columns[2]:
+                        yield MOVIE, columns[3]
+            return
+        if header[0] == "nconst":
+            # IMDb name.basics.tsv: nconst, primaryName, ...
+            for line in file:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) > 1:
+                    yield PERSON, columns[1]
+            return
+
+        for line in chain([first_line], file):
+            line = line.rstrip("\n")
+            if not line.strip():
+                continue
+            kind, tab, name = line.partition("\t")
+            if tab and kind.lower() in KINDS:
+                yield KINDS[kind.lower()], name
+            else:
+                yield MOVIE, line
+
+
+def build_gazetteer(sources, path=GAZETTEER_FILE):
+    """
+    Build the trie from one or more source files and save it to path.
+
+    Returns:
+        int: Number of distinct entries.
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+    keys = set()
+    for source in sources:
+        for kind, name in read_source(source):
+            key = normalize_title(name)
+            if key:
+                keys.add(f"{kind}\t{key}")
+    trie = marisa_trie.Trie(keys)
+    trie.save(path)
+    return len(keys)
+
+
+class Gazetteer:
+    """
+    Read-only normalized exact and prefix lookup of titles and person names.
+    """
+
+    def __init__(self, trie):
+        self.trie = trie
+
+    @classmethod
+    def open(cls, path=GAZETTEER_FILE):
+        trie = marisa_trie.Trie()
+        trie.mmap(path)
+        return cls(trie)
+
+    def contains(self, name, kind=MOVIE):
+        key = normalize_title(name)
+        return bool(key) and f"{kind}\t{key}" in self.trie
+
+    def is_movie(self, title):
+        return self.contains(title, MOVIE)
+
+    def is_person(self, name):
+        return self.contains(name, PERSON)
+
+    def has_prefix(self, prefix, kind=MOVIE):
+        """
+        True if some entry of the given kind starts with the normalized prefix.
+        """
+        key = normalize_title(prefix)
+        # iterkeys is lazy, has_keys_with_prefix is deprecated in marisa-trie
+        return bool(key) and next(iter(self.trie.iterkeys(f"{kind}\t{key}")), None) is not None
+
+    def with_prefix(self, prefix, kind=MOVIE, limit=10):
+        """
+        Up to limit normalized entries of the given kind starting with prefix.
+        """
+        start = f"{kind}\t"
+        matches = []
+        for key in self.trie.iterkeys(start + normalize_title(prefix)):
+            matches.append(key[len(start):])
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def longest_title_prefix(self, text):
+        """
+        The longest run of leading words of text that is a known title, or None.
+        Used to cut trailing chatter off a title candidate ("Argo at the globes").
+        """
+        words = text.split()
+        longest = None
+        for end in range(1, len(words) + 1):
+            candidate = " ".join(words[:end])
+            # stop as soon as no title starts with the words so far
+            if not self.has_prefix(candidate):
+                break
+            if self.is_movie(candidate):
+                longest = candidate
+        return longest
+
+
+_gazetteers = {}
+
+
+def get_gazetteer(path=GAZETTEER_FILE):
+    """
+    The gazetteer at path, opened once per process, or None if it has not been built.
+    """
+    if path not in _gazetteers:
+        _gazetteers[path] = Gazetteer.open(path) if os.path.exists(path) else None
+    return _gazetteers[path]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python gazetteer.py SOURCE [SOURCE ...] [OUTPUT.marisa]")
+        sys.exit(1)
+    arguments = sys.argv[1:]
+    output = arguments.pop() if len(arguments) > 1 and arguments[-1].endswith(".marisa") else GAZETTEER_FILE
+    print(f"{build_gazetteer(arguments, output)} entries saved to {output}")
@@ -0,0 +1,283 @@
+"""
+Pipeline instrumentation: stage timers, counters, memory high-water marks and a
+Chrome / Perfetto trace of the worker processes.
+
+Everything is off unless enable() is called, or the PIPELINE_TRACE environment
+variable is set to an output prefix; disabled, a span is a shared no-op object and a
+counter update is one flag check. Call sites count per batch, never per tweet.
+
+    PIPELINE_TRACE=run python frame.py     # writes run.summary.json and run.trace.json
+
+The peak memory of every stage is traced with tracemalloc when PIPELINE_TRACE_MEMORY
+is set as well (or enable(memory=True)): the most the stage had allocated at once on
+top of what was allocated when it started, nested stages included. Tracing slows
+allocations down, so it is off by default and the stage times of such a run are
+inflated. The process-wide high-water mark comes from the resource module, which only
+exists on Unix; it is None elsewhere.
+
+Open the trace file in chrome://tracing or https://ui.perfetto.dev. Every process is
+a track, so the fan-out shows how busy each worker was over time.
+"""
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+TRACE_ENV = "PIPELINE_TRACE"
+TRACE_MEMORY_ENV = "PIPELINE_TRACE_MEMORY"
+
+
+class _State:
+    def __init__(self):
+        self.enabled = False
+        self.memory_enabled = False
+        self.reset()
+
+    def reset(self):
+        self.counters = defaultdict(int)
+        # name -> {"calls", "wall", "cpu"}
+        self.stages = defaultdict(lambda: {"calls": 0, "wall": 0.0, "cpu": 0.0})
+        # name -> largest traced peak in MB of one call of the stage
+        self.memory = {}
+        # [allocated at the start, peak so far] of every open span, outermost first
+        self.memory_stack = []
+        self.events = []
+
+
+_state = _State()
+
+
+def enable(memory=False):
+    """
+    Turn instrumentation on; memory also traces the peak memory of every stage.
+    """
+    _state.enabled = True
+    if memory:
+        _state.memory_enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def disable():
+    _state.enabled = False
+    if _state.memory_enabled:
+        _state.memory_enabled = False
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def settings():
+    """
+    (enabled, memory) of this process, the arguments of init_process in a worker.
+    """
+    return _state.enabled, _state.memory_enabled
+
+
+def init_process(enabled, memory=False):
+    """
+    ProcessPoolExecutor initializer that sets the worker's instrumentation state to
+    the parent's, whatever the start method.
+    """
+    _state.reset()
+    if enabled:
+        enable(memory)
+    else:
+        disable()
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in MB, or None where the resource
+    module is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def count(name, value=1):
+    """
+    Add value to a counter.
+    """
+    if _state.enabled:
+        _state.counters[name] += value
+
+
+def record(name, start, wall, cpu, category="stage", peak_mb=None, **args):
+    """
+    Record a finished stage that started at wall-clock time start (time.time()) and
+    took wall seconds, cpu of them on the CPU of this process. peak_mb is the traced
+    peak memory of the stage, if any.
+    """
+    if not _state.enabled:
+        return
+    stage = _state.stages[name]
+    stage["calls"] += 1
+    stage["wall"] += wall
+    stage["cpu"] += cpu
+    args = {**args, "cpu_ms": round(cpu * 1000, 3)}
+    if peak_mb is not None:
+        _state.memory[name] = max(_state.memory.get(name, 0.0), peak_mb)
+        args["peak_mb"] = round(peak_mb, 1)
+    _state.events.append({
+        "name": name, "cat": category, "ph": "X",
+        "ts": start * 1e6, "dur": wall * 1e6,
+        "pid": os.getpid(), "tid": 0,
+        "args": args,
+    })
+
+
+def _fold_traced_peak():
+    # the peak since the last reset counts for every open span
+    _, peak = tracemalloc.get_traced_memory()
+    for entry in _state.memory_stack:
+        entry[1] = max(entry[1], peak)
+
+
+def _memory_enter():
+    _fold_traced_peak()
+    # reset, so the peak read at the end is reached inside the new span
+    tracemalloc.reset_peak()
+    current, _ = tracemalloc.get_traced_memory()
+    _state.memory_stack.append([current, current])
+
+
+def _memory_exit():
+    _fold_traced_peak()
+    start, peak = _state.memory_stack.pop()
+    return (peak - start) / (1024 * 1024)
+
+
+class _Span:
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.traced = _state.memory_enabled and tracemalloc.is_tracing()
+        if self.traced:
+            _memory_enter()
+        self.start = time.time()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        peak_mb = _memory_exit() if self.traced else None
+        record(self.name, self.start, wall, cpu, self.category, peak_mb, **self.args)
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, category="stage", **args):
+    """
+    Context manager timing a block as a stage, e.g. with span("find_awards"): ...
+    """
+    if not _state.enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def timed(name=None, category="stage"):
+    """
+    Decorator timing every call of a function as a stage, named after the function
+    unless name is given.
+    """
+    def decorator(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return function(*args, **kwargs)
+            with _Span(label, category, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def collect():
+    """
+    Take the data recorded in this process so far, to send it from a worker to the
+    parent, and start over. None when disabled.
+    """
+    if not _state.enabled:
+        return None
+    data = {"counters": dict(_state.counters), "stages": dict(_state.stages),
+            "memory": dict(_state.memory), "events": _state.events}
+    _state.reset()
+    return data
+
+
+def merge(data):
+    """
+    Add the data a worker collected to this process's.
+    """
+    if not _state.enabled or not data:
+        return
+    for name, value in data["counters"].items():
+        _state.counters[name] += value
+    for name, stage in data["stages"].items():
+        for key, value in stage.items():
+            _state.stages[name][key] += value
+    for name, peak in data["memory"].items():
+        _state.memory[name] = max(_state.memory.get(name, 0.0), peak)
+    _state.events.extend(data["events"])
+
+
+def summary():
+    """
+    Counters, per-stage totals and memory high-water marks as a dict. peak_mb holds
+    the traced peak of every stage, if memory was traced.
+    """
+    process_peak = peak_rss_mb()
+    return {
+        "counters": dict(sorted(_state.counters.items())),
+        "stages": {name: {"calls": stage["calls"], "wall_seconds": round(stage["wall"], 4),
+                          "cpu_seconds": round(stage["cpu"], 4)}
+                   for name, stage in _state.stages.items()},
+        "peak_mb": {name: round(peak, 1) for name, peak in _state.memory.items()},
+        "process_peak_rss_mb": round(process_peak, 1) if process_peak is not None else None,
+    }
+
+
+def write(prefix):
+    """
+    Write prefix.summary.json and the trace-event file prefix.trace.json.
+    """
+    with open(f"{prefix}.summary.json", "w") as file:
+        json.dump(summary(), file, indent=4)
+    with open(f"{prefix}.trace.json", "w") as file:
+        json.dump({"traceEvents": _state.events, "displayTimeUnit": "ms"}, file)
+    print(f"Instrumentation written to {prefix}.summary.json and {prefix}.trace.json")
+
+
+if os.environ.get(TRACE_ENV):
+    enable(memory=bool(os.environ.get(TRACE_MEMORY_ENV)))
@@ -0,0 +1,174 @@
+"""
+Fast, deterministic English identification for tweets.
+
+A cheap first pass scores each text by its share of non-ASCII letters, English and
+foreign stopwords, and common English character trigrams. Clear cases are accepted
+or rejected right away and only the ambiguous ones are sent to langdetect, which gets
+the original text. First-pass decisions are memoized by normalized text and langdetect
+results by original text, since copy-pasted tweets are common.
+"""
+import re
+from collections import OrderedDict
+from langdetect import DetectorFactory, detect
+
+# langdetect is randomized, a fixed seed makes the fallback stable between runs
+DetectorFactory.seed = 0
+
+word_pattern = re.compile(r"[^\W\d_]+")
+mention_pattern = re.compile(r"@\w+")
+
+ENGLISH_STOPWORDS = frozenset("""
+a about after again all also am an and any are as at back be because been before being
+best but by can could did do does doing down for from get got had has have having he her
+here him his how i if in into is it its just last like me more most my no not now of off
+on one only or our out over she should so some than that the their them then there these
+they this those through to too tonight up us very was watch watching we were what when
+where which while who why will win wins with won would you your
+""".split())
+
+# stopwords of the other languages that show up most in the dumps (es, fr, pt, de, it, nl)
+FOREIGN_STOPWORDS = frozenset("""
+al ao como con da das del dem den der des die dos du een el em en es est esta este et ganha
+gana gagne het ich ist je la las le les los mais mas met muito nicht no o os para pas pelo
+per pero por pour que qui se sie son su sur una une und van voor y zu
+""".split()) - ENGLISH_STOPWORDS
+
+# most common English character trigrams, "_" marks a word boundary
+ENGLISH_TRIGRAMS = frozenset(trigram.replace("_", " ") for trigram in """
+_th the he_ _an and nd_ ing ng_ _to to_ ion _of of_ er_ for _in is_ in_ es_ ed_ hat tha
+_is ati her ter re_ _wa was as_ his thi ere _be ver all you ou_ it_ ith wit _wi _ha hav
+ave st_ on_ ly_ ent est _re are ght igh ous men nce ons _fo _he _ho _wh _we _yo _so _it
+_go ins _wo won win bes _ma _no _co _pr ted _ca
+""".split())
+
+ACCEPT = "accept"
+REJECT = "reject"
+FALLBACK = "fallback"
+
+
+class LanguageIdentifier:
+    """
+    Two-stage English detector with a bounded memo.
+
+    Parameters:
+        max_non_ascii (float): Reject when more than this share of the letters is non-ASCII.
+        min_words (int): Texts with fewer words always go to the fallback detector.
+        accept_stopwords (float): Minimum share of English stopwords to accept.
+        accept_trigrams (float): Minimum share of common English trigrams to accept.
+        reject_trigrams (float): Reject stopword-free texts below this trigram share.
+        reject_foreign (float): Reject when this share of words are foreign stopwords
+            and almost none are English ones.
+        memo_size (int): Maximum number of memoized texts, per memo.
+    """
+
+    def __init__(self, max_non_ascii=0.15, min_words=3, accept_stopwords=0.2, accept_trigrams=0.12,
+                 reject_trigrams=0.05, reject_foreign=0.2, memo_size=200000):
+        self.max_non_ascii = max_non_ascii
+        self.min_words = min_words
+        self.accept_stopwords = accept_stopwords
+        self.accept_trigrams = accept_trigrams
+        self.reject_trigrams = reject_trigrams
+        self.reject_foreign = reject_foreign
+        self.memo_size = memo_size
+        # normalized text -> True, False or FALLBACK; original text -> langdetect result
+        self.memo = OrderedDict()
+        self.fallback_memo = OrderedDict()
+        self.counts = {ACCEPT: 0, REJECT: 0, FALLBACK: 0, "memo_hits": 0}
+
+    def classify(self, key):
+        """
+        First pass on a normalized text.
+
+        Returns:
+            str: ACCEPT, REJECT or FALLBACK.
+        """
+        letters = [ch for ch in key if ch.isalpha()]
+        # langdetect finds no features in a text without letters and the tweet is dropped
+        if not letters:
+            return REJECT
+        non_ascii = sum(1 for ch in letters if not ch.isascii())
+        if non_ascii / len(letters) > self.max_non_ascii:
+            return REJECT
+
+        words = key.split()
+        if len(words) < self.min_words:
+            return FALLBACK
+        stopwords = sum(1 for word in words if word in ENGLISH_STOPWORDS) / len(words)
+        foreign = sum(1 for word in words if word in FOREIGN_STOPWORDS) / len(words)
+
+        trigrams = 0
+        hits = 0
+        for word in words:
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                trigrams += 1
+                if padded[i:i + 3] in ENGLISH_TRIGRAMS:
+                    hits += 1
+        trigram_score = hits / trigrams
+
+        if foreign >= self.reject_foreign and stopwords < self.reject_foreign / 2:
+            return REJECT
+        if stopwords >= self.accept_stopwords and trigram_score >= self.accept_trigrams and foreign < stopwords:
+            return ACCEPT
+        if stopwords == 0 and trigram_score < self.reject_trigrams:
+            return REJECT
+        return FALLBACK
+
+    def is_english(self, text):
+        """
+        Check whether a tweet text is English.
+
+        Parameters:
+            text (str): Cleaned tweet text.
+
+        Returns:
+            bool: True if the text is English.
+        """
+        key = normalize(text)
+        result = self._recall(self.memo, key)
+        if result is None:
+            decision = self.classify(key)
+            self.counts[decision] += 1
+            result = FALLBACK if decision == FALLBACK else decision == ACCEPT
+            self._remember(self.memo, key, result)
+        if result != FALLBACK:
+            return result
+
+        # langdetect looks at casing, digits and punctuation too, so it gets the original text
+        result = self._recall(self.fallback_memo, text)
+        if result is None:
+            try:
+                result = detect(text) == 'en'
+            except:
+                result = False
+            self._remember(self.fallback_memo, text, result)
+        return result
+
+    def clear(self):
+        """
+        Forget every memoized text, e.g. to measure a cold run.
+        """
+        self.memo.clear()
+        self.fallback_memo.clear()
+
+    def _recall(self, memo, key):
+        result = memo.get(key)
+        if result is not None:
+            memo.move_to_end(key)
+            self.counts["memo_hits"] += 1
+        return result
+
+    def _remember(self, memo, key, result):
+        memo[key] = result
+        if len(memo) > self.memo_size:
+            memo.popitem(last=False)
+
+def normalize(text):
+    """
+    Memo key of a text: lowercase words without mentions, digits or punctuation.
+    """
+    return " ".join(word_pattern.findall(mention_pattern.sub(" ", text).lower()))
+
+
+# per-process identifier used by preprocess
+identifier = LanguageIdentifier()
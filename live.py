@@ -0,0 +1,407 @@
+"""
+Real-time mode: follow a stream of tweets and keep the host / award / winner /
+nominee / presenter results up to date while the ceremony is running.
+
+Tweets are read as newline-delimited JSON from stdin or a (tailed) file, cleaned
+like preprocess.preprocess_tweet, and folded into incremental aggregates. Every
+interval seconds the current result is written in the same shape as
+frame.save_json.
+
+    python live.py --input - < stream.ndjson
+    python live.py --input stream.ndjson --follow
+    python live.py --replay gg2013.json --speed 60
+
+The replay driver feeds an existing dump at N times the speed it was recorded,
+which is how the streaming path is tested without a live feed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from spacy.matcher import Matcher
+
+import data
+from awardmatch import AwardMatcher
+from frame import (AWARD_PATTERNS, NOMINEE_PATTERNS, PRESENTER_PATTERNS, HOST_PATTERN,
+                   HOST_CLAUSES, AWARD_CLAUSES, NOMINEE_CLAUSES, PRESENTER_CLAUSES,
+                   extract_names_from_doc, match_award_names, award_winners, could_match_award,
+                   clean_dict_keys, build_result)
+from gazetteer import get_gazetteer
+from models import get_nlp
+from names import NameResolver
+from preprocess import preprocess_tweet
+from tweetindex import token_pattern
+
+LIVE_RESULT_FILE = "live_result.json"
+# words that show up as host "names" but are not people
+IRRELEVANT_HOST_WORDS = {"host", "hosted", "hosting", "hosts", "golden globes"}
+# fields a stream record needs to become a Tweet
+RECORD_FIELDS = ("id", "text", "user", "timestamp_ms")
+
+
+def _matches_clauses(tokens, clauses):
+    return any(all(term in tokens for term in clause) for clause in clauses)
+
+
+def _prune(counter, cap):
+    """
+    Keep only the cap largest counts once a counter has grown to twice the cap,
+    so a long stream of one-off names cannot grow it without bound.
+    """
+    if len(counter) > 2 * cap:
+        kept = sorted(counter.items(), key=lambda item: item[1], reverse=True)[:cap]
+        counter.clear()
+        counter.update(kept)
+
+
+class LiveAggregator:
+    """
+    Incremental version of the find_host_candidate / find_awards / find_nominees /
+    find_presenters pipeline.
+
+    Parameters:
+        nlp: spaCy pipeline; the "extract" pipeline if not given.
+        presenter_window (int): ms around an award's mentions in which presenter
+            mentions are attributed to it, like find_presenters' time_window.
+        max_names (int): Number of names kept per counter.
+        max_awards (int): Number of award names kept.
+        recent_presenters (int): Number of presenter mentions kept to attribute them
+            to awards whose time range grows later; the oldest by timestamp go first.
+    """
+
+    def __init__(self, nlp=None, presenter_window=300000, max_names=1000, max_awards=500,
+                 recent_presenters=10000):
+        self.nlp = nlp if nlp is not None else get_nlp("extract")
+        self.presenter_window = presenter_window
+        self.max_names = max_names
+        self.max_awards = max_awards
+        self.gazetteer = get_gazetteer()
+        self.resolver = NameResolver()
+
+        self.award_matcher = Matcher(self.nlp.vocab)
+        self.award_matcher.add("AWARD", AWARD_PATTERNS)
+        self.nominee_matcher = Matcher(self.nlp.vocab)
+        self.nominee_matcher.add("NOMINEE_AWARD", NOMINEE_PATTERNS)
+        self.presenter_matcher = Matcher(self.nlp.vocab)
+        self.presenter_matcher.add("PRESENTER", PRESENTER_PATTERNS)
+
+        self.host_counts = defaultdict(int)
+        self.awards = {}
+        self.nominees = defaultdict(lambda: defaultdict(int))
+        self.presenters = defaultdict(lambda: defaultdict(int))
+        # presenter mentions sorted by timestamp: their timestamps, and (names, weight)
+        # at the same positions, so the mentions of a time range are found by bisection
+        self.recent_presenters = recent_presenters
+        self.mention_timestamps = []
+        self.mention_names = []
+        # AwardMatcher over the published awards, rebuilt when that set changes
+        self._award_names = None
+        self._award_name_matcher = None
+
+        self.tweets_seen = 0
+        self.tweets_parsed = 0
+        self.records_skipped = 0
+
+    def _window(self, award_data):
+        return (award_data["start_timestamp"] - self.presenter_window,
+                award_data["end_timestamp"] + self.presenter_window)
+
+    def _published_awards(self):
+        return [award for award, award_data in self.awards.items() if award_data["count"] > 1]
+
+    def _name_matcher(self):
+        names = tuple(self._published_awards())
+        if names != self._award_names:
+            self._award_names = names
+            self._award_name_matcher = AwardMatcher(names)
+        return self._award_name_matcher
+
+    def _attribute_presenters(self, award, names, weight=1):
+        for name in names:
+            self.presenters[award][name] += weight
+        _prune(self.presenters[award], self.max_names)
+
+    def _add_presenter_mention(self, timestamp, names, weight):
+        position = bisect_right(self.mention_timestamps, timestamp)
+        self.mention_timestamps.insert(position, timestamp)
+        self.mention_names.insert(position, (names, weight))
+        if len(self.mention_timestamps) > self.recent_presenters:
+            del self.mention_timestamps[0]
+            del self.mention_names[0]
+
+    def _presenter_mentions(self, start, end, include_start=True, include_end=True):
+        """
+        (names, weight) of the kept presenter mentions between start and end.
+        """
+        timestamps = self.mention_timestamps
+        first = (bisect_left if include_start else bisect_right)(timestamps, start)
+        last = (bisect_right if include_end else bisect_left)(timestamps, end)
+        return self.mention_names[first:last]
+
+    def _prune_awards(self):
+        """
+        Keep the max_awards most mentioned awards once there are twice as many, and
+        drop the nominees and presenters of the others with them. An award that comes
+        back later starts over and gets the kept presenter mentions of its window again.
+        """
+        if len(self.awards) > 2 * self.max_awards:
+            kept = sorted(self.awards.items(), key=lambda item: item[1]["count"], reverse=True)[:self.max_awards]
+            self.awards = dict(kept)
+            for award in list(self.nominees):
+                if award not in self.awards:
+                    del self.nominees[award]
+            for award in list(self.presenters):
+                if award not in self.awards:
+                    del self.presenters[award]
+
+    def _add_award(self, award, tweet, possible_winners):
+        award_data = self.awards.get(award)
+        if award_data is None:
+            award_data = self.awards[award] = {
+                "count": 0,
+                "winners": defaultdict(int),
+                "start_timestamp": tweet.timestamp,
+                "end_timestamp": tweet.timestamp
+            }
+            old_window = None
+        else:
+            old_window = self._window(award_data)
+        award_data["count"] += tweet.weight
+        award_data["start_timestamp"] = min(award_data["start_timestamp"], tweet.timestamp)
+        award_data["end_timestamp"] = max(award_data["end_timestamp"], tweet.timestamp)
+        for winner in award_winners(award, possible_winners, self.gazetteer):
+            award_data["winners"][winner] += tweet.weight
+        _prune(award_data["winners"], self.max_names)
+
+        # presenter mentions that the grown time range now covers: only the parts of the
+        # new window before and after the old one are looked up
+        new_start, new_end = self._window(award_data)
+        if old_window is None:
+            added = self._presenter_mentions(new_start, new_end)
+        else:
+            added = (self._presenter_mentions(new_start, old_window[0], include_end=False)
+                     + self._presenter_mentions(old_window[1], new_end, include_start=False))
+        for names, weight in added:
+            self._attribute_presenters(award, names, weight)
+
+        self._prune_awards()
+
+    def add(self, tweet):
+        """
+        Fold one preprocessed tweet into the aggregates. Only tweets with one of the
+        extractors' keywords are parsed.
+
+        Returns:
+            bool: Whether the tweet was parsed.
+        """
+        self.tweets_seen += 1
+        text = tweet.text
+        tokens = set(token_pattern.findall(text.lower()))
+        is_host = _matches_clauses(tokens, HOST_CLAUSES) and HOST_PATTERN.search(text)
+        is_award = _matches_clauses(tokens, AWARD_CLAUSES) and could_match_award(text)
+        is_nominee = _matches_clauses(tokens, NOMINEE_CLAUSES)
+        is_presenter = _matches_clauses(tokens, PRESENTER_CLAUSES)
+        if not (is_host or is_award or is_nominee or is_presenter):
+            return False
+
+        doc = self.nlp(text)
+        self.tweets_parsed += 1
+        names = extract_names_from_doc(doc)
+
+        if is_host:
+            for name in names:
+                self.host_counts[name] += tweet.weight
+            _prune(self.host_counts, self.max_names)
+
+        if is_award:
+            for award in match_award_names(doc, self.award_matcher):
+                self._add_award(award, tweet, names)
+
+        if is_nominee:
+            matches = self.nominee_matcher(doc)
+            award_text = self._name_matcher().first_award(text) if matches else None
+            if award_text:
+                for match_id, start, end in matches:
+                    nominee_text = None
+                    for token in doc[start:end]:
+                        if token.ent_type_ in {"PERSON", "ORG", "WORK_OF_ART"}:
+                            nominee_text = token.text
+                    if nominee_text:
+                        self.nominees[award_text][nominee_text] += tweet.weight
+                _prune(self.nominees[award_text], self.max_names)
+
+        if is_presenter and self.presenter_matcher(doc):
+            presenter_names = [ent.text for ent in doc.ents if ent.label_ == "PERSON"]
+            if presenter_names:
+                self._add_presenter_mention(tweet.timestamp, presenter_names, tweet.weight)
+                for award, award_data in self.awards.items():
+                    start, end = self._window(award_data)
+                    if start <= tweet.timestamp <= end:
+                        self._attribute_presenters(award, presenter_names, tweet.weight)
+        return True
+
+    def result(self):
+        """
+        The current results in the frame.save_json shape.
+        """
+        merged_hosts = clean_dict_keys(self.resolver.merge(self.host_counts), self.resolver)
+        host_candidates = {name: count for name, count in
+                           sorted(merged_hosts.items(), key=lambda item: item[1], reverse=True)
+                           if name.lower() not in IRRELEVANT_HOST_WORDS}
+
+        awards = {}
+        for award in sorted(self._published_awards(), key=lambda award: self.awards[award]["count"], reverse=True):
+            award_data = self.awards[award]
+            awards[award] = {**award_data, "winners": clean_dict_keys(award_data["winners"])}
+
+        nominees = {award: list(set(awards[award]["winners"]) | set(self.nominees.get(award, ())))
+                    for award in awards}
+        presenters = {award: list(self.presenters.get(award, ())) for award in awards}
+        return build_result(host_candidates, awards, nominees, presenters)
+
+
+def publish(result, filename):
+    """
+    Write the result atomically, so readers never see a half-written file.
+    """
+    temporary = filename + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(result, file, indent=4)
+    os.replace(temporary, filename)
+
+
+def iter_stream(source, follow=False, poll_interval=0.5):
+    """
+    Yield tweet records from an NDJSON file or stdin ("-").
+
+    With follow the file is tailed like tail -f: at the end of the file the reader
+    waits for more lines and yields None after every idle poll, so the caller can
+    still publish while the stream is quiet.
+    """
+    file = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8')
+    try:
+        partial = ""
+        while True:
+            line = file.readline()
+            if not line:
+                if not follow or source == "-":
+                    break
+                yield None
+                time.sleep(poll_interval)
+                continue
+            partial += line
+            # a line that is still being written has no newline yet
+            if not partial.endswith("\n") and follow:
+                continue
+            line, partial = partial.strip(), ""
+            if not line or line in ("[", "]"):
+                continue
+            try:
+                yield json.loads(line.rstrip(","))
+            except json.JSONDecodeError:
+                continue
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def replay(filename, speed=1.0):
+    """
+    Yield the records of an existing dump at speed times the pace they were
+    recorded at, using their timestamp_ms.
+    """
+    first_timestamp = None
+    started = time.monotonic()
+    for record in data.iter_records(filename):
+        timestamp = record.get("timestamp_ms")
+        if timestamp is not None:
+            timestamp = int(timestamp)
+            if first_timestamp is None:
+                first_timestamp = timestamp
+            delay = (timestamp - first_timestamp) / 1000 / speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+        yield record
+
+
+def valid_record(record):
+    """
+    The record with an integer timestamp_ms if it has every field of RECORD_FIELDS
+    and a usable text and timestamp, None otherwise.
+    """
+    if not isinstance(record, dict) or any(record.get(field) is None for field in RECORD_FIELDS):
+        return None
+    if not isinstance(record["text"], str):
+        return None
+    try:
+        timestamp = int(record["timestamp_ms"])
+    except (TypeError, ValueError):
+        return None
+    return {**record, "timestamp_ms": timestamp}
+
+
+def run(records, aggregator, output=LIVE_RESULT_FILE, interval=10.0):
+    """
+    Feed the records to the aggregator and publish the result every interval
+    seconds and once more at the end of the stream.
+
+    The latency printed with every publish is the time between the oldest tweet
+    that arrived since the previous publish and the publish that includes it.
+    Records without one of RECORD_FIELDS are skipped and counted.
+    """
+    next_publish = time.monotonic() + interval
+    oldest_pending = None
+    latencies = []
+
+    def publish_now():
+        nonlocal oldest_pending
+        publish(aggregator.result(), output)
+        now = time.monotonic()
+        if oldest_pending is not None:
+            latencies.append(now - oldest_pending)
+            oldest_pending = None
+        latency = f"{latencies[-1]:.2f}s" if latencies else "-"
+        print(f"published {output}: {aggregator.tweets_seen} tweets, {aggregator.tweets_parsed} parsed, "
+              f"{aggregator.records_skipped} skipped, {len(aggregator._published_awards())} awards, "
+              f"latency {latency}", file=sys.stderr)
+
+    for record in records:
+        if record is not None:
+            arrived = time.monotonic()
+            record = valid_record(record)
+            tweet = preprocess_tweet(record) if record is not None else None
+            if record is None:
+                aggregator.records_skipped += 1
+            elif tweet is not None:
+                aggregator.add(tweet)
+                if oldest_pending is None:
+                    oldest_pending = arrived
+        if time.monotonic() >= next_publish:
+            publish_now()
+            next_publish = time.monotonic() + interval
+    publish_now()
+
+    if latencies:
+        print(f"latency: mean {sum(latencies) / len(latencies):.2f}s, max {max(latencies):.2f}s", file=sys.stderr)
+    return aggregator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow a tweet stream and keep the results up to date.")
+    parser.add_argument("--input", default="-", help="NDJSON file to read, - for stdin")
+    parser.add_argument("--follow", action="store_true", help="keep reading the input file as it grows")
+    parser.add_argument("--replay", metavar="DUMP", help="replay an existing dump instead of reading --input")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between published results")
+    parser.add_argument("--output", default=LIVE_RESULT_FILE)
+    arguments = parser.parse_args()
+
+    if arguments.replay:
+        stream = replay(arguments.replay, arguments.speed)
+    else:
+        stream = iter_stream(arguments.input, arguments.follow)
+    run(stream, LiveAggregator(), arguments.output, arguments.interval)
@@ -0,0 +1,61 @@
+"""
+Per-process registry of spaCy pipelines.
+
+Every stage declares the pipeline components it needs and the registry loads the
+model once per process for each distinct component set, excluding everything else.
+Use init_worker as the ProcessPoolExecutor initializer so the models are loaded
+when a worker starts instead of inside every task.
+"""
+import spacy
+
+MODEL_NAME = "en_core_web_sm"
+
+# components of en_core_web_sm, in pipeline order
+ALL_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
+# components needed by each stage. ner carries its own embedding layer, so PERSON
+# extraction does not need tok2vec. The award Matcher checks POS, which comes from
+# the tagger (listening to tok2vec) mapped by the attribute ruler.
+STAGE_COMPONENTS = {
+    "names": ["ner"],
+    "hosts": ["ner"],
+    "awards": ["tok2vec", "tagger", "attribute_ruler", "ner"],
+    "nominees": ["ner"],
+    "presenters": ["ner"],
+    # shared DocCache used by all extractors
+    "extract": ["tok2vec", "tagger", "attribute_ruler", "ner"],
+    # the same without NER, for speed profiles that skip entity recognition
+    "extract_no_ner": ["tok2vec", "tagger", "attribute_ruler"],
+    "full": ALL_COMPONENTS,
+}
+
+_models = {}
+
+
+def get_nlp(stage="full"):
+    """
+    Pipeline for the given stage, loaded at most once per process.
+
+    Parameters:
+        stage (str): A key of STAGE_COMPONENTS.
+
+    Returns:
+        Language: The spaCy pipeline with only the stage's components.
+    """
+    if stage not in STAGE_COMPONENTS:
+        raise ValueError(f"Unknown stage '{stage}'. Use one of {sorted(STAGE_COMPONENTS)}.")
+    components = tuple(c for c in ALL_COMPONENTS if c in STAGE_COMPONENTS[stage])
+    nlp = _models.get(components)
+    if nlp is None:
+        exclude = [c for c in ALL_COMPONENTS if c not in components]
+        nlp = spacy.load(MODEL_NAME, exclude=exclude)
+        _models[components] = nlp
+    return nlp
+
+
+def init_worker(*stages):
+    """
+    ProcessPoolExecutor initializer that loads the pipelines of the given stages.
+    """
+    for stage in stages or ("extract",):
+        get_nlp(stage)
@@ -0,0 +1,276 @@
+"""
+Person-name extraction backends.
+
+SpacyNameExtractor runs the NER pipeline and keeps the short PERSON spans, as the
+extractors always did. FastNameExtractor finds names without parsing: runs of
+capitalized words are cut into two-word candidates, which are accepted when the
+first-name lexicon, the person entries of the offline gazetteer or the names already
+confirmed in this run vouch for them. Single words are kept when they are part of a
+confirmed name ("Poehler" after "Amy Poehler"). Only candidates none of these can
+decide go to spaCy, and only one tweet per distinct candidate; the verdict is
+remembered for the rest of the run.
+
+    extractor = get_name_extractor("fast", nlp)
+    names = extractor.extract(texts)   # one list of names per text
+"""
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from gazetteer import get_gazetteer
+from language import ENGLISH_STOPWORDS
+import instrument
+
+# words, with inner apostrophes, hyphens and dots ("O'Brien", "Day-Lewis")
+word_pattern = re.compile(r"[^\W\d_]+(?:['’.\-][^\W\d_]+)*")
+possessive_pattern = re.compile(r"['’]s$")
+
+# common given names, lowercase, without the ones in AMBIGUOUS_FIRST_NAMES
+FIRST_NAMES = frozenset("""
+aaron adam adele adrian aidan alan albert alec alex alexander alexandra alice alicia alison amanda
+amy andrea andrew andy angela angelina ann anna anne annette anthony ashley audrey barbara ben
+benedict benjamin beth betty billy blake bonnie brad bradley brandon brenda brian brie bruce bryan
+carey carl caroline carrie catherine cate charles charlie chris christian christina christine
+christoph christopher claire clint colin connie craig cynthia damian dan dana daniel danny david
+deborah debra denis denise dennis denzel diane donald dorothy doug douglas dustin dylan ed eddie
+edward elizabeth ellen emily emma eric erin ethan eva frances fred gary george gerard glenn greg
+gwyneth halle hannah harrison harry heather heidi helen henry hillary hugh ian isabella jackie jacob
+jake james jamie jane janet jason javier jeff jeffrey jennifer jeremy jerry jesse jessica jessie jim
+jimmy joan joaquin jodie joe joel john johnny jon jonah jonathan jose joseph josh joshua judi judith
+judy julia julian julianne julie justin karen kate katherine kathleen kathryn kathy katie keira
+keith kelly ken kenneth kevin kim kristen kristin kyle laura lauren leonardo lena leslie liam linda
+lindsay lisa louis lucy luke maggie marcia margaret maria marie marion martin mary matt matthew
+megan meryl michael michelle mike mila natalie nancy naomi nathan nicholas nicole nina noah olivia
+oliver pamela patricia patrick paul peter philip quentin rachel ralph rebecca richard robert ron
+ruth ryan sacha sally salma sam samantha samuel sandra sara sarah scarlett scott sean seth sharon
+shirley simon sophia stephanie stephen steve steven susan sylvester taylor ted teresa terry thomas
+tim timothy tina tom tommy tony tyler uma valerie vanessa vincent viola walter wayne william zach
+zachary zoe
+""".split())
+
+# given names that are also common words or places ("Will", "Grace", "Mark", "Jordan"):
+# they do not end a capitalized run, but only the gazetteer, a confirmed name or spaCy
+# can accept a candidate starting with one of them
+AMBIGUOUS_FIRST_NAMES = frozenset("""
+amber bill bob carol charlotte chuck dakota dean don drew frank gene grace helena jack jordan joy
+kerry lily mark nick ray rob robin rose sofia sue victoria will
+""".split())
+
+# capitalized words that are not names, on top of the English stopwords
+NON_NAME_WORDS = ENGLISH_STOPWORDS | frozenset("""
+golden globes globe goldenglobes award awards actor actress drama comedy musical motion picture
+film movie series tv television performance host hosts hosting hosted congrats congratulations
+winner winners nominee nominees nominated presenter presents present red carpet hollywood
+oscar oscars rt omg lol love loving yes wow great amazing happy watching
+""".split())
+
+
+def person_names(doc):
+    """
+    PERSON entities of a parsed doc, without names of three or more words and
+    possessives.
+    """
+    return [
+        ent.text for ent in doc.ents
+        if ent.label_ == "PERSON"
+        and len(ent.text.split()) < 3
+        and not ent.text.endswith("'s")
+    ]
+
+
+def capitalized_runs(text):
+    """
+    Runs of capitalized words only separated by whitespace, as lists of words.
+    All-caps words and the words of NON_NAME_WORDS that are not also first names
+    (FIRST_NAMES or AMBIGUOUS_FIRST_NAMES) end a run, and so does a possessive, which
+    is kept without its "'s".
+    """
+    runs, run = [], []
+    end = 0
+    for match in word_pattern.finditer(text):
+        word = match.group()
+        # anything but whitespace between two words ends the run
+        if run and text[end:match.start()].strip():
+            runs.append(run)
+            run = []
+        end = match.end()
+        lower = word.lower()
+        given_name = lower in FIRST_NAMES or lower in AMBIGUOUS_FIRST_NAMES
+        if not word[0].isupper() or word.isupper() or (lower in NON_NAME_WORDS and not given_name):
+            if run:
+                runs.append(run)
+                run = []
+            continue
+        possessive = possessive_pattern.search(word)
+        if possessive:
+            run.append(word[:possessive.start()])
+            runs.append(run)
+            run = []
+        else:
+            run.append(word)
+    if run:
+        runs.append(run)
+    return runs
+
+
+class NameExtractor(ABC):
+    """
+    Interface of the backends: extract takes a list of texts and returns a list of
+    person names for each of them.
+    """
+
+    @abstractmethod
+    def extract(self, texts):
+        pass
+
+    def extract_one(self, text):
+        return self.extract([text])[0]
+
+
+class SpacyNameExtractor(NameExtractor):
+    """
+    PERSON entities of spaCy's NER, parsed in nlp.pipe batches.
+    """
+
+    def __init__(self, nlp, batch_size=1000):
+        self.nlp = nlp
+        self.batch_size = batch_size
+
+    def extract(self, texts):
+        instrument.count("names.spacy_parses", len(texts))
+        return [person_names(doc) for doc in self.nlp.pipe(texts, batch_size=self.batch_size)]
+
+
+class FastNameExtractor(NameExtractor):
+    """
+    Lexicon and gazetteer based extractor that only asks spaCy about candidates it
+    cannot decide.
+
+    Parameters:
+        nlp (Language): Pipeline with NER for the undecided candidates; None rejects them.
+        gazetteer (Gazetteer): Offline gazetteer whose person entries are accepted; the
+            default one if None, which is None itself if it has not been built.
+        max_rejected (int): Maximum number of remembered non-names.
+    """
+
+    def __init__(self, nlp=None, gazetteer=None, max_rejected=100000):
+        self.nlp = nlp
+        self.gazetteer = gazetteer if gazetteer is not None else get_gazetteer()
+        self.max_rejected = max_rejected
+        # names confirmed in this run and their words, for single-word mentions
+        self.confirmed = set()
+        self.confirmed_words = set()
+        self.rejected = OrderedDict()
+        self.counts = {"texts": 0, "lexicon": 0, "spacy_candidates": 0, "spacy_parses": 0}
+
+    def confirm(self, name):
+        self.confirmed.add(name)
+        self.confirmed_words.update(name.split())
+
+    def _reject(self, name):
+        self.rejected[name] = True
+        if len(self.rejected) > self.max_rejected:
+            self.rejected.popitem(last=False)
+
+    def pair_verdict(self, first, last):
+        """
+        True if "first last" is a name, False if it is known not to be one, None if
+        only spaCy can tell.
+        """
+        name = f"{first} {last}"
+        if name in self.confirmed:
+            return True
+        if name in self.rejected:
+            return False
+        if first.lower() in FIRST_NAMES or (self.gazetteer is not None and self.gazetteer.is_person(name)):
+            self.counts["lexicon"] += 1
+            self.confirm(name)
+            return True
+        return None
+
+    def _undecided(self, run):
+        """
+        Candidate pairs of a run the lexicons cannot decide, walking the run the way
+        _names does: a pair is not asked about when the next one is a known name.
+        """
+        pairs = []
+        i = 0
+        while i < len(run) - 1:
+            verdict = self.pair_verdict(run[i], run[i + 1])
+            if verdict:
+                i += 2
+                continue
+            if verdict is None and not (i + 2 < len(run) and self.pair_verdict(run[i + 1], run[i + 2])):
+                pairs.append(f"{run[i]} {run[i + 1]}")
+            i += 1
+        return pairs
+
+    def _names(self, runs):
+        names = []
+        for run in runs:
+            i = 0
+            while i < len(run):
+                if i + 1 < len(run) and self.pair_verdict(run[i], run[i + 1]):
+                    names.append(f"{run[i]} {run[i + 1]}")
+                    i += 2
+                    continue
+                # single words are names only as part of a confirmed name
+                if run[i] in self.confirmed_words:
+                    names.append(run[i])
+                i += 1
+        return names
+
+    def _ask_spacy(self, candidates):
+        """
+        Parse one tweet per undecided candidate and remember the verdicts. Every short
+        PERSON name found on the way is confirmed as well.
+        """
+        texts = list(candidates.values())
+        self.counts["spacy_candidates"] += len(candidates)
+        self.counts["spacy_parses"] += len(texts)
+        instrument.count("names.spacy_parses", len(texts))
+        found = set()
+        for doc in self.nlp.pipe(texts):
+            for name in person_names(doc):
+                found.add(name)
+                if len(name.split()) == 2:
+                    self.confirm(name)
+        for candidate in candidates:
+            if candidate not in found:
+                self._reject(candidate)
+
+    def extract(self, texts):
+        self.counts["texts"] += len(texts)
+        all_runs = [capitalized_runs(text) for text in texts]
+        # the first tweet of every undecided candidate is parsed, all in one batch
+        candidates = {}
+        for text, runs in zip(texts, all_runs):
+            for run in runs:
+                for pair in self._undecided(run):
+                    candidates.setdefault(pair, text)
+        if candidates:
+            if self.nlp is not None:
+                self._ask_spacy(candidates)
+            else:
+                for candidate in candidates:
+                    self._reject(candidate)
+        return [self._names(runs) for runs in all_runs]
+
+
+# backends selectable by name, see get_name_extractor
+BACKENDS = {"spacy": SpacyNameExtractor, "fast": FastNameExtractor}
+
+
+def get_name_extractor(backend="spacy", nlp=None):
+    """
+    Name extractor of the given backend.
+
+    Parameters:
+        backend (str): "spacy" or "fast".
+        nlp (Language): NER pipeline; required by "spacy", used by "fast" for the
+            candidates it cannot decide.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown name backend '{backend}'. Use one of {sorted(BACKENDS)}.")
+    if backend == "spacy" and nlp is None:
+        raise ValueError("The spacy name backend needs an nlp pipeline.")
+    return BACKENDS[backend](nlp)
@@ -0,0 +1,197 @@
+"""
+Scalable fuzzy merging of person-name counts.
+
+Replaces the quadratic fuzzywuzzy loop of frame.merge_name_counts. Names are only
+compared inside blocks keyed by first initial and surname prefix, with a bounded edit
+distance, and close matches are joined with union-find. Partial names ("Amy") are then attached to
+the single most mentioned full name that contains all their tokens ("Amy Poehler").
+Each cluster is reported under its longest name.
+"""
+import unicodedata
+from collections import defaultdict
+import instrument
+
+
+def normalize_name(name):
+    """
+    Casefolded and without accents ("Penélope Cruz" -> "penelope cruz"), with every run
+    of characters that are not letters or digits, in any script, turned into one space.
+    """
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    text = "".join(char if char.isalnum() else " " for char in decomposed if not unicodedata.combining(char))
+    return " ".join(text.split())
+
+
+def bounded_distance(a, b, max_distance):
+    """
+    Edit distance between a and b counting adjacent transpositions as one edit
+    (optimal string alignment), or max_distance + 1 as soon as it is known to be larger.
+    Only the diagonal band of width max_distance is computed.
+    """
+    too_far = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return too_far
+    if len(a) > len(b):
+        a, b = b, a
+    before_previous = None
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= max_distance:
+            current[0] = i
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        char_a = a[i - 1]
+        for j in range(low, high + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != b[j - 1]))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before_previous[j - 2] + 1)
+            current[j] = value
+        if min(current[low - 1:high + 1]) > max_distance:
+            return too_far
+        before_previous, previous = previous, current
+    return min(previous[len(b)], too_far)
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[b] = a
+        return a
+
+
+class NameResolver:
+    """
+    Blocking + bounded edit distance + union-find name clustering.
+
+    Parameters:
+        threshold (int): Similarity (0-100) two full names need to be merged, where the
+            similarity is 100 * (1 - edit distance / length of the longer name).
+        prefix_length (int): Names with the same first initial and the same first
+            prefix_length characters of the surname (last word) land in the same block.
+        max_block (int): Blocks up to this size are compared pairwise; larger blocks are
+            sorted and each name is only compared with its next window neighbours.
+        window (int): Neighbourhood size for large blocks.
+    """
+
+    def __init__(self, threshold=90, prefix_length=2, max_block=50, window=20):
+        self.threshold = threshold
+        self.prefix_length = prefix_length
+        self.max_block = max_block
+        self.window = window
+        self.comparisons = 0
+
+    def _similar(self, a, b):
+        self.comparisons += 1
+        longest = max(len(a), len(b))
+        if not longest:
+            return True
+        max_distance = int(longest * (100 - self.threshold) / 100)
+        return bounded_distance(a, b, max_distance) <= max_distance
+
+    def merge(self, name_counts):
+        """
+        Merge the counts of names that refer to the same person.
+
+        Parameters:
+            name_counts (dict): Names as keys and counts as values.
+
+        Returns:
+            dict: Canonical (longest) name of each cluster and the summed count,
+            in order of first appearance.
+        """
+        comparisons_before = self.comparisons
+        names = list(name_counts)
+        counts = [name_counts[name] for name in names]
+        normalized = [normalize_name(name) for name in names]
+        tokens = [frozenset(text.split()) for text in normalized]
+        groups = _UnionFind(len(names))
+
+        # same normalized text or the same words in another order; names without any
+        # letter or digit have no words to compare and are left on their own
+        first_by_tokens = {}
+        representatives = []
+        for i, key in enumerate(tokens):
+            if not key:
+                representatives.append(i)
+            elif key in first_by_tokens:
+                groups.union(first_by_tokens[key], i)
+            else:
+                first_by_tokens[key] = i
+        representatives.extend(first_by_tokens.values())
+
+        # typos, compared only inside initial + surname-prefix blocks
+        blocks = defaultdict(list)
+        for i in representatives:
+            words = normalized[i].split()
+            if words:
+                blocks[(words[0][0], words[-1][:self.prefix_length])].append(i)
+        for block in blocks.values():
+            if len(block) <= self.max_block:
+                pairs = ((block[a], block[b]) for a in range(len(block)) for b in range(a + 1, len(block)))
+            else:
+                ordered = sorted(block, key=lambda i: normalized[i])
+                pairs = ((ordered[a], ordered[b]) for a in range(len(ordered))
+                         for b in range(a + 1, min(a + 1 + self.window, len(ordered))))
+            for i, j in pairs:
+                if groups.find(i) != groups.find(j) and self._similar(normalized[i], normalized[j]):
+                    groups.union(i, j)
+
+        cluster_counts = defaultdict(int)
+        for i, count in enumerate(counts):
+            cluster_counts[groups.find(i)] += count
+
+        # attach partial names to the most mentioned cluster whose name contains all
+        # their tokens; shortest names go first so chains end at a full name
+        containing = defaultdict(set)
+        for i in representatives:
+            for token in tokens[i]:
+                containing[token].add(i)
+        for i in sorted(representatives, key=lambda i: len(tokens[i])):
+            if not tokens[i]:
+                continue
+            supersets = set.intersection(*(containing[token] for token in tokens[i]))
+            root = groups.find(i)
+            best = None
+            for j in supersets:
+                other = groups.find(j)
+                if other == root or len(tokens[j]) <= len(tokens[i]):
+                    continue
+                if best is None or cluster_counts[other] > cluster_counts[best]:
+                    best = other
+            if best is not None:
+                merged = groups.union(best, root)
+                cluster_counts[merged] = cluster_counts.pop(best, 0) + cluster_counts.pop(root, 0)
+
+        # report every cluster under its longest name
+        canonical = {}
+        for i, name in enumerate(names):
+            root = groups.find(i)
+            if root not in canonical or len(name) > len(names[canonical[root]]):
+                canonical[root] = i
+        merged_counts = {}
+        for i in range(len(names)):
+            name = names[canonical[groups.find(i)]]
+            merged_counts[name] = merged_counts.get(name, 0) + counts[i]
+        instrument.count("names.comparisons", self.comparisons - comparisons_before)
+        return merged_counts
+
+
+def resolve_name_counts(name_dict, threshold=90):
+    """
+    Drop-in for frame.merge_name_counts using the NameResolver.
+    """
+    return NameResolver(threshold).merge(name_dict)
@@ -0,0 +1,83 @@
+"""
+Text normalization with a fast path for clean ASCII.
+
+ftfy and unidecode are the most expensive calls of preprocessing, but most tweets are
+plain printable ASCII, which neither of them changes. A text made only of printable
+ASCII, tabs and newlines, without an "&" that could start an HTML entity, is returned
+as it is. Everything else (non-ASCII characters, where mojibake lives, control
+characters, carriage returns, entities) takes the full path, which is memoized by raw
+text, since copy-pasted tweets are common. Results are the same as calling
+ftfy.fix_text and unidecode.unidecode directly.
+"""
+import re
+from collections import OrderedDict
+from ftfy import fix_text
+import unidecode
+
+# anything ftfy could change in an ASCII text: control characters other than tab and
+# newline, carriage returns (line break fixes) and "&" (HTML entities)
+unsafe_ascii_pattern = re.compile(r"[^\x20-\x7e\t\n]|&")
+
+FAST = "fast"
+FULL = "full"
+MEMO_HITS = "memo_hits"
+
+
+class TextNormalizer:
+    """
+    ftfy and unidecode behind a clean-text detector and a bounded memo.
+
+    Parameters:
+        memo_size (int): Maximum number of memoized texts per function.
+    """
+
+    def __init__(self, memo_size=100000):
+        self.memo_size = memo_size
+        self.fix_memo = OrderedDict()
+        self.ascii_memo = OrderedDict()
+        # path counts of fix_text and to_ascii
+        self.counts = {f"fix_{FAST}": 0, f"fix_{FULL}": 0, f"fix_{MEMO_HITS}": 0,
+                       f"ascii_{FAST}": 0, f"ascii_{FULL}": 0, f"ascii_{MEMO_HITS}": 0}
+
+    def clear(self):
+        """
+        Forget every memoized text, e.g. to measure a cold run.
+        """
+        self.fix_memo.clear()
+        self.ascii_memo.clear()
+
+    def _memoized(self, memo, prefix, function, text):
+        result = memo.get(text)
+        if result is not None:
+            memo.move_to_end(text)
+            self.counts[f"{prefix}_{MEMO_HITS}"] += 1
+            return result
+        self.counts[f"{prefix}_{FULL}"] += 1
+        result = function(text)
+        memo[text] = result
+        if len(memo) > self.memo_size:
+            memo.popitem(last=False)
+        return result
+
+    def fix_text(self, text):
+        """
+        Same as ftfy.fix_text(text).
+        """
+        if text.isascii() and not unsafe_ascii_pattern.search(text):
+            self.counts[f"fix_{FAST}"] += 1
+            return text
+        return self._memoized(self.fix_memo, "fix", fix_text, text)
+
+    def to_ascii(self, text):
+        """
+        Same as unidecode.unidecode(text).
+        """
+        # unidecode maps every ASCII character to itself
+        if text.isascii():
+            self.counts[f"ascii_{FAST}"] += 1
+            return text
+        return self._memoized(self.ascii_memo, "ascii", unidecode.unidecode, text)
+
+
+# per-process normalizer used by preprocess
+normalizer = TextNormalizer()
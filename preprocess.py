@@ -3,24 +3,33 @@ Preprocess each tweet in the dataset. Store the preprocessed tweets in a list.
 """
 
 import re
-import json
-from tweet import Tweet
-from ftfy import fix_text
-import unidecode
-from langdetect import detect, detect_langs
-from concurrent.futures import ProcessPoolExecutor
-import pickle
+from tweet import Tweet, TweetStore, is_tweet_file
+from language import identifier
+from normalization import normalizer
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from data import iter_chunks
+from time import perf_counter, process_time, time
+import instrument
+import checkpoint
 import os
+import sys
 
 hashtag_pattern = re.compile(r"#(\w+)")
 extrawhitespace_pattern = re.compile(r'\s+')
 url_pattern = re.compile(r"http\S+")
-CACHE_FILE = "cache.pkl"
+non_alphanumeric_pattern = re.compile(r'\W+')
+# One scan for the fused cleaner: a "gap" is a run of whitespace and URLs, a tag is a
+# hashtag. Hashtags stop in front of a URL, as they would after the URL was removed.
+clean_pattern = re.compile(r"(?P<gap>(?:\s+|http\S+)+)|#(?P<tag>(?:(?!http\S)\w)+)")
+CACHE_FILE = "cache.tweets"
+CHUNK_SIZE = 5000
+# timed stages of preprocess_chunk, in order
+STAGES = ("fix_text", "clean", "language")
 
 def english_only(data):
     '''
     Given a dataset of tweet data, remove all non-English tweets.
-    Use langdetect to detect the language of the tweet.
+    Use the language identifier to detect the language of the tweet.
     :param data: a json object representing a tweet.
     :return: cleaned tweet string.
     '''
@@ -28,15 +37,18 @@ def english_only(data):
     find hashtags and remove them first
     then remove non-english tweets
     '''
-    text = data["text"]
-    try:
-        lang = detect(text)
-        if lang == 'en':
-            return data
-        else:
-            return None
-    except:
-        return None
+    if is_english(data["text"]):
+        return data
+    return None
+
+def is_english(text):
+    '''
+    Check whether a tweet text is English. Clear cases are decided by a cheap
+    stopword/trigram pass and only ambiguous ones go to langdetect.
+    :param text: cleaned tweet string.
+    :return: True if the detected language is English.
+    '''
+    return identifier.is_english(text)
 
 def extract_hashtags(data):
     '''
@@ -57,10 +69,11 @@ def extract_hashtags(data):
 def substitute_scrap(data):
     '''
     Given a dataset of tweet data, substitute all scrap characters using ftfy.
+    Clean ASCII texts skip ftfy, see normalization.py.
     :param data: a json object representing a tweet.
     :return: cleaned tweet string.
     '''
-    data["text"] = fix_text(data["text"])
+    data["text"] = normalizer.fix_text(data["text"])
     return data
 
 def exclude_non_alphanumeric(data):
@@ -71,8 +84,8 @@ def exclude_non_alphanumeric(data):
     :return: cleaned tweet string.
     '''
     text = data["text"]
-    text = unidecode.unidecode(text)
-    text = re.sub(r'\W+', ' ', text)
+    text = normalizer.to_ascii(text)
+    text = non_alphanumeric_pattern.sub(' ', text)
     data["text"] = text
     return data
 
@@ -108,66 +121,210 @@ def remove_retweets(data):
         return None
     return data
 
+def clean_text(text):
+    '''
+    Fused single-pass cleaner. Removes URLs, extracts hashtags and collapses whitespace
+    in one scan, giving the same result as process_url, extract_hashtags and
+    exclude_extra_whitespace applied one after another.
+    :param text: tweet string, already passed through ftfy.
+    :return: (cleaned text, hashtags).
+    '''
+    hashtags = []
+
+    def replace(match):
+        tag = match.group("tag")
+        if tag is not None:
+            hashtags.append(tag)
+            return match.group(0)
+        # a gap without whitespace is a single URL at the very end of the text
+        return "" if url_pattern.fullmatch(match.group("gap")) else " "
+
+    text = clean_pattern.sub(replace, text).strip()
+    return text, hashtags
+
 def preprocess_tweet(line):
-    substitute_scrap(line)
-    process_url(line)
-    hashtag = extract_hashtags(line)
-    line = remove_retweets(line)
-    if line is None:
+    '''
+    Preprocess one raw tweet.
+    :param line: a json object representing a tweet.
+    :return: Tweet, or None for retweets and non-English tweets.
+    '''
+    text, hashtags = clean_text(normalizer.fix_text(line["text"]))
+    if text.startswith("RT") or not is_english(text):
         return None
-    en_tweet = english_only(line)
-    if en_tweet:
-        tweet = Tweet()
-        text = exclude_extra_whitespace(en_tweet["text"])
-        tweet.text = text
-        tweet.hashtags = hashtag
-        tweet.timestamp = line['timestamp_ms']
-        tweet.user = line['user']
-        tweet.id = line['id']
-        return tweet
-    return None
+    return Tweet(id=line['id'], text=text, user=line['user'], timestamp=line['timestamp_ms'], hashtags=hashtags)
 
-def preprocess(file):
+def project_record(record):
+    '''
+    Keep only the fields preprocessing needs, so less is pickled to the workers.
+    :param record: a json object representing a tweet.
+    :return: (id, text, user, timestamp) tuple.
+    '''
+    return record['id'], record['text'], record['user'], record['timestamp_ms']
+
+def preprocess_chunk(records):
+    """
+    Preprocess a chunk of projected tweet records inside a worker process.
+
+    Parameters:
+        records (list): (id, text, user, timestamp) tuples from project_record.
+
+    Returns:
+        tuple: (rows, stats). rows are (id, text, user, timestamp, hashtags) tuples of the
+        kept tweets; stats holds the seconds spent in each stage and the tweet counts.
+    """
+    chunk_start, chunk_wall, chunk_cpu = time(), perf_counter(), process_time()
+    stats = {stage: 0.0 for stage in STAGES}
+    stats.update(tweets_in=len(records), retweets=0, non_english=0)
+    language_counts = dict(identifier.counts)
+    normalization_counts = dict(normalizer.counts)
+    rows = []
+    for tweet_id, text, user, timestamp in records:
+        start = perf_counter()
+        text = normalizer.fix_text(text)
+        fixed = perf_counter()
+        text, hashtags = clean_text(text)
+        cleaned = perf_counter()
+        stats["fix_text"] += fixed - start
+        stats["clean"] += cleaned - fixed
+        if text.startswith("RT"):
+            stats["retweets"] += 1
+            continue
+        english = is_english(text)
+        stats["language"] += perf_counter() - cleaned
+        if not english:
+            stats["non_english"] += 1
+            continue
+        rows.append((tweet_id, text, user, timestamp, hashtags))
+    # the identifier and the normalizer keep per-process totals, report only this chunk's share
+    for key, value in identifier.counts.items():
+        stats[f"language_{key}"] = value - language_counts[key]
+    for key, value in normalizer.counts.items():
+        stats[f"normalize_{key}"] = value - normalization_counts[key]
+    if instrument.is_enabled():
+        instrument.record("preprocess_chunk", chunk_start, perf_counter() - chunk_wall, process_time() - chunk_cpu,
+                          "worker", tweets=len(records))
+        stats["instrument"] = instrument.collect()
+    return rows, stats
+
+def merge_stats(total, stats):
+    '''
+    Add the stats of one chunk to the running totals.
+    '''
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+def print_stats(stats, elapsed):
+    '''
+    Print throughput and the time spent in each stage of preprocessing.
+    Stage times are summed over all workers, so they are CPU seconds, not wall time.
+    '''
+    tweets_in = stats.get("tweets_in", 0)
+    print(f"\rPreprocessed {tweets_in} tweets in {elapsed:.2f}s ({tweets_in / max(elapsed, 1e-9):.0f} tweets/sec)")
+    print(f"\rDropped {stats.get('retweets', 0)} retweets and {stats.get('non_english', 0)} non-English tweets")
+    print(f"\rLanguage ID: {stats.get('language_accept', 0)} accepted, {stats.get('language_reject', 0)} rejected, "
+          f"{stats.get('language_fallback', 0)} sent to langdetect, {stats.get('language_memo_hits', 0)} memo hits")
+    print(f"\rText fixing: {stats.get('normalize_fix_fast', 0)} clean ASCII, {stats.get('normalize_fix_full', 0)} sent to ftfy, "
+          f"{stats.get('normalize_fix_memo_hits', 0)} memo hits")
+    # retweets are dropped before language detection
+    stage_tweets = {"fix_text": tweets_in, "clean": tweets_in, "language": tweets_in - stats.get("retweets", 0)}
+    stage_total = sum(stats.get(stage, 0.0) for stage in STAGES)
+    for stage in STAGES:
+        seconds = stats.get(stage, 0.0)
+        share = 100 * seconds / stage_total if stage_total else 0.0
+        print(f"\r  {stage:<10} {seconds:8.2f}s  {share:5.1f}%  {stage_tweets[stage] / max(seconds, 1e-9):12.0f} tweets/sec")
+
+def map_chunks(executor, function, chunks, max_pending):
+    """
+    Submit chunks to the executor while they are still being read.
+
+    At most max_pending chunks are in flight, so reading the input overlaps with
+    the workers and memory is bounded by the chunk size instead of the dataset size.
+    Results are yielded in completion order.
+    """
+    pending = set()
+    for chunk in chunks:
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(executor.submit(function, chunk))
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+def cache_key(file, hash_file=checkpoint.file_hash):
+    '''
+    Key of the preprocessed tweets of a dump: a hash of the dump's content and of the
+    code that reads, cleans and filters it.
+    :param file: path of the dump.
+    :param hash_file: function hashing the dump, e.g. CheckpointStore.file_hash to only
+        remember the hash where the store keeps its checkpoints.
+    :return: hex digest.
+    '''
+    return checkpoint.code_hash([hash_file(file), sys.modules[__name__], *checkpoint.dependencies(preprocess)])
+
+def preprocess(file, chunk_size=CHUNK_SIZE, cache_file=CACHE_FILE):
     '''
     Given a dataset of tweet data, preprocess the data. Facilitate the functions above
     to complete the task.
-    :param file: path of dataset with tweet data.
-    :return: list of preprocessed tweets.
+    :param file: path of dataset with tweet data, either a JSON array or newline-delimited JSON,
+        or a tweet file of already preprocessed tweets, which is opened as it is.
+    :param chunk_size: number of raw tweets sent to a worker at once.
+    :param cache_file: tweet file the result is cached in, None to neither read nor write a cache.
+        The cache is only used if it was written for the same dump and the same code.
+    :return: TweetStore of preprocessed tweets sorted by timestamp.
     '''
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'rb') as file:
+    if is_tweet_file(file):
+        return TweetStore.open(file)
+
+    key = cache_key(file) if cache_file is not None else None
+    if cache_file is not None and os.path.exists(cache_file):
+        # the cache is mapped, not read, so loading it takes no time
+        cached = TweetStore.open(cache_file) if is_tweet_file(cache_file) else None
+        if cached is not None and cached.metadata.get("key") == key:
             print("\rLoading cached data...")
+            instrument.count("preprocess.cache_hits")
             print("\rSkipping preprocessing...")
-            
-            tweet_list = pickle.load(file)
-            print(f"\rNumber of tweets: {len(tweet_list)}")
-        return tweet_list
-
-    # Specify the path to your JSON file
-    file_path = file
+            print(f"\rNumber of tweets: {len(cached)}")
+            return cached
+        print("\rCached data is out of date, preprocessing again...")
 
-    # Open and load the JSON data
-    with open(file_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-    
-    # Preprocess the data
+    # Preprocess the data while it is streamed from disk
     tweet_list = []
+    stats = {}
     print("\rPreprocessing data...")
-    with ProcessPoolExecutor() as executor:
-        results = list(executor.map(preprocess_tweet, data))
-
-    tweet_list = [tweet for tweet in results if tweet is not None]
+    start = perf_counter()
+    workers = os.cpu_count() or 1
+    chunks = ([project_record(record) for record in chunk] for chunk in iter_chunks(file, chunk_size))
+    with ProcessPoolExecutor(max_workers=workers, initializer=instrument.init_process,
+                             initargs=instrument.settings()) as executor:
+        for rows, chunk_stats in map_chunks(executor, preprocess_chunk, chunks, 2 * workers):
+            tweet_list.extend(rows)
+            instrument.merge(chunk_stats.pop("instrument", None))
+            merge_stats(stats, chunk_stats)
+    print_stats(stats, perf_counter() - start)
+    for name in ("tweets_in", "retweets", "non_english", "language_accept", "language_reject",
+                 "language_fallback", "language_memo_hits", "normalize_fix_fast", "normalize_fix_full",
+                 "normalize_fix_memo_hits"):
+        instrument.count(f"preprocess.{name}", stats.get(name, 0))
+    instrument.count("preprocess.tweets_out", len(tweet_list))
 
     # sort tweets by timestamp
-    tweet_list.sort(key=lambda x: x.timestamp)
+    tweet_list.sort(key=lambda row: row[3])
+    tweet_store = TweetStore.from_tweets(tweet_list)
+    del tweet_list
 
-    with open(CACHE_FILE, 'wb') as cache:
-        pickle.dump(tweet_list, cache)
+    if cache_file is not None:
+        # replaced in one step, a process may still have the old cache mapped
+        tweet_store.save(cache_file + ".tmp", {"key": key})
+        os.replace(cache_file + ".tmp", cache_file)
         print("\rTweets saved to cache.")
     
     print("\rPreprocessing complete.")
-    print(f"\rNumber of tweets: {len(tweet_list)}")
-    return tweet_list
+    print(f"\rNumber of tweets: {len(tweet_store)}")
+    return tweet_store
 
 if __name__ == "__main__":
     tweets = preprocess('gg2013.json')
@@ -0,0 +1,254 @@
+"""
+Shared-memory, size-aware scheduling of per-segment work over a TweetStore.
+
+The columns of the store and the serialized docs of every task are copied into
+shared memory once; a store opened from a tweet file is not copied at all, the workers
+map the same file. Workers attach to it in their initializer, which also loads the
+spaCy pipelines, so a task only carries a row range and a byte range. Segments with
+more than max_task_size rows are split into parts of about equal size, the tasks are
+submitted largest first and their results are handed back as they complete. A
+SegmentRunner keeps the shared store and the warm workers for several passes over the
+same tasks, so a caller can merge the parts of a segment between two passes.
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import instrument
+from models import init_worker
+from tweet import TweetStore
+
+# fixed-width TweetStore columns that are placed in shared memory
+COLUMNS = ("ids", "timestamps", "user_index", "text_start", "text_end",
+           "tag_ids", "tag_start", "tag_end", "weights")
+
+
+class SharedTweetStore:
+    """
+    Copy of a TweetStore (plus an optional byte blob) in shared memory blocks.
+
+    The spec attribute is what a worker needs to attach to it, see attach_store.
+    Use it as a context manager so the blocks are released afterwards.
+    """
+
+    def __init__(self, store, extra=b""):
+        self.blocks = []
+        if store.path is not None:
+            # the OS shares the pages of a mapped tweet file between processes already
+            self.spec = {"path": store.path, "extra": self._bytes(extra)}
+            return
+        self.spec = {"users": store.users, "tags": store.tags, "columns": {}}
+        for column in COLUMNS:
+            array = getattr(store, column)
+            if array is None:
+                continue
+            array = np.ascontiguousarray(array)
+            block = self._block(array.nbytes)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.spec["columns"][column] = (block.name, array.dtype.str, array.shape)
+        self.spec["text_blob"] = self._bytes(store.text_blob)
+        self.spec["extra"] = self._bytes(extra)
+
+    def _block(self, size):
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.blocks.append(block)
+        return block
+
+    def _bytes(self, data):
+        block = self._block(len(data))
+        block.buf[:len(data)] = data
+        return block.name, len(data)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach_store(spec):
+    """
+    TweetStore over the shared memory described by spec, without copying.
+
+    Returns:
+        tuple: (TweetStore, extra bytes as a memoryview, list of the attached blocks).
+        The blocks have to be kept alive as long as the store is used.
+    """
+    blocks = []
+    if "path" in spec:
+        name, size = spec["extra"]
+        block = shared_memory.SharedMemory(name=name)
+        return TweetStore.open(spec["path"]), block.buf[:size], [block]
+
+    columns = {}
+    for column, (name, dtype, shape) in spec["columns"].items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        columns[column] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    views = []
+    for name, size in (spec["text_blob"], spec["extra"]):
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        views.append(block.buf[:size])
+    text_blob, extra = views
+
+    store = TweetStore(
+        columns["ids"], columns["timestamps"], columns["user_index"], spec["users"],
+        text_blob, columns["text_start"], columns["text_end"],
+        columns["tag_ids"], columns["tag_start"], columns["tag_end"], spec["tags"],
+        columns.get("weights"),
+    )
+    return store, extra, blocks
+
+
+# per-worker state set by init_shared_worker
+_worker_state = {}
+
+
+def init_shared_worker(spec, trace, *stages):
+    """
+    ProcessPoolExecutor initializer: attach to the shared store and load the
+    pipelines of the given stages once, so they stay warm for every task.
+    No stages loads no pipeline. trace, the instrument.settings() of the parent,
+    sets the instrumentation of the worker.
+    """
+    instrument.init_process(*trace)
+    store, extra, blocks = attach_store(spec)
+    _worker_state.update(store=store, extra=extra, blocks=blocks)
+    if stages:
+        init_worker(*stages)
+
+
+def _run_task(function, key, start, end, extra_start, extra_end, *args):
+    store = _worker_state["store"][start:end]
+    extra = bytes(_worker_state["extra"][extra_start:extra_end]) if extra_end > extra_start else None
+    with instrument.span("task", "worker", key=str(key), rows=end - start):
+        result = function(key, store, extra, *args)
+    # what the task recorded travels back with its result
+    return result, instrument.collect()
+
+
+def plan_tasks(segments, max_task_size=None):
+    """
+    Split segments into tasks of at most max_task_size rows, largest first.
+
+    Parameters:
+        segments (list): (key, start, end) row ranges.
+        max_task_size (int): Largest number of rows of one task; segments are kept
+            whole if None.
+
+    Returns:
+        list: (key, part, start, end) tasks ordered by decreasing size, empty segments
+        left out. The parts of a segment are numbered from 0 in row order.
+    """
+    tasks = []
+    for key, start, end in segments:
+        if end <= start:
+            continue
+        parts = 1 if max_task_size is None else math.ceil((end - start) / max_task_size)
+        bounds = np.linspace(start, end, parts + 1).astype(np.int64).tolist()
+        for part, (part_start, part_end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            tasks.append((key, part, part_start, part_end))
+    tasks.sort(key=lambda task: task[3] - task[2], reverse=True)
+    return tasks
+
+
+class SegmentRunner:
+    """
+    Process pool over row segments of a store, kept open for several passes.
+
+    Parameters:
+        store (TweetStore): Tweets sorted by timestamp.
+        segments (list): (key, start, end) row ranges of the store.
+        doc_cache (DocCache): Docs already parsed; each task gets the docs of its rows.
+        stages (tuple): models stages whose pipelines the workers load up front.
+        max_workers (int): Pool size, the number of CPUs if None.
+        max_task_size (int): Segments with more rows are split, see plan_tasks.
+
+    Use it as a context manager; the pool and the shared memory are released afterwards.
+    """
+
+    def __init__(self, store, segments, doc_cache=None, stages=("extract",), max_workers=None,
+                 max_task_size=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.tasks = plan_tasks(segments, max_task_size)
+
+        # the docs of every task, serialized back to back into one blob
+        doc_parts = []
+        self.doc_ranges = []
+        offset = 0
+        with instrument.span("serialize_docs"):
+            for key, part, start, end in self.tasks:
+                data = doc_cache.subset(store.ids[start:end]).to_bytes() if doc_cache is not None else b""
+                doc_parts.append(data)
+                self.doc_ranges.append((offset, offset + len(data)))
+                offset += len(data)
+        instrument.count("scheduler.tasks", len(self.tasks))
+        instrument.count("scheduler.shared_doc_bytes", offset)
+
+        self.shared = SharedTweetStore(store, b"".join(doc_parts))
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_shared_worker,
+                                            initargs=(self.shared.spec, instrument.settings(), *stages))
+
+    def run(self, function, params=None):
+        """
+        Run function(key, store_slice, doc_bytes) over every task and yield the results
+        as they complete. With params, a {key: value} dict, the function is called as
+        function(key, store_slice, doc_bytes, params[key]) and only the value of its
+        own segment travels with a task.
+
+        Yields:
+            tuple: ((key, part), result of function) in completion order.
+        """
+        futures = {}
+        for (key, part, start, end), doc_range in zip(self.tasks, self.doc_ranges):
+            extra_args = () if params is None else (params[key],)
+            future = self.executor.submit(_run_task, function, key, start, end, *doc_range, *extra_args)
+            futures[future] = (key, part)
+        for future in as_completed(futures):
+            result, recorded = future.result()
+            instrument.merge(recorded)
+            yield futures[future], result
+
+    def close(self):
+        self.executor.shutdown()
+        self.shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run_segments(function, store, segments, doc_cache=None, stages=("extract",),
+                 max_workers=None, max_task_size=None):
+    """
+    Run function(key, store_slice, doc_bytes) over row segments of a store in a
+    process pool and yield the results as they complete.
+
+    Parameters:
+        function: Module-level function, e.g. frame.process_cluster.
+        store (TweetStore): Tweets sorted by timestamp.
+        segments (list): (key, start, end) row ranges of the store.
+        doc_cache (DocCache): Docs already parsed; each task gets the docs of its rows.
+        stages (tuple): models stages whose pipelines the workers load up front.
+        max_workers (int): Pool size, the number of CPUs if None.
+        max_task_size (int): Segments with more rows are split into several tasks, whose
+            results the caller merges; segments are kept whole if None.
+
+    Yields:
+        tuple: ((key, part), result of function) in completion order.
+    """
+    with SegmentRunner(store, segments, doc_cache, stages, max_workers, max_task_size) as runner:
+        yield from runner.run(function)
@@ -0,0 +1,73 @@
+"""
+Sweep-line over award time intervals.
+
+Walks time-ordered tweets once while keeping the set of awards whose interval contains
+the current timestamp, so a tweet inside several overlapping award windows is matched
+once instead of once per award. Every interval is added and removed once and the
+active set is handed out as a view, not copied, so a sweep costs O(tweets + awards);
+only a caller that attributes a tweet to its active awards pays for them.
+"""
+
+
+class IntervalSweep:
+    """
+    Active set of (start, end, key) intervals for non-decreasing timestamps.
+
+    Intervals are closed, [start, end], and keys have to be unique.
+    """
+
+    def __init__(self, intervals):
+        intervals = list(intervals)
+        self.by_start = sorted(intervals, key=lambda interval: interval[0])
+        self.by_end = sorted(intervals, key=lambda interval: interval[1])
+        self.next_start = 0
+        self.next_end = 0
+        # insertion-ordered set of the keys of the active intervals
+        self.active_keys = {}
+        self.last_timestamp = None
+
+    def __len__(self):
+        return len(self.by_start)
+
+    def span(self):
+        """
+        (earliest start, latest end) over all intervals, or None if there are none.
+        """
+        if not self.by_start:
+            return None
+        return self.by_start[0][0], self.by_end[-1][1]
+
+    def active(self, timestamp):
+        """
+        Keys of the intervals containing timestamp, as a view of the active set that is
+        only valid until the next call; copy it to keep it. Timestamps must not
+        decrease between calls; every interval is added and removed exactly once.
+        """
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            raise ValueError("Timestamps passed to IntervalSweep.active must not decrease.")
+        self.last_timestamp = timestamp
+        by_start, by_end = self.by_start, self.by_end
+        while self.next_start < len(by_start) and by_start[self.next_start][0] <= timestamp:
+            self.active_keys[by_start[self.next_start][2]] = None
+            self.next_start += 1
+        # starts are added first, so an interval that ended before timestamp is gone
+        # after this call even if it started in the same step
+        while self.next_end < len(by_end) and by_end[self.next_end][1] < timestamp:
+            self.active_keys.pop(by_end[self.next_end][2], None)
+            self.next_end += 1
+        return self.active_keys.keys()
+
+
+def sweep_tweets(tweets, intervals):
+    """
+    The time-ordered tweets that lie in at least one interval, in one pass.
+
+    Parameters:
+        tweets (TweetStore or list): Tweets sorted by timestamp.
+        intervals (iterable): (start, end, key) tuples.
+
+    Returns:
+        list: The tweets inside an interval, in their order.
+    """
+    sweep = IntervalSweep(intervals)
+    return [tweet for tweet in tweets if sweep.active(tweet.timestamp)]
@@ -0,0 +1,185 @@
+"""
+Deterministic synthetic award-show tweets for benchmarks and tests.
+
+The generated records have the shape of the gg2013.json dump ({"text", "user", "id",
+"timestamp_ms"}) and follow a made-up ceremony: awards are handed out at fixed times,
+tweets about an award burst right after it, presenters are mentioned just before,
+and the hosts throughout. Retweets, non-English tweets and mojibake are mixed in so the
+preprocessing filters have work to do. The same seed always gives the same tweets.
+
+    python synthetic.py 100000 synthetic.json
+"""
+import json
+import random
+import sys
+
+# 2013-01-14 01:00 UTC, the start of the 2013 ceremony
+CEREMONY_START_MS = 1358125200000
+CEREMONY_LENGTH_MS = 3 * 3600 * 1000
+
+HOSTS = ["Tina Fey", "Amy Poehler"]
+PEOPLE = [
+    "Ben Affleck", "Jessica Chastain", "Jennifer Lawrence", "Daniel Day-Lewis", "Hugh Jackman",
+    "Anne Hathaway", "Christoph Waltz", "Adele Adkins", "Claire Danes", "Damian Lewis",
+    "Lena Dunham", "Don Cheadle", "Julianne Moore", "Kevin Costner", "Maggie Smith",
+    "Ed Harris", "Kerry Washington", "Quentin Tarantino", "Mychael Danna", "Jodie Foster",
+    "George Clooney", "Salma Hayek", "Paul Rudd", "Halle Berry", "Jason Statham",
+    "Robert Downey", "Sacha Baron Cohen", "Will Ferrell", "Kristen Wiig", "Dustin Hoffman",
+    "Jonah Hill", "Megan Fox", "Amanda Seyfried", "Eva Longoria", "Lucy Liu", "Bradley Cooper",
+]
+TITLES = ["Argo", "Lincoln", "Les Misérables", "Django Unchained", "Life of Pi", "Zero Dark Thirty",
+          "Silver Linings Playbook", "Homeland", "Girls", "Game Change", "Brave", "Amour", "Skyfall"]
+AWARDS = [
+    "Best Motion Picture - Drama", "Best Motion Picture - Comedy Or Musical",
+    "Best Director - Motion Picture", "Best Screenplay - Motion Picture",
+    "Best Original Score - Motion Picture", "Best Original Song - Motion Picture",
+    "Best Animated Feature Film", "Best Foreign Language Film",
+    "Best Television Series - Drama", "Best Television Series - Comedy Or Musical",
+    "Best Performance by an Actress in a Motion Picture - Drama",
+    "Best Performance by an Actor in a Motion Picture - Drama",
+    "Best Performance by an Actress in a Television Series - Comedy Or Musical",
+    "Best Performance by an Actor in a Television Series - Drama",
+]
+# awards that go to a title rather than a person
+TITLE_AWARDS = {"Best Motion Picture - Drama", "Best Motion Picture - Comedy Or Musical",
+                "Best Animated Feature Film", "Best Foreign Language Film",
+                "Best Television Series - Drama", "Best Television Series - Comedy Or Musical"}
+
+HOST_TEMPLATES = ["{host} and {cohost} are hosting the Golden Globes", "{host} is a great host tonight",
+                  "Loving {host} hosting the #GoldenGlobes", "{host} hosts better every year"]
+WINNER_TEMPLATES = ["{winner} wins {award}!", "Congrats to {winner} for winning {award} #GoldenGlobes",
+                    "{winner} won {award}", "And {award} goes to {winner}"]
+PRESENTER_TEMPLATES = ["{presenter} presents {award}", "{presenter} to present {award} next",
+                       "{presenter} announces {award}"]
+NOMINEE_TEMPLATES = ["{nominee} nominated for {award}", "{nominee} is up for {award} tonight",
+                     "Rooting for {nominee}, nominee: {award}"]
+CHATTER = ["What a dress on the red carpet!", "The #GoldenGlobes are on, grab the popcorn",
+           "Who else is watching the Golden Globes tonight?", "That speech was so long lol",
+           "The camera work tonight is all over the place", "I need that necklace &amp; those shoes",
+           "Commercial break again http://t.co/abc123", "This is the best part of the night #GoldenGlobes"]
+FOREIGN = ["Qué bonito vestido en los Globos de Oro esta noche", "Les Golden Globes sont incroyables ce soir",
+           "Die Golden Globes sind heute Abend einfach toll", "I Golden Globe stasera sono bellissimi",
+           "Os Globos de Ouro estão lindos hoje à noite"]
+
+# share of each kind of tweet
+KIND_WEIGHTS = {"chatter": 40, "winner": 16, "host": 8, "presenter": 7, "nominee": 7,
+                "retweet": 12, "foreign": 6, "mojibake": 4}
+
+
+def ceremony(seed=0):
+    """
+    The made-up ceremony of a seed: award times, winners, presenters and nominees.
+
+    Returns:
+        list: One dict per award with "award", "time", "winner", "presenters", "nominees".
+    """
+    rng = random.Random(seed)
+    gap = CEREMONY_LENGTH_MS // (len(AWARDS) + 1)
+    schedule = []
+    for position, award in enumerate(AWARDS):
+        pool = TITLES if award in TITLE_AWARDS else PEOPLE
+        nominees = rng.sample(pool, 5)
+        presenters = rng.sample([person for person in PEOPLE if person not in nominees], 2)
+        schedule.append({"award": award, "time": CEREMONY_START_MS + (position + 1) * gap,
+                         "winner": nominees[0], "presenters": presenters, "nominees": nominees})
+    return schedule
+
+
+def answers(seed=0):
+    """
+    Ground truth of the seed's ceremony in the gg2013answers.json format.
+    """
+    return {
+        "hosts": [host.lower() for host in HOSTS],
+        "award_data": {
+            entry["award"].lower(): {
+                "nominees": [nominee.lower() for nominee in entry["nominees"][1:]],
+                "presenters": [presenter.lower() for presenter in entry["presenters"]],
+                "winner": entry["winner"].lower(),
+            } for entry in ceremony(seed)
+        },
+    }
+
+
+def generate_tweets(count, seed=0):
+    """
+    Yield count synthetic tweet records, in arrival order rather than sorted.
+
+    Parameters:
+        count (int): Number of records.
+        seed (int): Seed of the ceremony and of the tweets.
+    """
+    rng = random.Random(seed)
+    schedule = ceremony(seed)
+    kinds = list(KIND_WEIGHTS)
+    kind_weights = list(KIND_WEIGHTS.values())
+    recent = []
+
+    for tweet_id in range(count):
+        kind = rng.choices(kinds, kind_weights)[0]
+        entry = rng.choice(schedule)
+        # tweets about an award burst in the minutes after it, the rest are spread out
+        if kind in ("winner", "nominee"):
+            timestamp = entry["time"] + int(rng.expovariate(1 / 90000))
+        elif kind == "presenter":
+            timestamp = entry["time"] - int(rng.expovariate(1 / 60000))
+        else:
+            timestamp = CEREMONY_START_MS + rng.randrange(CEREMONY_LENGTH_MS)
+
+        if kind == "winner":
+            text = rng.choice(WINNER_TEMPLATES).format(winner=entry["winner"], award=entry["award"])
+        elif kind == "host":
+            host, cohost = rng.sample(HOSTS, 2)
+            text = rng.choice(HOST_TEMPLATES).format(host=host, cohost=cohost)
+        elif kind == "presenter":
+            text = rng.choice(PRESENTER_TEMPLATES).format(presenter=rng.choice(entry["presenters"]), award=entry["award"])
+        elif kind == "nominee":
+            text = rng.choice(NOMINEE_TEMPLATES).format(nominee=rng.choice(entry["nominees"]), award=entry["award"])
+        elif kind == "retweet":
+            original = rng.choice(recent) if recent else rng.choice(CHATTER)
+            text = f"RT @user{rng.randrange(1000)}: {original}"
+        elif kind == "foreign":
+            text = rng.choice(FOREIGN)
+        elif kind == "mojibake":
+            # UTF-8 bytes read as Latin-1, what ftfy has to undo
+            text = f"{entry['winner']} in Les Misérables, I can't even".encode("utf-8").decode("latin-1")
+        else:
+            text = rng.choice(CHATTER)
+        if rng.random() < 0.2:
+            text += " #GoldenGlobes"
+
+        if kind != "retweet" and len(recent) < 100:
+            recent.append(text)
+        user_id = int(rng.paretovariate(1.2)) % 500000
+        yield {"text": text, "user": {"id": user_id, "screen_name": f"user{user_id}"},
+               "id": 290000000000000000 + tweet_id, "timestamp_ms": timestamp}
+
+
+def labeled_names(count, seed=0):
+    """
+    Texts of count synthetic tweets with the people each one mentions, a labeled
+    sample for the name extractors.
+
+    Returns:
+        tuple: (texts, list of the names in every text).
+    """
+    texts = [record["text"] for record in generate_tweets(count, seed)]
+    labels = [[name for name in HOSTS + PEOPLE if name in text] for text in texts]
+    return texts, labels
+
+
+def write_tweets(filename, count, seed=0):
+    """
+    Write count synthetic records to filename as newline-delimited JSON.
+    """
+    with open(filename, "w", encoding="utf-8") as file:
+        for record in generate_tweets(count, seed):
+            file.write(json.dumps(record))
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python synthetic.py COUNT OUTPUT.json [SEED]")
+        sys.exit(1)
+    write_tweets(sys.argv[2], int(sys.argv[1]), int(sys.argv[3]) if len(sys.argv) > 3 else 0)
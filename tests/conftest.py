@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+import spacy
+from spacy.language import Language
+
+# the modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic
+
+
+@Language.component("test_title_pos")
+def test_title_pos(doc):
+    # stand-in for the tagger: title-case tokens are proper nouns
+    for token in doc:
+        token.pos_ = "PROPN" if token.is_title else "NOUN"
+    return doc
+
+
+@pytest.fixture(scope="session")
+def nlp():
+    """
+    Small pipeline for the tests, which cannot rely on en_core_web_sm: a blank English
+    pipeline with title-case POS tags and the synthetic people as PERSON entities.
+    """
+    nlp = spacy.blank("en")
+    nlp.add_pipe("test_title_pos")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns([{"label": "PERSON", "pattern": name} for name in synthetic.PEOPLE + synthetic.HOSTS])
+    return nlp
@@ -0,0 +1,57 @@
+from collections import Counter
+
+import numpy as np
+
+from aggregates import AwardStats, MisraGries, finalize_award_stats, merge_award_stats
+
+
+def skewed_segments(rng, segment_count=20, names=200):
+    # a few heavy names over a long tail, split across segments
+    weights = 1.0 / np.arange(1, names + 1) ** 1.2
+    weights /= weights.sum()
+    return [Counter(f"name {i}" for i in rng.choice(names, 300, p=weights)) for _ in range(segment_count)]
+
+
+def test_summary_is_exact_under_capacity():
+    summary = MisraGries(capacity=10)
+    summary.update({"a": 3, "b": 2})
+    summary.add("a")
+    assert summary.to_dict() == {"a": 4, "b": 2}
+    assert summary.error == 0
+
+
+def test_merge_stays_bounded_and_within_error():
+    rng = np.random.default_rng(3)
+    segments = skewed_segments(rng)
+    exact = sum(segments, Counter())
+    capacity = 20
+
+    for order in [range(len(segments)), rng.permutation(len(segments))]:
+        merged = MisraGries(capacity)
+        for i in order:
+            part = MisraGries(capacity)
+            part.update(segments[i])
+            assert len(part) <= capacity
+            merged.merge(part)
+
+        assert len(merged) <= capacity
+        assert merged.total == sum(exact.values())
+        assert merged.error <= merged.total / (capacity + 1)
+        for name, count in exact.items():
+            estimate = merged.counts.get(name, 0)
+            assert count - merged.error <= estimate <= count
+            if count > merged.error:
+                assert name in merged
+
+
+def test_award_stats_keep_the_heavy_winners():
+    rng = np.random.default_rng(4)
+    into = {}
+    for winners in skewed_segments(rng, segment_count=8):
+        award = {"count": 1, "start_timestamp": 0, "end_timestamp": 1, "winners": dict(winners)}
+        merge_award_stats(into, {"best drama": AwardStats.from_award(award, capacity=10)})
+
+    awards, _, _ = finalize_award_stats(into, min_count=1)
+    winners = awards["best drama"]["winners"]
+    assert len(winners) <= 10
+    assert next(iter(winners)) == "name 0"
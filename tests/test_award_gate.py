@@ -0,0 +1,52 @@
+import random
+
+import spacy
+from spacy.matcher import Matcher
+
+from frame import AWARD_PATTERNS, could_match_award, gate_award_tweets
+from tweet import Tweet, TweetStore
+
+WORDS = ["Best", "best", "BEST", "Bester", "Actor", "actor", "Motion", "Picture", "-", "Drama", "in", "by",
+         "Performance", "performance", "Actress", "a", "Ǆ", "ǅungla", "Éclair", "émile", "ℝeal", "ß", "42",
+         "#GoldenGlobes", "@Best", "Best-", "wins", "the"]
+
+
+def award_matcher_hits(nlp, matcher, text):
+    # every token tagged PROPN: the loosest the tagger could be, so only the lexical
+    # conditions of the patterns are left
+    doc = nlp.make_doc(text)
+    for token in doc:
+        token.pos_ = "PROPN"
+    return bool(matcher(doc))
+
+
+def test_gate_never_drops_a_matcher_hit():
+    nlp = spacy.blank("en")
+    matcher = Matcher(nlp.vocab)
+    matcher.add("AWARD", AWARD_PATTERNS)
+    rng = random.Random(0)
+    hits = 0
+    for _ in range(5000):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 8)))
+        if award_matcher_hits(nlp, matcher, text):
+            hits += 1
+            assert could_match_award(text), text
+    assert hits > 100
+
+
+def test_gate_rejects_tweets_that_cannot_match():
+    assert could_match_award("Ben Affleck wins Best Director")
+    assert could_match_award("Best ǅungla")
+    assert not could_match_award("best director tonight")
+    assert not could_match_award("the best night ever")
+    assert not could_match_award("Best of luck to all of them tonight")
+    assert not could_match_award("Ben Affleck says: this is the Best")
+
+
+def test_gate_award_tweets_keeps_the_input_type():
+    texts = ["Argo wins Best Drama", "best night", "Best Actor - Hugh Jackman"]
+    tweets = [Tweet(id=str(i), text=text, user="user", timestamp=i, hashtags=[]) for i, text in enumerate(texts)]
+    assert [tweet.text for tweet in gate_award_tweets(tweets)] == [texts[0], texts[2]]
+    store = gate_award_tweets(TweetStore.from_tweets(tweets))
+    assert isinstance(store, TweetStore)
+    assert list(store.texts()) == [texts[0], texts[2]]
@@ -0,0 +1,26 @@
+from awardmatch import AwardMatcher
+
+AWARDS = ["best actress", "best supporting actress", "best director", "best actor"]
+
+
+def test_finds_every_mention_including_overlaps():
+    matcher = AwardMatcher(AWARDS)
+    text = "Best Supporting Actress and best director"
+    found = matcher.find_all(text)
+    assert sorted(award for _, _, award in found) == ["best director", "best supporting actress"]
+    for start, end, award in found:
+        assert text.lower()[start:end] == award
+    # "actress" ends both award names, only the full one matches here
+    assert matcher.find_all("best actresses") == [(0, 12, "best actress")]
+
+
+def test_first_award_follows_the_award_order():
+    matcher = AwardMatcher(AWARDS)
+    for text in ["best director and best actress", "best supporting actress", "BEST ACTOR wins", "no award"]:
+        expected = next((award for award in AWARDS if award in text.lower()), None)
+        assert matcher.first_award(text) == expected
+
+
+def test_no_awards():
+    assert AwardMatcher([]).find_all("best actress") == []
+    assert AwardMatcher([""]).first_award("anything") is None
@@ -0,0 +1,23 @@
+import benchmark
+from language import identifier
+from normalization import normalizer
+
+
+def test_every_measured_run_starts_with_empty_memos():
+    seen = []
+
+    def stage():
+        seen.append((len(identifier.memo), len(normalizer.fix_memo)))
+        identifier.is_english("The Golden Globes are on tonight")
+        normalizer.fix_text("The Golden Globes are on tonight")
+
+    benchmark.measure_stage(stage, 1, memory=True)
+    assert seen == [(0, 0), (0, 0)]
+
+
+def test_large_sizes_are_not_traced(monkeypatch):
+    monkeypatch.setattr(benchmark, "MAX_TRACED_SIZE", 100)
+    results = benchmark.run_benchmark(200, stages=("preprocess_tweet",))
+    assert "peak_mb" not in results["preprocess_tweet"]
+    results = benchmark.run_benchmark(100, stages=("preprocess_tweet",))
+    assert "peak_mb" in results["preprocess_tweet"]
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+
+import checkpoint
+from checkpoint import CheckpointStore, code_hash, dependencies
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# keys of a few stages, printed by a fresh interpreter
+KEYS_SCRIPT = """
+import sys
+import checkpoint, frame, preprocess
+store = checkpoint.CheckpointStore(enabled=False)
+print(checkpoint.code_hash([frame.INDEX_TERMS, {"b": {2, 1}, "a": frozenset("xyz")}]))
+print(checkpoint.code_hash(checkpoint.dependencies(frame.process_cluster)))
+print(preprocess.cache_key(sys.argv[1], store.file_hash))
+print(store.stage("awards", lambda: None, inputs=["x"], params=({"b", "a"}, 2)).key)
+"""
+
+
+def stage_keys(dump, seed, directory):
+    environment = {**os.environ, "PYTHONHASHSEED": str(seed), "PYTHONPATH": ROOT}
+    output = subprocess.run([sys.executable, "-c", KEYS_SCRIPT, dump], cwd=directory, env=environment,
+                            capture_output=True, text=True, check=True).stdout
+    return output.split()
+
+
+def test_keys_are_stable_across_interpreters(tmp_path):
+    dump = tmp_path / "dump.json"
+    dump.write_text('[{"id": 1, "text": "hi", "user": 1, "timestamp_ms": 1}]')
+    keys = [stage_keys(str(dump), seed, str(tmp_path)) for seed in (0, 1, 2)]
+    assert len(keys[0]) == 4
+    assert keys[0] == keys[1] == keys[2]
+    # a disabled store does not remember the hash of the dump
+    assert not (tmp_path / checkpoint.CHECKPOINT_DIR).exists()
+
+
+def test_code_hash_ignores_set_order():
+    assert code_hash([{"a", "b", "c"}]) == code_hash([{"c", "b", "a"}])
+    assert code_hash([{"x": 1, "y": 2}]) == code_hash([{"y": 2, "x": 1}])
+    assert code_hash([{"a", "b"}]) != code_hash([{"a", "c"}])
+
+
+def test_dependencies_follow_helpers_and_modules():
+    import frame
+    import scheduler
+    import tweetindex
+    items = dependencies(frame.find_awards)
+    assert frame.candidate_tweets in items
+    assert frame.filter_tweets_by_timestamp in items
+    assert frame.ensure_index in items
+    assert tweetindex in items
+    assert frame.INDEX_TERMS in items
+    assert scheduler not in items
+
+
+def test_disabled_store_writes_nothing(tmp_path):
+    directory = tmp_path / "checkpoints"
+    dump = tmp_path / "dump.json"
+    dump.write_text("[]")
+    store = CheckpointStore(str(directory), enabled=False)
+    store.file_hash(str(dump))
+    assert store.stage("stage", lambda: 42).value == 42
+    assert not directory.exists()
+
+
+def test_stage_is_loaded_until_its_key_changes(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    first = store.stage("stage", compute, params=1)
+    assert first.value == {"value": 1} and first.cached is False
+    again = store.stage("stage", compute, params=1)
+    assert again.value == {"value": 1} and again.cached is True
+    changed = store.stage("stage", compute, params=2)
+    assert changed.value == {"value": 2} and changed.key != first.key
+    downstream = store.stage("next", lambda: None, inputs=[changed])
+    assert downstream.key != store.stage("next", lambda: None, inputs=[first]).key
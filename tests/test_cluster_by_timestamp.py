@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from clustering import bucket_counts, cluster_by_timestamp, utc_offset_ms
+from tweet import TweetStore
+
+
+def store_at(timestamps):
+    return TweetStore.from_tweets((str(i), "text", "user", int(t), []) for i, t in enumerate(sorted(timestamps)))
+
+
+def reference_buckets(timestamps, minutes, tz):
+    # bucket every tweet by flooring its local wall-clock time
+    buckets = {}
+    for timestamp in sorted(timestamps):
+        local = datetime.fromtimestamp(timestamp / 1000, tz)
+        floored = local.replace(minute=local.minute - local.minute % minutes, second=0, microsecond=0)
+        buckets[floored] = buckets.get(floored, 0) + 1
+    return buckets
+
+
+@pytest.mark.parametrize("tz", ["UTC", "America/Los_Angeles", "Asia/Kolkata"])
+def test_buckets_match_wall_clock_floors(tz):
+    rng = np.random.default_rng(0)
+    start = int(datetime(2013, 1, 14, 1, 7, tzinfo=ZoneInfo("UTC")).timestamp() * 1000)
+    timestamps = (start + rng.integers(0, 5 * 3600000, 500)).tolist()
+    buckets = cluster_by_timestamp(store_at(timestamps), "30min", tz)
+
+    assert bucket_counts(buckets, tz) == reference_buckets(timestamps, 30, ZoneInfo(tz))
+    assert buckets[0][1] == 0 and buckets[-1][2] == len(timestamps)
+    assert all(end == begin for (_, _, end), (_, begin, _) in zip(buckets, buckets[1:]))
+
+
+def test_hour_buckets_follow_a_half_hour_offset():
+    tz = ZoneInfo("Asia/Kolkata")
+    assert utc_offset_ms(0, tz) == int(timedelta(hours=5, minutes=30).total_seconds() * 1000)
+    local_hour = int(datetime(2013, 1, 14, 9, tzinfo=tz).timestamp() * 1000)
+    store = store_at([local_hour - 1, local_hour, local_hour + 3599999, local_hour + 3600000])
+    buckets = cluster_by_timestamp(store, "hour", tz)
+    assert [(begin, end) for _, begin, end in buckets] == [(0, 1), (1, 3), (3, 4)]
+    assert buckets[1][0] == local_hour
+
+
+def test_interval_in_ms_and_invalid_intervals():
+    store = store_at([0, 999, 1000, 2500])
+    assert cluster_by_timestamp(store, 1000, "UTC") == [(0, 0, 2), (1000, 2, 3), (2000, 3, 4)]
+    assert cluster_by_timestamp(store_at([]), "minute") == []
+    with pytest.raises(ValueError):
+        cluster_by_timestamp(store, "week")
+    with pytest.raises(ValueError):
+        cluster_by_timestamp(store, 0)
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from data import iter_chunks, iter_records
+
+RECORDS = [
+    {"id": 1, "text": "Argo wins [Best] Picture, {finally}", "user": {"id": 7}, "timestamp_ms": 1000},
+    {"id": 2, "text": "commas, brackets ] and \"quotes\"", "user": {"id": 8}, "timestamp_ms": 2000},
+    {"id": 3, "text": "Les Misérables 🎉", "user": {"id": 7}, "timestamp_ms": 3000},
+    {"id": 4, "text": "", "user": {"id": 9}, "timestamp_ms": 4000},
+]
+
+
+def write_array(path):
+    path.write_text("  \n" + json.dumps(RECORDS, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def write_ndjson(path):
+    path.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in RECORDS) + "\n\n",
+                    encoding="utf-8")
+
+
+@pytest.mark.parametrize("write", [write_array, write_ndjson])
+@pytest.mark.parametrize("buffer_size", [1, 7, 64, 1 << 20])
+def test_iter_records_layouts_and_buffer_sizes(tmp_path, write, buffer_size):
+    path = tmp_path / "dump.json"
+    write(path)
+    assert list(iter_records(str(path), buffer_size=buffer_size)) == RECORDS
+
+
+@pytest.mark.parametrize("content", ["", "   \n", "[]", "[ \n ]"])
+def test_iter_records_empty(tmp_path, content):
+    path = tmp_path / "dump.json"
+    path.write_text(content)
+    assert list(iter_records(str(path), buffer_size=2)) == []
+
+
+def test_iter_records_truncated(tmp_path):
+    path = tmp_path / "dump.json"
+    path.write_text(json.dumps(RECORDS[0])[:-3])
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_records(str(path), buffer_size=4))
+
+
+@pytest.mark.parametrize("buffer_size", [4, 64, 1 << 20])
+def test_iter_records_malformed_record_stops_at_its_line(tmp_path, monkeypatch, buffer_size):
+    path = tmp_path / "dump.json"
+    lines = [json.dumps(RECORDS[0]), '{"id": 2,, "text": "bad"}'] + [json.dumps(RECORDS[1])] * 1000
+    path.write_text("\n".join(lines) + "\n")
+    reads = []
+    real_open = open
+
+    def counting_open(*args, **kwargs):
+        file = real_open(*args, **kwargs)
+        read = file.read
+        file.read = lambda size: reads.append(size) or read(size)
+        return file
+    monkeypatch.setattr("builtins.open", counting_open)
+
+    records = iter_records(str(path), buffer_size=buffer_size)
+    assert next(records) == RECORDS[0]
+    with pytest.raises(json.JSONDecodeError):
+        next(records)
+    # the rest of the file was never read
+    assert sum(reads) < len(lines[0]) + len(lines[1]) + 2 * buffer_size
+
+
+def test_iter_records_oversized_record(tmp_path, monkeypatch):
+    monkeypatch.setattr("data.MAX_RECORD_SIZE", 100)
+    path = tmp_path / "dump.json"
+    path.write_text('{"text": "' + "x" * 1000 + '"}')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_records(str(path), buffer_size=8))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4, 10])
+def test_iter_chunks(tmp_path, chunk_size):
+    path = tmp_path / "dump.json"
+    write_ndjson(path)
+    chunks = list(iter_chunks(str(path), chunk_size=chunk_size))
+    assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+    assert [record for chunk in chunks for record in chunk] == RECORDS
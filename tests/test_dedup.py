@@ -0,0 +1,58 @@
+import numpy as np
+
+from dedup import MinHasher, collapse_duplicates
+from tweet import Tweet, TweetStore
+
+
+def store_of(rows):
+    # (text, timestamp) rows, already in timestamp order
+    return TweetStore.from_tweets(
+        Tweet(id=str(i), text=text, user=f"user{i}", timestamp=timestamp, hashtags=[])
+        for i, (text, timestamp) in enumerate(rows))
+
+
+def test_exact_copies_collapse_into_the_earliest_tweet():
+    store = store_of([
+        ("Argo wins best drama", 0),
+        ("Adele wins best original song", 1000),
+        ("Argo wins best drama", 2000),
+        ("Argo wins best drama", 3000),
+    ])
+    collapsed, groups = collapse_duplicates(store, near=False)
+    assert list(collapsed.texts()) == ["Argo wins best drama", "Adele wins best original song"]
+    assert collapsed.weights.tolist() == [3, 1]
+    assert groups.members(0).tolist() == [0, 2, 3]
+    assert groups.timestamps(store, 0).tolist() == [0, 2000, 3000]
+
+
+def test_copies_outside_the_window_start_a_new_group():
+    store = store_of([("Argo wins best drama", t) for t in (0, 30000, 70000, 90000)])
+    collapsed, _ = collapse_duplicates(store, near=False, window_ms=60000)
+    # the window is measured from the first tweet of a group, not the latest copy
+    assert collapsed.timestamps.tolist() == [0, 70000]
+    assert collapsed.weights.tolist() == [2, 2]
+    assert collapse_duplicates(store, near=False, window_ms=None)[0].weights.tolist() == [4]
+
+
+def test_near_duplicates_merge_and_different_tweets_do_not():
+    text = "Ben Affleck wins best director at the golden globes for argo tonight"
+    store = store_of([
+        (text, 0),
+        (text + " wow", 500),
+        ("Anne Hathaway wins best supporting actress for les miserables", 1000),
+    ])
+    collapsed, _ = collapse_duplicates(store, near=True, threshold=0.6)
+    assert collapsed.weights.tolist() == [2, 1]
+    assert collapse_duplicates(store, near=False)[0].weights.tolist() == [1, 1, 1]
+
+
+def test_weights_add_up_and_empty_store():
+    store = store_of([("a b c", 0), ("a b c", 1)]).with_weights(np.array([2, 5], dtype=np.int32))
+    assert collapse_duplicates(store)[0].weights.tolist() == [7]
+    collapsed, groups = collapse_duplicates(store_of([]))
+    assert len(collapsed) == 0 and len(groups) == 0
+
+
+def test_signatures_are_reproducible():
+    text = "Argo wins best drama"
+    assert (MinHasher(seed=0).signature(text) == MinHasher(seed=0).signature(text)).all()
@@ -0,0 +1,48 @@
+from doccache import DocCache, doc_key
+from tweet import Tweet
+import frame
+
+
+def handmade_tweets():
+    # Tweets built by hand carry no id, as in frame.test_dependency
+    texts = [
+        "Ben Affleck wins Best Director at the Golden Globes",
+        "Ben Affleck wins Best Director at the Golden Globes",
+        "Tina Fey and Amy Poehler host the Golden Globes",
+        "Tina Fey is a great host tonight",
+    ]
+    return [Tweet(text=text, timestamp=1000 * i) for i, text in enumerate(texts)]
+
+
+def test_tweets_without_id_are_keyed_by_text(nlp):
+    tweets = handmade_tweets()
+    cache = DocCache(nlp)
+
+    assert doc_key(tweets[0]) == doc_key(tweets[1])
+    assert doc_key(Tweet(id="7", text="x")) == 7
+
+    cache.parse(tweets)
+    assert len(cache) == 3
+    pairs = list(cache.iter_docs(tweets))
+    assert [doc.text for _, doc in pairs] == [tweet.text for tweet in tweets]
+    assert cache.get(tweets[2]).text == tweets[2].text
+
+
+def test_cache_round_trip_without_ids(nlp):
+    tweets = handmade_tweets()
+    cache = DocCache(nlp)
+    cache.parse(tweets)
+
+    restored = DocCache.from_bytes(nlp, cache.to_bytes())
+    assert restored.get(tweets[3]).text == tweets[3].text
+
+
+def test_frame_functions_take_lists_of_handmade_tweets(nlp):
+    tweets = handmade_tweets()
+    cache = DocCache(nlp)
+
+    hosts = frame.find_host_candidate(tweets, doc_cache=cache)
+    assert "tina fey" in [name.lower() for name in hosts]
+    awards = frame.find_awards(tweets, doc_cache=cache)
+    frame.find_nominees(tweets, awards, doc_cache=cache)
+    frame.find_presenters(tweets, awards, doc_cache=cache)
@@ -0,0 +1,48 @@
+import evaluate
+import frame
+import models
+import synthetic
+
+
+def perfect_result(answers):
+    return {"Hosts": [host.title() for host in answers["hosts"]],
+            "Award data": [{"Award": award, "Winner": data["winner"], "Nominees": data["nominees"],
+                            "Presenters": data["presenters"]} for award, data in answers["award_data"].items()]}
+
+
+def test_perfect_and_empty_results():
+    answers = synthetic.answers()
+    assert evaluate.score(perfect_result(answers), answers)["overall"] == 1.0
+    empty = evaluate.score({"Hosts": [], "Award data": []}, answers)
+    assert empty["overall"] == 0.0
+
+
+def test_list_scores_match_names_fuzzily_and_one_to_one():
+    assert evaluate.list_scores(["Amy Poehler", "tina  fey"], ["amy poehler", "tina fey"]) == (1.0, 1.0, 1.0)
+    # one expected name cannot be matched twice
+    precision, recall, _ = evaluate.list_scores(["Amy Poehler", "Amy Poehlers"], ["amy poehler", "tina fey"])
+    assert (precision, recall) == (0.5, 0.5)
+    assert evaluate.list_scores([], []) == (1.0, 1.0, 1.0)
+    assert evaluate.list_scores(["", None], ["tina fey"]) == (0.0, 0.0, 0.0)
+
+
+def test_awards_without_a_match_score_zero():
+    answers = synthetic.answers()
+    result = perfect_result(answers)
+    result["Award data"] = result["Award data"][:2] + [{"Award": "best catering", "Winner": "nobody"}]
+    scores = evaluate.score(result, answers)
+    total = len(answers["award_data"])
+    assert scores["awards_precision"] == round(2 / 3, 4)
+    assert scores["awards_recall"] == round(2 / total, 4)
+    assert scores["winner"] == round(2 / total, 4)
+
+
+def test_run_profiles(nlp, monkeypatch, tmp_path):
+    monkeypatch.setattr(frame, "get_nlp", lambda stage="full": nlp)
+    monkeypatch.setattr(models, "get_nlp", lambda stage="full": nlp)
+    monkeypatch.chdir(tmp_path)
+    synthetic.write_tweets("tweets.json", 3000, seed=4)
+    rows = evaluate.run_profiles("tweets.json", synthetic.answers(seed=4), ["full", "sample_50"])
+    assert list(rows) == ["full", "sample_50"]
+    assert rows["full"]["scores"]["hosts_f1"] == 1.0
+    assert rows["full"]["seconds"] > 0
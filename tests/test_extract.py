@@ -0,0 +1,36 @@
+import pytest
+
+import frame
+import models
+from preprocess import preprocess_tweet
+from synthetic import generate_tweets
+from tweet import TweetStore
+
+
+@pytest.fixture
+def store(nlp, monkeypatch):
+    # the workers are forked, so they see the small test pipeline too
+    monkeypatch.setattr(frame, "get_nlp", lambda stage="full": nlp)
+    monkeypatch.setattr(models, "get_nlp", lambda stage="full": nlp)
+    tweets = [tweet for tweet in map(preprocess_tweet, generate_tweets(2000, seed=11)) if tweet is not None]
+    return TweetStore.from_tweets(tweets).sort_by_timestamp()
+
+
+def results(award_stats):
+    return {award: (stats.count, stats.start_timestamp, stats.end_timestamp, stats.winners.to_dict(),
+                    stats.nominees.to_dict(), stats.presenters.to_dict())
+            for award, stats in award_stats.items()}
+
+
+def test_split_segments_give_the_whole_segment_result(store):
+    segments = [(0, 0, len(store) // 3), (1, len(store) // 3, len(store))]
+    serial = {}
+    for key, start, end in segments:
+        _, stats = frame.process_cluster(key, store[start:end])
+        frame.merge_award_stats(serial, stats)
+    assert any(stats.presenters for stats in serial.values())
+
+    whole = frame.extract_segment_awards(store, segments, max_task_size=None, max_workers=2)
+    split = frame.extract_segment_awards(store, segments, max_task_size=150, max_workers=3)
+    assert results(whole) == results(serial)
+    assert results(split) == results(serial)
@@ -0,0 +1,50 @@
+import pytest
+
+from gazetteer import PERSON, Gazetteer, build_gazetteer, get_gazetteer, normalize_title
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    source = tmp_path / "titles.tsv"
+    source.write_text("Argo\nmovie\tLes Misérables\nperson\tDaniel Day-Lewis\nLincoln\n\nLife of Pi\n",
+                      encoding="utf-8")
+    path = str(tmp_path / "test.marisa")
+    assert build_gazetteer(str(source), path) == 5
+    return Gazetteer.open(path)
+
+
+def test_normalized_exact_lookup(gazetteer):
+    assert normalize_title("  Life-of PI! ") == "life of pi"
+    assert gazetteer.is_movie("ARGO")
+    assert gazetteer.is_movie("les misérables")
+    assert gazetteer.is_person("daniel day lewis")
+    assert not gazetteer.is_movie("Daniel Day-Lewis")
+    assert not gazetteer.is_movie("")
+
+
+def test_prefix_lookup(gazetteer):
+    assert gazetteer.has_prefix("life of")
+    assert not gazetteer.has_prefix("zero dark")
+    assert sorted(gazetteer.with_prefix("l")) == ["les misérables", "life of pi", "lincoln"]
+    assert gazetteer.with_prefix("daniel", PERSON) == ["daniel day lewis"]
+    assert gazetteer.longest_title_prefix("life of pi at the globes") == "life of pi"
+    assert gazetteer.longest_title_prefix("argo wins") == "argo"
+    assert gazetteer.longest_title_prefix("the globes") is None
+
+
+def test_imdb_dumps(tmp_path):
+    titles = tmp_path / "title.basics.tsv"
+    titles.write_text("tconst\ttitleType\tprimaryTitle\toriginalTitle\n"
+                      "tt1\tmovie\tAmour\tAmour\ntt2\ttvEpisode\tPilot\tPilot\n"
+                      "tt3\tmovie\tThe Intouchables\tIntouchables\n", encoding="utf-8")
+    names = tmp_path / "name.basics.tsv"
+    names.write_text("nconst\tprimaryName\nnm1\tHugh Jackman\n", encoding="utf-8")
+    path = str(tmp_path / "imdb.marisa")
+    assert build_gazetteer([str(titles), str(names)], path) == 4
+    gazetteer = Gazetteer.open(path)
+    assert gazetteer.is_movie("intouchables") and not gazetteer.is_movie("pilot")
+    assert gazetteer.is_person("hugh jackman")
+
+
+def test_missing_gazetteer(tmp_path):
+    assert get_gazetteer(str(tmp_path / "missing.marisa")) is None
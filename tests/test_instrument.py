@@ -0,0 +1,47 @@
+import instrument
+
+
+def allocate(megabytes):
+    return bytearray(megabytes * 1024 * 1024)
+
+
+def test_stage_memory_is_traced_per_stage():
+    held = allocate(20)
+    instrument.enable(memory=True)
+    try:
+        with instrument.span("outer"):
+            with instrument.span("inner"):
+                data = allocate(8)
+                del data
+            with instrument.span("small"):
+                data = allocate(1)
+                del data
+        peaks = instrument.summary()["peak_mb"]
+    finally:
+        instrument.disable()
+        instrument.init_process(False)
+    del held
+
+    # memory held before a stage does not count, the inner peak counts for the outer one
+    assert 8 <= peaks["inner"] < 9
+    assert 1 <= peaks["small"] < 2
+    assert 8 <= peaks["outer"] < 9
+
+
+def test_no_memory_tracing_by_default():
+    instrument.enable()
+    try:
+        with instrument.span("stage"):
+            allocate(1)
+        summary = instrument.summary()
+    finally:
+        instrument.init_process(False)
+    assert summary["stages"]["stage"]["calls"] == 1
+    assert summary["peak_mb"] == {}
+
+
+def test_without_resource_module(monkeypatch):
+    # as on Windows
+    monkeypatch.setattr(instrument, "resource", None)
+    assert instrument.peak_rss_mb() is None
+    assert instrument.summary()["process_peak_rss_mb"] is None
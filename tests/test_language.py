@@ -0,0 +1,56 @@
+import pytest
+from langdetect import detect
+
+from language import ACCEPT, FALLBACK, REJECT, LanguageIdentifier, normalize
+
+
+ENGLISH = [
+    "Ben Affleck wins best director for Argo at the Golden Globes tonight",
+    "I can not believe that Anne Hathaway won, she was so good in it",
+    "Watching the golden globes with my family and it is the best show",
+]
+FOREIGN = [
+    "Ben Affleck gana el premio a mejor director por Argo en los Globos de Oro",
+    "Jennifer Lawrence gagne le prix de la meilleure actrice pour son film",
+    "Die Verleihung der Golden Globes ist heute und ich bin nicht dabei",
+    "ベン・アフレックが監督賞を受賞しました",
+]
+
+
+def test_normalize_drops_mentions_digits_and_punctuation():
+    assert normalize("@user Argo WINS!!! 2013 #GoldenGlobes") == "argo wins goldenglobes"
+
+
+@pytest.mark.parametrize("text", ENGLISH)
+def test_clear_english_is_accepted_without_fallback(text):
+    identifier = LanguageIdentifier()
+    assert identifier.classify(normalize(text)) == ACCEPT
+    assert identifier.is_english(text)
+
+
+@pytest.mark.parametrize("text", FOREIGN)
+def test_clear_foreign_is_rejected(text):
+    identifier = LanguageIdentifier()
+    assert identifier.classify(normalize(text)) == REJECT
+    assert not identifier.is_english(text)
+
+
+def test_short_texts_go_to_langdetect():
+    identifier = LanguageIdentifier()
+    text = "Argo wins"
+    assert identifier.classify(normalize(text)) == FALLBACK
+    assert identifier.is_english(text) == (detect(text) == "en")
+    assert text in identifier.fallback_memo
+
+
+def test_memo_is_keyed_by_normalized_text_and_bounded():
+    identifier = LanguageIdentifier(memo_size=2)
+    identifier.is_english(ENGLISH[0])
+    identifier.is_english("@someone " + ENGLISH[0].upper() + "!!")
+    assert identifier.counts["memo_hits"] == 1
+    assert identifier.counts[ACCEPT] == 1
+
+    identifier.is_english(ENGLISH[1])
+    identifier.is_english(ENGLISH[2])
+    assert len(identifier.memo) == 2
+    assert normalize(ENGLISH[0]) not in identifier.memo
@@ -0,0 +1,79 @@
+import json
+import random
+
+
+import live
+from synthetic import generate_tweets
+
+
+def records(texts, step=1000):
+    return [{"text": text, "id": i, "user": {"id": 1, "screen_name": "user1"}, "timestamp_ms": step * i}
+            for i, text in enumerate(texts)]
+
+
+def test_valid_record():
+    record = {"text": "Argo wins", "id": 1, "user": {"id": 1}, "timestamp_ms": "1000"}
+    assert live.valid_record(record)["timestamp_ms"] == 1000
+    assert live.valid_record({**record, "timestamp_ms": "soon"}) is None
+    assert live.valid_record({**record, "text": None}) is None
+    assert live.valid_record({"id": 3}) is None
+    assert live.valid_record("not a record") is None
+
+
+def test_iter_stream_reads_ndjson_and_json_arrays(tmp_path):
+    path = tmp_path / "stream.ndjson"
+    path.write_text('[\n{"id": 1},\n\n{"id": 2, "text": "a"},\nnot json\n{"id": 3}\n]\n', encoding="utf-8")
+    assert [record["id"] for record in live.iter_stream(str(path))] == [1, 2, 3]
+
+
+def test_run_publishes_the_results(nlp, tmp_path):
+    output = str(tmp_path / "live.json")
+    stream = records([
+        "Tina Fey and Amy Poehler host the show tonight",
+        "Amy Poehler hosts it well",
+        "Ben Affleck presents Best Director",
+        "Ben Affleck wins Best Director - Drama award",
+        "Ben Affleck wins Best Director - Drama award again",
+    ]) + [{"text": "no id here", "user": 1, "timestamp_ms": 5}]
+    aggregator = live.run(iter(stream), live.LiveAggregator(nlp=nlp), output, interval=0)
+
+    assert aggregator.records_skipped == 1
+    assert aggregator.tweets_seen == 5
+    result = json.load(open(output))
+    assert set(result["Hosts"][:2]) == {"Tina Fey", "Amy Poehler"}
+    assert [award["Winner"] for award in result["Award data"]] == ["Ben Affleck"]
+
+
+def test_presenters_match_the_award_windows(nlp, tmp_path):
+    # however the award time ranges grow, every award holds exactly the presenter
+    # mentions inside its window
+    rng = random.Random(1)
+    people = ["Tina Fey", "Amy Poehler", "Ben Affleck"]
+    awards = ["Best Director - Motion Picture", "Best Actor - Drama", "Best Original Song"]
+    stream = []
+    for i in range(300):
+        if rng.random() < 0.5:
+            text = f"{rng.choice(people)} presents the award"
+        else:
+            text = f"{rng.choice(people)} wins {rng.choice(awards)} award"
+        stream.append({"text": text, "id": i, "user": {"id": 1}, "timestamp_ms": rng.randint(0, 200000)})
+    aggregator = live.run(iter(stream), live.LiveAggregator(nlp=nlp, presenter_window=5000),
+                          str(tmp_path / "live.json"), interval=0)
+
+    assert aggregator.awards
+    mentions = list(zip(aggregator.mention_timestamps, aggregator.mention_names))
+    for award, award_data in aggregator.awards.items():
+        start, end = aggregator._window(award_data)
+        expected = {}
+        for timestamp, (names, weight) in mentions:
+            if start <= timestamp <= end:
+                for name in names:
+                    expected[name] = expected.get(name, 0) + weight
+        assert dict(aggregator.presenters.get(award, {})) == expected
+
+
+def test_synthetic_stream_finds_the_hosts(nlp, tmp_path):
+    stream = sorted(generate_tweets(1500, seed=2), key=lambda record: record["timestamp_ms"])
+    aggregator = live.run(iter(stream), live.LiveAggregator(nlp=nlp), str(tmp_path / "live.json"), interval=0)
+    assert set(aggregator.result()["Hosts"][:2]) == {"Tina Fey", "Amy Poehler"}
+    assert aggregator.tweets_parsed < aggregator.tweets_seen
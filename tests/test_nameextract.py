@@ -0,0 +1,56 @@
+import pytest
+
+import evaluate
+import synthetic
+from nameextract import (FastNameExtractor, SpacyNameExtractor, capitalized_runs, get_name_extractor,
+                         person_names)
+
+
+def test_capitalized_runs():
+    assert capitalized_runs("Tina Fey and Amy Poehler host the Golden Globes") == [["Tina", "Fey"], ["Amy", "Poehler"]]
+    # punctuation, all-caps words and possessives end a run
+    assert capitalized_runs("Daniel Day-Lewis, Hugh Jackman's LOL Anne") == [["Daniel", "Day-Lewis"], ["Hugh", "Jackman"], ["Anne"]]
+    # a given name that is also a stopword-like word still starts a run
+    assert capitalized_runs("Will Ferrell wins") == [["Will", "Ferrell"]]
+
+
+def test_lexicon_names_without_spacy():
+    extractor = FastNameExtractor(nlp=None, gazetteer=None)
+    names = extractor.extract(["Amy Poehler is hosting", "Poehler again!", "Silver Linings Playbook wins"])
+    assert names == [["Amy Poehler"], ["Poehler"], []]
+    assert extractor.counts["spacy_parses"] == 0
+    assert "Silver Linings" in extractor.rejected
+
+
+def test_ambiguous_first_names_need_spacy(nlp):
+    # "Will" and "Kerry" are in AMBIGUOUS_FIRST_NAMES, only the NER can accept them
+    texts = ["Will Ferrell is so funny", "Kerry Washington looks great", "Will Ferrell again", "Grace Period ends"]
+    assert FastNameExtractor(nlp=None, gazetteer=None).extract(texts) == [[], [], [], []]
+
+    extractor = FastNameExtractor(nlp=nlp, gazetteer=None)
+    assert extractor.extract(texts) == [["Will Ferrell"], ["Kerry Washington"], ["Will Ferrell"], []]
+    # one parse per distinct candidate, the verdicts are remembered
+    assert extractor.counts["spacy_parses"] == 3
+    assert extractor.extract(["Will Ferrell wins"]) == [["Will Ferrell"]]
+    assert extractor.counts["spacy_parses"] == 3
+
+
+def test_spacy_backend_and_factory(nlp):
+    texts = ["Tina Fey and Amy Poehler host", "no names here"]
+    extractor = get_name_extractor("spacy", nlp)
+    assert isinstance(extractor, SpacyNameExtractor)
+    assert extractor.extract(texts) == [person_names(doc) for doc in nlp.pipe(texts)] == [["Tina Fey", "Amy Poehler"], []]
+    assert isinstance(get_name_extractor("fast"), FastNameExtractor)
+    with pytest.raises(ValueError):
+        get_name_extractor("spacy")
+    with pytest.raises(ValueError):
+        get_name_extractor("regex", nlp)
+
+
+def test_fast_backend_keeps_the_recall_of_spacy(nlp):
+    # the labeled synthetic sample, with the test pipeline standing in for the NER
+    texts, labels = synthetic.labeled_names(2000, seed=3)
+    rows = evaluate.name_backend_scores(texts, labels, nlp)
+    assert rows["spacy"]["recall"] > 0.9
+    assert rows["fast"]["relative_recall"] >= 0.95
+    assert rows["fast"]["precision"] >= 0.9
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from names import NameResolver, bounded_distance, normalize_name, resolve_name_counts
+
+
+def osa_distance(a, b):
+    # full optimal string alignment table, the reference for bounded_distance
+    table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        table[i][0] = i
+    for j in range(len(b) + 1):
+        table[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            table[i][j] = min(table[i - 1][j] + 1, table[i][j - 1] + 1, table[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                table[i][j] = min(table[i][j], table[i - 2][j - 2] + 1)
+    return table[len(a)][len(b)]
+
+
+def test_bounded_distance_matches_the_full_table():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = "".join(rng.choice("abc") for _ in range(rng.randint(0, 7)))
+        b = "".join(rng.choice("abc") for _ in range(rng.randint(0, 7)))
+        limit = rng.randint(0, 3)
+        assert bounded_distance(a, b, limit) == min(osa_distance(a, b), limit + 1)
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Penélope Cruz", "penelope cruz"),
+    ("  Daniel Day-Lewis ", "daniel day lewis"),
+    ("@TinaFey!!", "tinafey"),
+    ("ЖАННА", "жанна"),
+])
+def test_normalize_name(name, expected):
+    assert normalize_name(name) == expected
+
+
+def test_merge_joins_typos_order_and_partial_names():
+    counts = {"Amy Poehler": 10, "Amy Poeler": 2, "Poehler Amy": 1, "Amy": 3, "Tina Fey": 8, "Fey": 2, "!!": 1}
+    merged = NameResolver().merge(counts)
+    assert merged == {"Amy Poehler": 16, "Tina Fey": 10, "!!": 1}
+    assert sum(merged.values()) == sum(counts.values())
+
+
+def test_partial_names_go_to_the_most_mentioned_full_name():
+    merged = resolve_name_counts({"Jennifer Lawrence": 9, "Jennifer Aniston": 2, "Jennifer": 4})
+    assert merged == {"Jennifer Lawrence": 13, "Jennifer Aniston": 2}
+
+
+def test_different_people_stay_apart():
+    counts = {"Ben Affleck": 3, "Ben Stiller": 2, "Hugh Jackman": 4, "Hugh Grant": 1}
+    assert NameResolver().merge(counts) == counts
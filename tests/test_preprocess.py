@@ -0,0 +1,94 @@
+import random
+
+import pytest
+import unidecode
+from ftfy import fix_text
+
+import preprocess
+from normalization import TextNormalizer
+from synthetic import generate_tweets
+
+
+def reference_clean(text):
+    """
+    The cleaning steps clean_text replaces, applied one after another.
+    """
+    data = {"text": text}
+    preprocess.process_url(data)
+    hashtags = preprocess.extract_hashtags(data)
+    return preprocess.exclude_extra_whitespace(data["text"]), hashtags
+
+
+CLEAN_CASES = [
+    "",
+    "Argo wins #GoldenGlobes http://t.co/abc",
+    "#tag#other  text\t\twith\nbreaks",
+    "http://t.co/x#tag trailing",
+    "before http://t.co/x after #end",
+    "#http://t.co/x",
+    "ideographic　space and\x85next line",
+    "   leading and trailing   ",
+]
+
+
+@pytest.mark.parametrize("text", CLEAN_CASES)
+def test_clean_text_cases(text):
+    assert preprocess.clean_text(text) == reference_clean(text)
+
+
+def test_clean_text_random():
+    alphabet = ["a", "b", "#", "http", "://x", "h", " ", "  ", "\t", "\n", "_", "1", "é", "#tag",
+                "http://t.co/x", " #", "ttp", "s", "\x1c", "　", "\x85"]
+    rng = random.Random(1)
+    for _ in range(20000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert preprocess.clean_text(text) == reference_clean(text), repr(text)
+
+
+def test_clean_text_synthetic_tweets():
+    for record in generate_tweets(2000, seed=3):
+        text = fix_text(record["text"])
+        assert preprocess.clean_text(text) == reference_clean(text)
+
+
+NORMALIZE_CASES = [
+    "plain ascii tweet",
+    "tabs\tand\nnewlines",
+    "carriage\r\nreturn",
+    "Ben &amp; Jerry &lt;3",
+    "control\x1bcharacter",
+    "Les Misérables",
+    "mojibake: Les MisÃ©rables",
+    "“smart quotes” and — dashes",
+    "emoji 🎉 and ﬁ ligature",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", NORMALIZE_CASES)
+def test_normalizer_matches_ftfy_and_unidecode(text):
+    normalizer = TextNormalizer()
+    # twice, so the memoized answers are checked as well
+    for _ in range(2):
+        assert normalizer.fix_text(text) == fix_text(text)
+        assert normalizer.to_ascii(text) == unidecode.unidecode(text)
+
+
+def test_normalizer_fast_path_and_memo():
+    normalizer = TextNormalizer(memo_size=1)
+    normalizer.fix_text("clean text")
+    normalizer.fix_text("Les Misérables")
+    normalizer.fix_text("Les Misérables")
+    normalizer.fix_text("other é")
+    assert normalizer.counts["fix_fast"] == 1
+    assert normalizer.counts["fix_full"] == 2
+    assert normalizer.counts["fix_memo_hits"] == 1
+    assert len(normalizer.fix_memo) == 1
+
+
+def test_normalizer_synthetic_tweets():
+    normalizer = TextNormalizer()
+    for record in generate_tweets(2000, seed=4):
+        text = record["text"]
+        assert normalizer.fix_text(text) == fix_text(text)
+        assert normalizer.to_ascii(text) == unidecode.unidecode(text)
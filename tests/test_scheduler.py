@@ -0,0 +1,107 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from aggregates import AwardStats, finalize_award_stats, merge_award_stats
+from clustering import segment_bursts
+from scheduler import plan_tasks, run_segments
+from synthetic import generate_tweets
+from preprocess import preprocess_tweet
+from tweet import TweetStore
+
+
+@pytest.fixture(scope="module")
+def store():
+    tweets = [tweet for tweet in map(preprocess_tweet, generate_tweets(3000, seed=5)) if tweet is not None]
+    return TweetStore.from_tweets(tweets).sort_by_timestamp()
+
+
+def word_counts(key, store, doc_bytes):
+    # module level, so the workers can unpickle it
+    counts = Counter()
+    for text in store.texts():
+        counts.update(text.lower().split())
+    return counts
+
+
+def segments_of(store):
+    return [(key, start, end) for key, (start, end) in enumerate(segment_bursts(store, bin_ms=10000))]
+
+
+def test_plan_tasks_keeps_segments_whole():
+    segments = [("a", 0, 10), ("b", 10, 10), ("c", 10, 500), ("d", 500, 520)]
+    assert plan_tasks(segments) == [("c", 0, 10, 500), ("d", 0, 500, 520), ("a", 0, 0, 10)]
+
+
+def test_plan_tasks_splits_a_huge_segment():
+    tasks = plan_tasks([("small", 0, 50), ("huge", 50, 10050)], max_task_size=3000)
+    huge = sorted(task for task in tasks if task[0] == "huge")
+    assert len(huge) == 4
+    assert [part for _, part, _, _ in huge] == [0, 1, 2, 3]
+    # the parts cover the segment exactly, none larger than the task size
+    assert huge[0][2] == 50 and huge[-1][3] == 10050
+    assert all(a[3] == b[2] for a, b in zip(huge, huge[1:]))
+    assert all(end - start <= 3000 for _, _, start, end in huge)
+    assert tasks[-1] == ("small", 0, 0, 50)
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_parallel_equals_serial(store, max_workers):
+    segments = segments_of(store)
+    assert len(segments) > 3
+    serial = {key: word_counts(key, store[start:end], None) for key, start, end in segments}
+    parallel = {key: counts for (key, part), counts in
+                run_segments(word_counts, store, segments, stages=(), max_workers=max_workers)}
+    assert parallel == serial
+    # merged in completion order, the result is the one of a single pass
+    total = Counter()
+    for counts in parallel.values():
+        total.update(counts)
+    assert total == word_counts(None, store, None)
+
+
+def test_mapped_store(store, tmp_path):
+    path = tmp_path / "store.tweets"
+    store.save(str(path))
+    opened = TweetStore.open(str(path))
+    segments = segments_of(opened)
+    serial = {key: word_counts(key, opened[start:end], None) for key, start, end in segments}
+    assert {key: counts for (key, part), counts in
+            run_segments(word_counts, opened, segments, stages=(), max_workers=2)} == serial
+
+
+def test_split_parts_add_up_to_the_segment(store):
+    # one segment of every tweet, in parts of at most 400 rows
+    whole = [("all", 0, len(store))]
+    total = Counter()
+    results = list(run_segments(word_counts, store, whole, stages=(), max_workers=2, max_task_size=400))
+    assert len(results) == -(-len(store) // 400)
+    for (key, part), counts in results:
+        total.update(counts)
+    assert total == word_counts(None, store, None)
+
+
+def test_award_stats_merge_in_any_order():
+    rng = np.random.default_rng(0)
+    names = [f"name {i}" for i in range(30)]
+    # the capacity covers every name, so no summary overflows and merging is exact
+    segments = []
+    for _ in range(12):
+        stats = AwardStats.from_award(
+            {"count": int(rng.integers(1, 5)), "start_timestamp": int(rng.integers(0, 100)),
+             "end_timestamp": int(rng.integers(100, 200)),
+             "winners": {str(rng.choice(names)): int(rng.integers(1, 5)) for _ in range(6)}},
+            nominees=list(rng.choice(names, 4)), presenters=list(rng.choice(names, 3)), capacity=30)
+        segments.append(stats)
+
+    def merged(order):
+        into = {}
+        for i in order:
+            copy = AwardStats(capacity=30).merge(segments[i])
+            merge_award_stats(into, {"award": copy})
+        return finalize_award_stats(into, min_count=1)
+
+    serial = merged(range(len(segments)))
+    for _ in range(10):
+        assert merged(rng.permutation(len(segments))) == serial
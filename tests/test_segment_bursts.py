@@ -0,0 +1,56 @@
+import numpy as np
+
+from clustering import bin_counts, burst_states, cluster_tweets_bursts, segment_bursts
+from tweet import TweetStore
+
+
+def store_at(timestamps):
+    timestamps = sorted(int(t) for t in timestamps)
+    return TweetStore.from_tweets((str(i), f"tweet {i}", "user", t, []) for i, t in enumerate(timestamps))
+
+
+def bursty_timestamps(rng, centers, minutes=120):
+    # one tweet a minute in the background, 200 within two minutes of every center
+    background = np.arange(minutes) * 60000
+    bursts = [center + rng.integers(0, 120000, 200) for center in centers]
+    return np.concatenate([background, *bursts])
+
+
+def test_bin_counts_compresses_long_gaps():
+    timestamps = np.array([0, 10, 60000, 61000, 10 * 86400000])
+    counts, volume = bin_counts(timestamps, 60000, max_gap_bins=5)
+    # a day of empty minutes becomes 5 empty bins
+    assert counts.tolist() == [2, 2, 0, 0, 0, 0, 0, 1]
+    assert volume.tolist() == counts.tolist()
+    _, weighted = bin_counts(timestamps, 60000, weights=np.array([1, 2, 3, 4, 5]), max_gap_bins=5)
+    assert weighted.tolist() == [3, 7, 0, 0, 0, 0, 0, 5]
+
+
+def test_burst_states_mark_the_busy_bins():
+    volume = np.array([1, 1, 1, 30, 35, 1, 1, 1, 1, 40, 1, 1], dtype=np.float64)
+    assert burst_states(volume).tolist() == [0, 0, 0, 1, 1, 0, 0, 0, 0, 1, 0, 0]
+    assert burst_states(np.ones(10)).tolist() == [0] * 10
+
+
+def test_one_segment_per_burst_covering_every_tweet():
+    rng = np.random.default_rng(0)
+    centers = [20 * 60000, 60 * 60000, 100 * 60000]
+    store = store_at(bursty_timestamps(rng, centers))
+    segments = segment_bursts(store)
+
+    assert len(segments) == len(centers)
+    assert segments[0][0] == 0 and segments[-1][1] == len(store)
+    assert all(end == start for (_, end), (start, _) in zip(segments, segments[1:]))
+    # every burst lies inside its own segment
+    for (start, end), center in zip(segments, centers):
+        timestamps = store.timestamps[start:end]
+        assert np.count_nonzero((timestamps >= center) & (timestamps < center + 120000)) >= 200
+
+
+def test_cluster_tweets_bursts_and_empty_store():
+    rng = np.random.default_rng(1)
+    store = store_at(bursty_timestamps(rng, [30 * 60000, 90 * 60000]))
+    clusters = cluster_tweets_bursts(store)
+    assert sum(len(cluster) for cluster in clusters.values()) == len(store)
+    assert list(clusters) == [int(cluster.timestamps[0]) for cluster in clusters.values()]
+    assert segment_bursts(store_at([])) == []
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from sweep import IntervalSweep, sweep_tweets
+from tweet import Tweet
+
+
+def random_intervals(rng, count=30):
+    intervals = []
+    for key in range(count):
+        start = rng.randint(0, 1000)
+        intervals.append((start, start + rng.randint(0, 200), f"award {key}"))
+    return intervals
+
+
+def test_active_matches_a_scan_of_every_interval():
+    rng = random.Random(0)
+    intervals = random_intervals(rng)
+    sweep = IntervalSweep(intervals)
+    for timestamp in sorted(rng.randint(-50, 1300) for _ in range(400)):
+        expected = {key for start, end, key in intervals if start <= timestamp <= end}
+        assert set(sweep.active(timestamp)) == expected
+
+
+def test_closed_intervals_and_span():
+    sweep = IntervalSweep([(10, 20, "a"), (20, 30, "b")])
+    assert sweep.span() == (10, 30)
+    assert set(sweep.active(20)) == {"a", "b"}
+    assert set(sweep.active(21)) == {"b"}
+    assert set(sweep.active(31)) == set()
+    assert IntervalSweep([]).span() is None
+
+
+def test_timestamps_must_not_decrease():
+    sweep = IntervalSweep([(0, 10, "a")])
+    sweep.active(5)
+    with pytest.raises(ValueError):
+        sweep.active(4)
+
+
+def test_sweep_tweets_keeps_the_tweets_in_any_interval():
+    rng = random.Random(1)
+    intervals = random_intervals(rng, 5)
+    tweets = [Tweet(id=str(i), text="t", timestamp=t) for i, t in enumerate(sorted(rng.sample(range(1300), 200)))]
+    expected = [tweet for tweet in tweets if any(start <= tweet.timestamp <= end for start, end, _ in intervals)]
+    assert sweep_tweets(tweets, intervals) == expected
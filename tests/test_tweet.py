@@ -0,0 +1,105 @@
+import json
+import pickle
+import struct
+
+import numpy as np
+import pytest
+
+from tweet import FILE_ALIGNMENT, FILE_MAGIC_V1, EncodedList, Tweet, TweetStore, is_tweet_file
+
+TWEETS = [
+    Tweet(1, "Tina Fey hosts #GoldenGlobes", {"id": 10}, 1000, ["GoldenGlobes"]),
+    Tweet(2, "Les Misérables wins", {"id": 11}, 2000, []),
+    Tweet(3, "", {"id": 10}, 2000, ["a", "b"]),
+    Tweet(4, "Argo #Argo #GoldenGlobes", "plain user", 5000, ["Argo", "GoldenGlobes"]),
+]
+
+
+def rows(store):
+    return [(t.id, t.text, t.user, t.timestamp, t.hashtags, t.weight) for t in store]
+
+
+def test_round_trip(tmp_path):
+    store = TweetStore.from_tweets(TWEETS)
+    path = tmp_path / "store.tweets"
+    store.save(str(path), metadata={"key": "abc"})
+    assert is_tweet_file(str(path))
+
+    opened = TweetStore.open(str(path))
+    assert rows(opened) == rows(store)
+    assert opened.metadata == {"key": "abc"}
+    assert opened.path == str(path)
+    assert np.array_equal(opened.timestamps, store.timestamps)
+
+
+def test_round_trip_slice_and_weights(tmp_path):
+    store = TweetStore.from_tweets(TWEETS).with_weights(np.array([1, 2, 3, 4], dtype=np.int32))
+    subset = store.take([3, 1])
+    path = tmp_path / "subset.tweets"
+    subset.save(str(path))
+
+    opened = TweetStore.open(str(path))
+    assert rows(opened) == rows(subset)
+    assert opened.weights.tolist() == [4, 2]
+    assert opened.total_weight() == 6
+    assert rows(opened[1:]) == rows(subset[1:])
+
+
+def test_opened_store_pickles(tmp_path):
+    path = tmp_path / "store.tweets"
+    TweetStore.from_tweets(TWEETS).save(str(path))
+    opened = TweetStore.open(str(path))
+    assert rows(pickle.loads(pickle.dumps(opened))) == rows(opened)
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = tmp_path / "dump.json"
+    path.write_text("[]")
+    assert not is_tweet_file(str(path))
+    with pytest.raises(ValueError):
+        TweetStore.open(str(path))
+
+
+def test_users_and_tags_are_read_lazily(tmp_path):
+    path = tmp_path / "store.tweets"
+    TweetStore.from_tweets(TWEETS).save(str(path))
+    opened = TweetStore.open(str(path))
+
+    # nothing is decoded when the file is opened, only the values a row needs
+    assert isinstance(opened.users, EncodedList) and isinstance(opened.tags, EncodedList)
+    assert opened.users.decoded == {} and opened.tags.decoded == {}
+    assert opened.row(1).user == {"id": 11}
+    assert list(opened.users.decoded) == [1]
+    assert list(opened.users) == [{"id": 10}, {"id": 11}, "plain user"]
+    assert list(opened.tags) == ["GoldenGlobes", "a", "b", "Argo"]
+    assert opened.tags[-1] == "Argo"
+    with pytest.raises(IndexError):
+        opened.users[3]
+
+    # saving an opened store copies the encoded users and tags as they are
+    copy = tmp_path / "copy.tweets"
+    opened[1:].save(str(copy))
+    assert rows(TweetStore.open(str(copy))) == rows(opened[1:])
+
+
+def test_opens_version_1_files(tmp_path):
+    # version 1 kept the users and hashtags in the JSON header
+    store = TweetStore.from_tweets(TWEETS)
+    columns = ["ids", "timestamps", "user_index", "text_start", "text_end", "tag_ids", "tag_start", "tag_end"]
+    sections, offset, data = {}, 0, b""
+    for column in columns:
+        array = getattr(store, column)
+        sections[column] = [array.dtype.str, len(array), offset]
+        padded = array.tobytes() + b"\0" * (-array.nbytes % FILE_ALIGNMENT)
+        data += padded
+        offset += len(padded)
+    header = json.dumps({"count": len(store), "users": store.users, "tags": store.tags, "metadata": {},
+                         "sections": sections, "text_blob": [offset, len(store.text_blob)]}).encode("utf-8")
+    path = tmp_path / "old.tweets"
+    with open(path, "wb") as file:
+        file.write(FILE_MAGIC_V1 + struct.pack("<Q", len(header)) + header)
+        file.write(b"\0" * (-(len(FILE_MAGIC_V1) + 8 + len(header)) % FILE_ALIGNMENT))
+        file.write(data + store.text_blob)
+
+    assert is_tweet_file(str(path))
+    assert rows(TweetStore.open(str(path))) == rows(store)
@@ -0,0 +1,52 @@
+import numpy as np
+
+from tweet import Tweet, TweetStore
+from tweetindex import InvertedIndex, clause_terms
+
+TEXTS = [
+    "Tina Fey hosts the show",
+    "Jessica Chastain presents best actress",
+    "who is going to present next?",
+    "Ben Affleck is nominated for best director",
+    "Amy Poehler to present, hosts are great",
+]
+
+
+def indexed_store():
+    return TweetStore.from_tweets(
+        Tweet(id=str(i), text=text, user="user", timestamp=1000 * i, hashtags=[]) for i, text in enumerate(TEXTS))
+
+
+def scan(store, clauses, start=None, end=None):
+    # what the extractors did before the index: test every tweet
+    rows = []
+    for row, tweet in enumerate(store):
+        words = set(tweet.text.lower().replace(",", " ").replace("?", " ").split())
+        in_range = (start is None or tweet.timestamp >= start) and (end is None or tweet.timestamp <= end)
+        if in_range and any(all(term in words for term in clause) for clause in clauses):
+            rows.append(row)
+    return rows
+
+
+def test_lookup_matches_a_scan():
+    store = indexed_store()
+    index = InvertedIndex.build(store)
+    for clauses in ([("hosts",)], [("presents",), ("to", "present")], [("best", "director")], [("missing",)]):
+        assert index.lookup(clauses).tolist() == scan(store, clauses)
+    assert index.lookup([]).tolist() == []
+
+
+def test_time_range_cuts_the_postings():
+    store = indexed_store()
+    index = InvertedIndex.build(store)
+    clauses = [("hosts",), ("best",)]
+    assert index.lookup(clauses, 1000, 3000).tolist() == scan(store, clauses, 1000, 3000) == [1, 3]
+    assert index.rows("hosts", start_timestamp=2000).tolist() == [4]
+
+
+def test_only_the_wanted_terms_are_indexed():
+    clauses = [("to", "present")]
+    index = InvertedIndex.build(indexed_store(), clause_terms(clauses))
+    assert set(index.postings) == {"to", "present"}
+    assert index.lookup(clauses).tolist() == [2, 4]
+    assert isinstance(index.lookup([("hosts",)]), np.ndarray)
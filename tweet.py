@@ -2,15 +2,427 @@
 Data structure for storing tweet information.
 """
 from datetime import datetime
+import json
+import mmap
+import os
+import struct
+import numpy as np
+
+# tweet file layout: magic, header length (uint64), JSON header, then the sections,
+# each aligned so the columns can be mapped as NumPy arrays in place, then the text,
+# user and hashtag buffers. Version 1 files kept the users and hashtags in the header.
+FILE_MAGIC = b"TWSTORE2"
+FILE_MAGIC_V1 = b"TWSTORE1"
+FILE_ALIGNMENT = 64
+FILE_COLUMNS = ("ids", "timestamps", "user_index", "text_start", "text_end", "tag_ids", "tag_start", "tag_end", "weights",
+                "user_offsets", "tag_offsets")
 
 
 class Tweet:
-    def __init__(self, id=None, text=None, user=None, timestamp=None, hashtags=None):
+    __slots__ = ("id", "text", "user", "timestamp", "hashtags", "weight")
+
+    def __init__(self, id=None, text=None, user=None, timestamp=None, hashtags=None, weight=1):
         self.id = id
         self.text = text
         self.user = user
         self.timestamp = timestamp
         self.hashtags = hashtags
-    
+        # number of duplicate tweets this tweet stands for, see dedup.py
+        self.weight = weight
+
     def __str__(self):
-        return f"Tweet: {self.text} by {self.user} at {datetime.fromtimestamp(self.timestamp/1000).strftime('%Y-%m-%d %H:%M:%S')} with hashtags {self.hashtags}"
\ No newline at end of file
+        return f"Tweet: {self.text} by {self.user} at {datetime.fromtimestamp(self.timestamp/1000).strftime('%Y-%m-%d %H:%M:%S')} with hashtags {self.hashtags}"
+
+
+def _user_key(user):
+    """
+    Key used to intern users. Raw tweets carry the user as a dict with an id.
+    """
+    if isinstance(user, dict):
+        return user.get("id", user.get("screen_name"))
+    return user
+
+
+class EncodedList:
+    """
+    Read-only list of JSON values kept as one buffer of their UTF-8 encodings and an
+    offsets column: value i is encoded in blob[offsets[i]:offsets[i + 1]].
+
+    An opened tweet file holds its users and hashtags like this, as views of the
+    mapping, so opening it does not depend on how many there are; a value is only
+    decoded when a row needs it, and then remembered.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+        self.decoded = {}
+
+    @classmethod
+    def encode(cls, values):
+        parts = [json.dumps(value).encode("utf-8") for value in values]
+        offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+        np.cumsum([len(part) for part in parts], out=offsets[1:])
+        return cls(b"".join(parts), offsets)
+
+    def __getstate__(self):
+        # a mapped blob is a memoryview, which cannot be pickled
+        return {"blob": bytes(self.blob), "offsets": np.array(self.offsets), "decoded": {}}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if i in self.decoded:
+            return self.decoded[i]
+        if not 0 <= i < len(self):
+            raise IndexError("EncodedList index out of range")
+        value = json.loads(str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8"))
+        self.decoded[i] = value
+        return value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class TweetStore:
+    """
+    Columnar storage for a list of tweets sorted by timestamp.
+
+    ids and timestamps are NumPy int64 columns, users are interned into a shared list
+    and referenced by index, texts live in one UTF-8 buffer addressed by start/end
+    offsets, and hashtags are interned ids addressed the same way. Slicing a store
+    (store[a:b] or store.time_range(t0, t1)) returns a new store over views of the same
+    buffers, so nothing is copied.
+
+    Iterating or indexing a store yields lightweight Tweet objects built from one row.
+    The optional weights column holds how many duplicate tweets each row stands for;
+    None means every row counts once.
+
+    A store can be saved to a tweet file and opened again with TweetStore.open, which
+    maps the file instead of reading it: the columns and the text blob are views of the
+    mapping, and the users and hashtags are EncodedLists over it, so opening is instant
+    and processes opening the same file share its pages.
+    """
+
+    def __init__(self, ids, timestamps, user_index, users, text_blob, text_start, text_end,
+                 tag_ids, tag_start, tag_end, tags, weights=None):
+        self.ids = ids
+        self.timestamps = timestamps
+        self.user_index = user_index
+        self.users = users
+        self.text_blob = text_blob
+        self.text_start = text_start
+        self.text_end = text_end
+        self.tag_ids = tag_ids
+        self.tag_start = tag_start
+        self.tag_end = tag_end
+        self.tags = tags
+        self.weights = weights
+        # set by open() on a store that is a whole tweet file
+        self.path = None
+        self.metadata = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # a mapped or shared text blob is a memoryview, which cannot be pickled
+        state["text_blob"] = bytes(self.text_blob)
+        state["path"] = None
+        return state
+
+    @classmethod
+    def from_tweets(cls, tweets):
+        """
+        Build a store from an iterable of Tweet objects (or (id, text, user, timestamp,
+        hashtags) tuples), keeping their order.
+        """
+        ids, timestamps, user_index = [], [], []
+        users, user_lookup = [], {}
+        tags, tag_lookup = [], {}
+        text_parts, text_start, text_end = [], [], []
+        tag_ids, tag_start, tag_end = [], [], []
+        weights = []
+        offset = 0
+
+        for tweet in tweets:
+            if isinstance(tweet, Tweet):
+                weights.append(tweet.weight)
+                tweet = (tweet.id, tweet.text, tweet.user, tweet.timestamp, tweet.hashtags)
+            else:
+                weights.append(1)
+            tweet_id, text, user, timestamp, hashtags = tweet
+            ids.append(tweet_id)
+            timestamps.append(timestamp)
+
+            key = _user_key(user)
+            if key not in user_lookup:
+                user_lookup[key] = len(users)
+                users.append(user)
+            user_index.append(user_lookup[key])
+
+            encoded = (text or "").encode("utf-8")
+            text_parts.append(encoded)
+            text_start.append(offset)
+            offset += len(encoded)
+            text_end.append(offset)
+
+            tag_start.append(len(tag_ids))
+            for tag in hashtags or ():
+                if tag not in tag_lookup:
+                    tag_lookup[tag] = len(tags)
+                    tags.append(tag)
+                tag_ids.append(tag_lookup[tag])
+            tag_end.append(len(tag_ids))
+
+        return cls(
+            ids=np.array(ids, dtype=np.int64),
+            timestamps=np.array(timestamps, dtype=np.int64),
+            user_index=np.array(user_index, dtype=np.int32),
+            users=users,
+            text_blob=b"".join(text_parts),
+            text_start=np.array(text_start, dtype=np.int64),
+            text_end=np.array(text_end, dtype=np.int64),
+            tag_ids=np.array(tag_ids, dtype=np.int32),
+            tag_start=np.array(tag_start, dtype=np.int64),
+            tag_end=np.array(tag_end, dtype=np.int64),
+            tags=tags,
+            weights=np.array(weights, dtype=np.int32) if any(w != 1 for w in weights) else None,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows(self, rows):
+        """
+        Store over a subset of rows. Slices give views, index arrays give gathered copies
+        of the fixed-width columns; the text and hashtag buffers are always shared.
+        """
+        return TweetStore(
+            self.ids[rows], self.timestamps[rows], self.user_index[rows], self.users,
+            self.text_blob, self.text_start[rows], self.text_end[rows],
+            self.tag_ids, self.tag_start[rows], self.tag_end[rows], self.tags,
+            None if self.weights is None else self.weights[rows],
+        )
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.step not in (None, 1):
+                raise ValueError("TweetStore only supports contiguous slices, use take().")
+            return self._rows(item)
+        return self.row(item)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def text(self, i):
+        """
+        Text of row i.
+        """
+        return str(self.text_blob[self.text_start[i]:self.text_end[i]], "utf-8")
+
+    def texts(self):
+        """
+        Iterate over the texts of all rows without building Tweet objects.
+        """
+        blob = self.text_blob
+        for start, end in zip(self.text_start.tolist(), self.text_end.tolist()):
+            yield str(blob[start:end], "utf-8")
+
+    def hashtags(self, i):
+        """
+        Hashtags of row i.
+        """
+        return [self.tags[t] for t in self.tag_ids[self.tag_start[i]:self.tag_end[i]].tolist()]
+
+    def row(self, i):
+        """
+        Tweet object for row i.
+        """
+        if i < 0:
+            i += len(self)
+        return Tweet(
+            id=int(self.ids[i]),
+            text=self.text(i),
+            user=self.users[self.user_index[i]],
+            timestamp=int(self.timestamps[i]),
+            hashtags=self.hashtags(i),
+            weight=1 if self.weights is None else int(self.weights[i]),
+        )
+
+    def take(self, indices):
+        """
+        Store over an arbitrary list of row indices, in the given order.
+        """
+        return self._rows(np.asarray(indices, dtype=np.int64))
+
+    def compact(self):
+        """
+        Copy of the store that only holds the text and hashtag bytes of its own rows.
+        Use this before pickling a small slice of a large store, e.g. to send it to a worker.
+        """
+        blob = self.text_blob
+        parts = [blob[start:end] for start, end in zip(self.text_start.tolist(), self.text_end.tolist())]
+        text_end = np.cumsum(self.text_end - self.text_start, dtype=np.int64)
+        text_start = text_end - (self.text_end - self.text_start)
+
+        tag_parts = [self.tag_ids[start:end] for start, end in zip(self.tag_start.tolist(), self.tag_end.tolist())]
+        tag_end = np.cumsum(self.tag_end - self.tag_start, dtype=np.int64)
+        tag_start = tag_end - (self.tag_end - self.tag_start)
+        tag_ids = np.concatenate(tag_parts) if tag_parts else np.zeros(0, dtype=np.int32)
+
+        return TweetStore(
+            self.ids.copy(), self.timestamps.copy(), self.user_index.copy(), self.users,
+            b"".join(bytes(part) for part in parts), text_start, text_end,
+            tag_ids.astype(np.int32), tag_start, tag_end, self.tags,
+            None if self.weights is None else self.weights.copy(),
+        )
+
+    def with_weights(self, weights):
+        """
+        Same rows with the given weights column.
+        """
+        store = self._rows(slice(None))
+        store.weights = np.asarray(weights, dtype=np.int32)
+        return store
+
+    def total_weight(self):
+        """
+        Number of original tweets the rows stand for.
+        """
+        return len(self) if self.weights is None else int(self.weights.sum())
+
+    def sort_by_timestamp(self):
+        """
+        Store with rows sorted by timestamp. Sorting is stable so ties keep their order.
+        """
+        order = np.argsort(self.timestamps, kind="stable")
+        return self.take(order)
+
+    def range_indices(self, start_timestamp, end_timestamp):
+        """
+        Row range [start, end) of tweets with start_timestamp <= timestamp <= end_timestamp.
+        The store must be sorted by timestamp.
+        """
+        start = int(np.searchsorted(self.timestamps, start_timestamp, side="left"))
+        end = int(np.searchsorted(self.timestamps, end_timestamp, side="right"))
+        return start, end
+
+    def time_range(self, start_timestamp, end_timestamp):
+        """
+        Zero-copy slice of the tweets within [start_timestamp, end_timestamp].
+        """
+        start, end = self.range_indices(start_timestamp, end_timestamp)
+        return self._rows(slice(start, end))
+
+    def _is_packed(self):
+        """
+        Whether the rows use the text and hashtag buffers exactly once, in order.
+        """
+        return (len(self) > 0
+                and self.text_start[0] == 0 and self.text_end[-1] == len(self.text_blob)
+                and np.array_equal(self.text_start[1:], self.text_end[:-1])
+                and self.tag_start[0] == 0 and self.tag_end[-1] == len(self.tag_ids)
+                and np.array_equal(self.tag_start[1:], self.tag_end[:-1]))
+
+    def save(self, file, metadata=None):
+        """
+        Write the store as a tweet file.
+
+        Parameters:
+            file: Path or binary file object.
+            metadata (dict): JSON data kept in the header, available as store.metadata
+                after open().
+        """
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "wb") as handle:
+                return self.save(handle, metadata)
+        # a slice or a gathered subset only writes the text of its own rows
+        store = self if self._is_packed() else self.compact()
+
+        users = store.users if isinstance(store.users, EncodedList) else EncodedList.encode(store.users)
+        tags = store.tags if isinstance(store.tags, EncodedList) else EncodedList.encode(store.tags)
+        columns = {column: getattr(store, column, None) for column in FILE_COLUMNS}
+        columns["user_offsets"] = users.offsets
+        columns["tag_offsets"] = tags.offsets
+
+        sections, offset = {}, 0
+        arrays = []
+        for column in FILE_COLUMNS:
+            array = columns[column]
+            if array is None:
+                continue
+            array = np.ascontiguousarray(array)
+            sections[column] = [array.dtype.str, len(array), offset]
+            arrays.append(array)
+            offset += -(-array.nbytes // FILE_ALIGNMENT) * FILE_ALIGNMENT
+        # the byte buffers follow the columns back to back
+        buffers = {}
+        for name, blob in (("text_blob", store.text_blob), ("user_blob", users.blob), ("tag_blob", tags.blob)):
+            buffers[name] = [offset, len(blob)]
+            offset += len(blob)
+        header = json.dumps({
+            "count": len(store), "metadata": metadata or {}, "sections": sections, **buffers,
+        }).encode("utf-8")
+
+        file.write(FILE_MAGIC)
+        file.write(struct.pack("<Q", len(header)))
+        file.write(header)
+        file.write(b"\0" * (-(len(FILE_MAGIC) + 8 + len(header)) % FILE_ALIGNMENT))
+        for array in arrays:
+            file.write(array.tobytes())
+            file.write(b"\0" * (-array.nbytes % FILE_ALIGNMENT))
+        file.write(store.text_blob)
+        file.write(users.blob)
+        file.write(tags.blob)
+
+    @classmethod
+    def open(cls, path):
+        """
+        Map a tweet file written by save(). The store is read-only and stays valid after
+        the file is deleted.
+        """
+        with open(path, "rb") as file:
+            magic = file.read(len(FILE_MAGIC))
+            if magic not in (FILE_MAGIC, FILE_MAGIC_V1):
+                raise ValueError(f"{path} is not a tweet file.")
+            header_length, = struct.unpack("<Q", file.read(8))
+            header = json.loads(file.read(header_length))
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        data_start = len(FILE_MAGIC) + 8 + header_length
+        data_start += -data_start % FILE_ALIGNMENT
+
+        columns = {}
+        for column, (dtype, length, offset) in header["sections"].items():
+            columns[column] = np.frombuffer(mapped, dtype=np.dtype(dtype), count=length, offset=data_start + offset)
+
+        def buffer(name):
+            blob_offset, blob_length = header[name]
+            return memoryview(mapped)[data_start + blob_offset:data_start + blob_offset + blob_length]
+
+        if magic == FILE_MAGIC_V1:
+            users, tags = header["users"], header["tags"]
+        else:
+            users = EncodedList(buffer("user_blob"), columns["user_offsets"])
+            tags = EncodedList(buffer("tag_blob"), columns["tag_offsets"])
+        store = cls(
+            columns["ids"], columns["timestamps"], columns["user_index"], users,
+            buffer("text_blob"), columns["text_start"], columns["text_end"],
+            columns["tag_ids"], columns["tag_start"], columns["tag_end"], tags,
+            columns.get("weights"),
+        )
+        store.path = os.path.abspath(path)
+        store.metadata = header["metadata"]
+        return store
+
+
+def is_tweet_file(path):
+    """
+    Whether path is a tweet file written by TweetStore.save.
+    """
+    with open(path, "rb") as file:
+        return file.read(len(FILE_MAGIC)) in (FILE_MAGIC, FILE_MAGIC_V1)
@@ -0,0 +1,92 @@
+"""
+Inverted keyword index over a TweetStore for candidate retrieval.
+"""
+import re
+from collections import defaultdict
+from functools import reduce
+import numpy as np
+
+# lowercase letter runs. Every token spaCy would lower-case to one of the indexed
+# keywords is contained in such a run, so lookups never miss a Matcher hit.
+token_pattern = re.compile(r"[^\W\d_]+")
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class InvertedIndex:
+    """
+    Token -> posting list of row ids of a TweetStore.
+
+    The store is sorted by timestamp, so every posting list is in timestamp order and
+    a time range becomes a row range that is cut out of the postings by binary search.
+    """
+
+    def __init__(self, postings, timestamps):
+        self.postings = postings
+        self.timestamps = timestamps
+
+    @classmethod
+    def build(cls, tweets, terms=None):
+        """
+        Index the texts of a store in one pass.
+
+        Parameters:
+            tweets (TweetStore): Tweets sorted by timestamp.
+            terms (iterable): Only index these lowercase tokens; None indexes every token.
+
+        Returns:
+            InvertedIndex: The index, with row ids relative to the given store.
+        """
+        wanted = None if terms is None else frozenset(terms)
+        postings = defaultdict(list)
+        for row, text in enumerate(tweets.texts()):
+            tokens = set(token_pattern.findall(text.lower()))
+            if wanted is not None:
+                tokens &= wanted
+            for token in tokens:
+                postings[token].append(row)
+        postings = {token: np.array(rows, dtype=np.int64) for token, rows in postings.items()}
+        return cls(postings, tweets.timestamps)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def rows(self, term, start_timestamp=None, end_timestamp=None):
+        """
+        Rows containing a term, optionally limited to [start_timestamp, end_timestamp].
+        """
+        rows = self.postings.get(term, _EMPTY)
+        if start_timestamp is None and end_timestamp is None:
+            return rows
+        start_row = 0 if start_timestamp is None else np.searchsorted(self.timestamps, start_timestamp, side="left")
+        end_row = len(self.timestamps) if end_timestamp is None else np.searchsorted(self.timestamps, end_timestamp, side="right")
+        lo, hi = np.searchsorted(rows, [start_row, end_row], side="left")
+        return rows[lo:hi]
+
+    def lookup(self, clauses, start_timestamp=None, end_timestamp=None):
+        """
+        Rows matching any of the clauses, a clause being a tuple of terms that all
+        have to occur in the tweet.
+
+        Parameters:
+            clauses (list): e.g. [("presents",), ("to", "present")].
+            start_timestamp (int): Optional start of the time range.
+            end_timestamp (int): Optional end of the time range.
+
+        Returns:
+            ndarray: Sorted row ids, so they are also in timestamp order.
+        """
+        matches = []
+        for clause in clauses:
+            postings = [self.rows(term, start_timestamp, end_timestamp) for term in clause]
+            matches.append(reduce(np.intersect1d, postings) if len(postings) > 1 else postings[0])
+        if not matches:
+            return _EMPTY
+        return reduce(np.union1d, matches) if len(matches) > 1 else matches[0]
+
+
+def clause_terms(*clause_lists):
+    """
+    All terms used by the given clause lists, for InvertedIndex.build.
+    """
+    return {term for clauses in clause_lists for clause in clauses for term in clause}